@@ -0,0 +1,66 @@
+"""Sequential vs background (CLICKHOUSE_ASYNC_INSERT) inserts over several files against a slow HTTP stub.
+
+    PYTHONPATH=src python benchmarks/bench_async_insert.py --files 8 --rows 200000 --latency 0.5
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from bench_db import _SinkHandler
+from pipeline import db, runner
+
+
+class _SlowHandler(_SinkHandler):
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        super().do_POST()
+
+
+def _write_files(directory, files, rows, sensors=100):
+    rng = np.random.default_rng(0)
+    for i in range(files):
+        pd.DataFrame({
+            "ts": pd.date_range("2025-01-01", periods=rows, freq="s") + pd.Timedelta(days=i),
+            "sensor_id": rng.integers(0, sensors, rows),
+            "value": rng.normal(0, 1, rows),
+        }).to_csv(os.path.join(directory, f"part-{i:03d}.csv"), index=False)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=8)
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--latency", type=float, default=0.5, help="seconds the stub holds every insert")
+    ap.add_argument("--batch-rows", type=int, default=50_000)
+    args = ap.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    server.bytes_received = 0
+    server.latency = args.latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    db.CLICKHOUSE_URL = f"http://127.0.0.1:{server.server_port}"
+    runner.settings.detect_method = "zscore"
+    runner.settings.clickhouse_insert_batch_rows = args.batch_rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_files(tmp, args.files, args.rows)
+        for mode in (False, True):
+            runner.settings.clickhouse_async_insert = mode
+            server.bytes_received = 0
+            t0 = time.perf_counter()
+            runner.run_once(tmp)
+            elapsed = time.perf_counter() - t0
+            print(f"{'async' if mode else 'sync':5s} {elapsed:7.2f}s  {server.bytes_received / 2**20:7.1f} MiB sent")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
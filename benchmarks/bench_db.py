@@ -0,0 +1,98 @@
+"""Bulk Native writer vs the previous iterrows/TSV writer against a local HTTP stand-in.
+
+    PYTHONPATH=src python benchmarks/bench_db.py --rows 1000000
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from pipeline import db
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        received = 0
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                received += len(self.rfile.read(size))
+                self.rfile.readline()
+        else:
+            received = len(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self.server.bytes_received += received
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SinkHandler)
+    server.bytes_received = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_timeseries_iterrows(df, timeout=10):
+    lines = []
+    for _, row in df.iterrows():
+        lines.append(f"{row['ts']}\t{row['sensor_id']}\t{row['value']}")
+    payload = "\n".join(lines).encode("utf-8")
+    query = "INSERT INTO pipeline.timeseries (ts, sensor_id, value) FORMAT TSV"
+    session = db._http_session()
+    r = session.post(f"{db.CLICKHOUSE_URL}/", params={"query": query}, data=payload, timeout=timeout)
+    r.raise_for_status()
+
+
+def synthetic(rows, sensors):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "ts": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(rows) // sensors, unit="s"),
+        "sensor_id": rng.integers(0, sensors, rows),
+        "value": rng.normal(10.0, 1.0, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sensors", type=int, default=100)
+    parser.add_argument("--legacy-rows", type=int, default=100_000,
+                        help="rows for the iterrows baseline (it is extrapolated to --rows)")
+    args = parser.parse_args()
+
+    server = start_stub()
+    db.CLICKHOUSE_URL = f"http://127.0.0.1:{server.server_port}"
+    df = synthetic(args.rows, args.sensors)
+
+    legacy = df.iloc[:args.legacy_rows]
+    t0 = time.perf_counter()
+    write_timeseries_iterrows(legacy)
+    t_legacy = (time.perf_counter() - t0) * args.rows / len(legacy)
+
+    for compress in (False, True):
+        server.bytes_received = 0
+        t0 = time.perf_counter()
+        db.write_timeseries(df, compress=compress, batch_rows=250_000)
+        t_bulk = time.perf_counter() - t0
+        print(f"native compress={compress!s:5s} rows={args.rows} {t_bulk:.3f}s "
+              f"{args.rows / t_bulk / 1e6:.2f}M rows/s wire={server.bytes_received / 1e6:.1f}MB "
+              f"speedup={t_legacy / t_bulk:.0f}x")
+    print(f"iterrows TSV (extrapolated from {len(legacy)} rows) {t_legacy:.1f}s "
+          f"{args.rows / t_legacy / 1e6:.3f}M rows/s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Vectorized ZScore/Rolling detectors vs the previous per-row loops.
+
+    PYTHONPATH=src python benchmarks/bench_detectors.py --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from infrastructure.detectors.zscore import ZScoreDetector
+from infrastructure.detectors.rolling import RollingDetector
+
+
+def zscore_loop(s, threshold):
+    mean = s.mean()
+    std = s.std(ddof=0)
+    anomalies = pd.Series(0.0, index=s.index, name="severity")
+    for i, x in s.items():
+        abs_dev = abs(x - mean)
+        if std < 1e-6:
+            if abs_dev > threshold:
+                anomalies[i] = abs_dev
+            continue
+        z = abs_dev / std
+        if z > threshold or abs_dev > threshold:
+            anomalies[i] = z
+    return anomalies
+
+
+def rolling_loop(s, window, z_threshold):
+    rmean = s.rolling(window, min_periods=1).mean()
+    rstd = s.rolling(window, min_periods=1).std(ddof=0)
+    anomalies = pd.Series(0.0, index=s.index, name="severity")
+    for i in s.index:
+        m, std, x = rmean[i], rstd[i], s[i]
+        abs_dev = abs(x - m)
+        if std == 0 or std < 1e-6:
+            if abs_dev > z_threshold:
+                anomalies[i] = abs_dev
+            continue
+        z = abs_dev / std
+        if z > z_threshold or abs_dev > z_threshold:
+            anomalies[i] = z if z > 0 else abs_dev
+    return anomalies
+
+
+def _time(fn, repeat=1):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--anomaly-rate", type=float, default=0.001)
+    parser.add_argument("--min-speedup", type=float, default=50.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    values = rng.normal(10.0, 1.0, args.rows)
+    idx = rng.random(args.rows) < args.anomaly_rate
+    values[idx] += rng.normal(0.0, 20.0, int(idx.sum()))
+    s = pd.Series(values)
+
+    cases = [
+        ("zscore", lambda: ZScoreDetector(threshold=3.0).detect(s).anomalies,
+         lambda: zscore_loop(s, 3.0)),
+        ("rolling", lambda: RollingDetector(window=3, z_threshold=2.0).detect(s).anomalies,
+         lambda: rolling_loop(s, 3, 2.0)),
+    ]
+
+    failed = False
+    for name, fast, slow in cases:
+        t_fast, a = _time(fast, repeat=3)
+        t_slow, b = _time(slow)
+        pd.testing.assert_series_equal(a, b)
+        speedup = t_slow / t_fast
+        print(f"{name:8s} rows={args.rows} loop={t_slow:.3f}s vectorized={t_fast:.4f}s speedup={speedup:.0f}x")
+        failed |= speedup < args.min_speedup
+
+    if failed:
+        raise SystemExit(f"speedup below {args.min_speedup}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Timestamp parsing: ensure_datetime vs plain pd.to_datetime (the previous implementation).
+
+    PYTHONPATH=src python benchmarks/bench_ensure_datetime.py --rows 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline.utils import ensure_datetime
+
+FORMATS = {
+    "iso_space": "%Y-%m-%d %H:%M:%S",
+    "iso_t_frac": "%Y-%m-%dT%H:%M:%S.%f",
+    "iso_offset": "%Y-%m-%dT%H:%M:%S+00:00",
+    "iso_z": "%Y-%m-%dT%H:%M:%SZ",
+    "day_first": "%d/%m/%Y %H:%M:%S",
+}
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    ts = pd.Series(pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(args.rows), unit="s"))
+
+    def cases():
+        # one column at a time: 10M object strings are ~1 GB each
+        for name, fmt in FORMATS.items():
+            yield name, ts.dt.strftime(fmt).astype(object)
+        yield "epoch_s", (ts - pd.Timestamp(0)) // pd.Timedelta(1, "s")
+
+    print(f"{'case':<12} {'to_datetime':>12} {'ensure_dt':>10} {'speedup':>8}")
+    for name, s in cases():
+        try:
+            base, _ = best_of(lambda: pd.to_datetime(s, utc=False), args.repeat)
+            base_s = f"{base:11.3f}s"
+        except ValueError:
+            # pandas infers the format from the first value; day-first dates past the 12th then fail
+            base, base_s = None, f"{'error':>12}"
+        fast, out = best_of(lambda: ensure_datetime(s, source=name), args.repeat)
+        assert out.dtype.kind == "M"
+        speedup = f"{base / fast:7.1f}x" if base else f"{'-':>8}"
+        print(f"{name:<12} {base_s} {fast:9.3f}s {speedup}")
+
+
+if __name__ == "__main__":
+    main()
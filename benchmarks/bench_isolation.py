@@ -0,0 +1,65 @@
+"""Per-file IsolationForest refit vs the per-sensor model cache (cold fit, then warm scoring).
+
+    PYTHONPATH=src python benchmarks/bench_isolation.py --sensors 5000 --points 1000 --n-jobs -1
+
+The refit baseline is timed on --baseline-sensors sensors and extrapolated
+linearly (it is a plain per-sensor loop) to keep the run short.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from pipeline.anomaly import IsolationModelCache, detect_anomalies_isolation
+
+
+def synthetic(sensors, points, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'sensor_id': np.tile(np.arange(sensors), points),
+        'value': rng.standard_t(3, sensors * points) + np.tile(np.arange(sensors) % 17, points),
+    })
+
+
+def refit_loop(df, contamination=0.01):
+    out = df.copy()
+    out['anomaly'] = 0
+    for _, g in df.groupby('sensor_id'):
+        preds = IsolationForest(contamination=contamination, random_state=42).fit_predict(
+            g['value'].to_numpy().reshape(-1, 1))
+        out.loc[g.index, 'anomaly'] = (preds == -1).astype(int)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sensors', type=int, default=5000)
+    ap.add_argument('--points', type=int, default=1000)
+    ap.add_argument('--batches', type=int, default=3)
+    ap.add_argument('--baseline-sensors', type=int, default=50)
+    ap.add_argument('--n-jobs', type=int, default=-1)
+    args = ap.parse_args()
+
+    sample = min(args.baseline_sensors, args.sensors)
+    t0 = time.perf_counter()
+    refit_loop(synthetic(sample, args.points, 0))
+    per_sensor = (time.perf_counter() - t0) / sample
+    baseline = per_sensor * args.sensors
+    print(f"refit per file      : {baseline:9.2f} s  (extrapolated from {sample} sensors)")
+
+    cache = IsolationModelCache(max_models=args.sensors, retrain_every=None, drift_threshold=3.0,
+                                n_jobs=args.n_jobs)
+    for b in range(args.batches):
+        df = synthetic(args.sensors, args.points, b)
+        t0 = time.perf_counter()
+        out = detect_anomalies_isolation(df, cache=cache)
+        dt = time.perf_counter() - t0
+        label = 'cold (fit)' if b == 0 else f'warm batch {b}'
+        print(f"cache {label:<14}: {dt:9.2f} s  ({baseline / dt:7.1f}x, {cache.fits} fits, "
+              f"{int(out['anomaly'].sum())} anomalies)")
+
+
+if __name__ == '__main__':
+    main()
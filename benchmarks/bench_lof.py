@@ -0,0 +1,47 @@
+"""sklearn LocalOutlierFactor vs the sorted-array exact 1-D LOF and reference-sample scoring.
+
+    PYTHONPATH=src python benchmarks/bench_lof.py --rows 100000
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.neighbors import LocalOutlierFactor
+
+from infrastructure.detectors.lof import LOFDetector, SortedLOF
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=100_000)
+    ap.add_argument('--neighbors', type=int, default=20)
+    ap.add_argument('--reference-size', type=int, default=10_000)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    x = np.r_[rng.normal(0, 1, args.rows - args.rows // 100), rng.normal(0, 15, args.rows // 100)]
+
+    def sk():
+        clf = LocalOutlierFactor(n_neighbors=args.neighbors).fit(x.reshape(-1, 1))
+        return -clf.negative_outlier_factor_
+
+    t_sk, ref = timed(sk)
+    t_sorted, got = timed(lambda: SortedLOF(args.neighbors).fit(x).fit_scores())
+    print(f"sklearn LOF        : {t_sk:8.3f}s")
+    print(f"sorted exact LOF   : {t_sorted:8.3f}s  ({t_sk / t_sorted:5.1f}x, max |diff| {np.abs(got - ref).max():.2e})")
+
+    det = LOFDetector(n_neighbors=args.neighbors, reference_size=args.reference_size)
+    t_first, _ = timed(lambda: det.detect(x))
+    t_next, _ = timed(lambda: det.detect(x))
+    print(f"reference fit+score: {t_first:8.3f}s  (sample of {args.reference_size})")
+    print(f"reference score    : {t_next:8.3f}s  ({t_sk / t_next:5.1f}x, no refit)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Exact vs sketch-based (approx=True) MADDetector on large windows.
+
+    PYTHONPATH=src python benchmarks/bench_mad.py --rows 20000000 100000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from infrastructure.detectors.mad import MADDetector
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, nargs='+', default=[10_000_000, 50_000_000])
+    ap.add_argument('--epsilon', type=float, default=0.005)
+    ap.add_argument('--chunks', type=int, default=8)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    for rows in args.rows:
+        s = pd.Series(rng.standard_t(3, rows))
+        exact_det = MADDetector(threshold=3.5)
+        approx_det = MADDetector(threshold=3.5, approx=True, epsilon=args.epsilon, seed=0)
+
+        t0 = time.perf_counter()
+        exact = exact_det.detect(s).anomalies.to_numpy() > 0
+        t_exact = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        approx = approx_det.detect(s).anomalies.to_numpy() > 0
+        t_approx = time.perf_counter() - t0
+
+        # per-chunk sketches merged, as chunked ETL or worker processes would
+        t0 = time.perf_counter()
+        parts = np.array_split(s.to_numpy(), args.chunks)
+        merged = approx_det.sketch(parts[0])
+        for part in parts[1:]:
+            merged.merge(approx_det.sketch(part))
+        t_sketch = time.perf_counter() - t0
+
+        print(f"rows={rows:>11} exact={t_exact:7.3f}s approx={t_approx:7.3f}s "
+              f"({t_exact / t_approx:4.1f}x, flags differ on {(exact != approx).mean():.5%}) "
+              f"chunked sketch={t_sketch:6.3f}s")
+
+
+if __name__ == '__main__':
+    main()
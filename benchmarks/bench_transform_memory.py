@@ -0,0 +1,66 @@
+"""Peak RSS of extract + transform, default vs low_memory, each in a fresh process.
+
+    PYTHONPATH=src python benchmarks/bench_transform_memory.py --rows 50000000 --sensors 1000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def write_csv(path, rows, sensors, block=5_000_000):
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp("2025-01-01")
+    for lo in range(0, rows, block):
+        n = min(block, rows - lo)
+        idx = np.arange(lo, lo + n)
+        df = pd.DataFrame({"ts": start + pd.to_timedelta(idx // sensors, unit="s"),
+                           "sensor_id": idx % sensors,
+                           "value": np.where(rng.random(n) < 0.01, np.nan, rng.normal(50, 5, n))})
+        df.to_csv(path, index=False, header=lo == 0, mode="w" if lo == 0 else "a")
+
+
+def child(path, low_memory):
+    from pipeline.etl import extract, transform
+    from pipeline.profiling import peak_rss_bytes
+    base = peak_rss_bytes()
+    t0 = time.perf_counter()
+    df = transform(extract(path, low_memory=low_memory), low_memory=low_memory)
+    elapsed = time.perf_counter() - t0
+    print(peak_rss_bytes() - base, df.memory_usage(index=True, deep=False).sum(), elapsed)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000_000)
+    ap.add_argument("--sensors", type=int, default=1000)
+    ap.add_argument("--csv", default=None, help="reuse an existing CSV instead of generating one")
+    ap.add_argument("--child", choices=["default", "low_memory"], help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(args.csv, args.child == "low_memory")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv
+        if path is None:
+            path = os.path.join(tmp, "bench.csv")
+            t0 = time.perf_counter()
+            write_csv(path, args.rows, args.sensors)
+            print(f"wrote {args.rows:,} rows ({os.path.getsize(path) / 2**20:.0f} MiB) in {time.perf_counter() - t0:.1f}s")
+        peaks = {}
+        for mode in ("default", "low_memory"):
+            out = subprocess.run([sys.executable, __file__, "--child", mode, "--csv", path],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            peak, frame, elapsed = int(out[0]), int(out[1]), float(out[2])
+            peaks[mode] = peak
+            print(f"{mode:11s} peak RSS {peak / 2**20:9.0f} MiB  result {frame / 2**20:8.0f} MiB  {elapsed:7.1f}s")
+        print(f"peak RSS reduction: {peaks['default'] / peaks['low_memory']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
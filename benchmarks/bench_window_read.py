@@ -0,0 +1,65 @@
+"""read_window latency vs window size and total data size (indexed vs full-file read).
+
+    PYTHONPATH=src python benchmarks/bench_window_read.py --rows 1000000 4000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from infrastructure.repository.clickhouse_stub import ClickHouseRepositoryStub
+
+WINDOWS = ['1h', '6h', '1D', '7D']
+
+
+def synthetic(rows, sensors):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'ts': pd.date_range('2025-01-01', periods=rows, freq='s'),
+        'sensor_id': np.arange(rows) % sensors,
+        'value': rng.normal(0, 1, rows),
+    })
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 4_000_000])
+    ap.add_argument('--sensors', type=int, default=50)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'rows':>10} {'window':>7} {'out_rows':>9} {'indexed_ms':>11} {'full_ms':>9}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'data'))
+            df = synthetic(rows, args.sensors)
+            df.to_csv(os.path.join(root, 'data', 'series.csv'), index=False)
+            indexed = ClickHouseRepositoryStub(repo_root=root)
+            full = ClickHouseRepositoryStub(repo_root=root, indexed=False)
+
+            t0 = time.perf_counter()
+            indexed.read_window(start=df['ts'].iloc[0], end=df['ts'].iloc[0])
+            print(f"{rows:>10} {'build':>7} {0:>9} {1000 * (time.perf_counter() - t0):>11.1f} {'':>9}")
+            full_time, _ = best_of(full.read_window, 1)
+
+            start = df['ts'].iloc[rows // 2]
+            for w in WINDOWS:
+                end = start + pd.Timedelta(w)
+                t, out = best_of(lambda: indexed.read_window(start=start, end=end), args.repeat)
+                print(f"{rows:>10} {w:>7} {len(out):>9} {1000 * t:>11.2f} {1000 * full_time:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
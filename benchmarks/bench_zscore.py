@@ -0,0 +1,61 @@
+"""detect_anomalies_zscore: per-sensor groupby loop vs the single-pass segment version.
+
+    PYTHONPATH=src python benchmarks/bench_zscore.py --sensors 100000 --points 50
+
+The loop baseline is timed on --baseline-sensors sensors and extrapolated
+linearly (one groupby iteration and one .loc write per sensor).
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline.anomaly import _modified_z_scores, detect_anomalies_zscore
+
+
+def synthetic(sensors, points, seed=0):
+    rng = np.random.default_rng(seed)
+    n = sensors * points
+    return pd.DataFrame({
+        'sensor_id': rng.permutation(np.tile(np.arange(sensors), points)),
+        'value': rng.standard_t(3, n),
+    })
+
+
+def loop(df, z_thresh=3.5):
+    df = df.copy()
+    df['anomaly'] = 0
+    for _, g in df.groupby('sensor_id'):
+        if len(g) < 2:
+            continue
+        mask = np.abs(_modified_z_scores(g['value'].astype(float).values)) > z_thresh
+        df.loc[g.index, 'anomaly'] = mask.astype(int)
+    return df
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sensors', type=int, default=100_000)
+    ap.add_argument('--points', type=int, default=50)
+    ap.add_argument('--baseline-sensors', type=int, default=2_000)
+    args = ap.parse_args()
+
+    df = synthetic(args.sensors, args.points)
+    t0 = time.perf_counter()
+    out = detect_anomalies_zscore(df)
+    fast = time.perf_counter() - t0
+
+    small = synthetic(args.baseline_sensors, args.points, seed=1)
+    t0 = time.perf_counter()
+    expected = loop(small)
+    base = (time.perf_counter() - t0) * args.sensors / args.baseline_sensors
+    assert (detect_anomalies_zscore(small)['anomaly'] == expected['anomaly']).all()
+
+    print(f'{args.sensors} sensors x {args.points} points, {int(out["anomaly"].sum())} anomalies')
+    print(f'groupby loop (extrapolated) {base:8.2f}s')
+    print(f'single pass                 {fast:8.2f}s   {base / fast:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
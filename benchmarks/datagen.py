@@ -0,0 +1,24 @@
+"""Synthetic sensor data for the benchmarks: sensors x points with injected anomalies."""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_frame(sensors: int = 100, points: int = 1000, anomaly_rate: float = 0.001,
+                    seed: int = 0, freq: str = "s") -> pd.DataFrame:
+    # every sensor reports `points` readings on a shared clock; sensors get different levels/noise
+    rng = np.random.default_rng(seed)
+    rows = sensors * points
+    level = rng.uniform(0, 100, sensors)
+    scale = rng.uniform(0.5, 2.0, sensors)
+    sensor_id = np.tile(np.arange(sensors), points)
+    value = level[sensor_id] + rng.normal(0, 1, rows) * scale[sensor_id]
+    hit = rng.random(rows) < anomaly_rate
+    value[hit] += rng.choice([-1, 1], int(hit.sum())) * rng.uniform(8, 20, int(hit.sum())) * scale[sensor_id[hit]]
+    ts = pd.Timestamp("2025-01-01") + pd.to_timedelta(np.repeat(np.arange(points), sensors), unit=freq)
+    return pd.DataFrame({"ts": ts, "sensor_id": sensor_id, "value": value})
+
+
+def write_csv(path: str, sensors: int = 100, points: int = 1000, anomaly_rate: float = 0.001,
+              seed: int = 0) -> str:
+    synthetic_frame(sensors, points, anomaly_rate, seed).to_csv(path, index=False)
+    return path
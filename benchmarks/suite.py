@@ -0,0 +1,237 @@
+"""Benchmark suite for the pipeline hot paths; results are written as JSON per commit.
+
+    PYTHONPATH=src python benchmarks/suite.py run --sensors 100 --points 10000
+    PYTHONPATH=src python benchmarks/suite.py run --filter detector.
+    PYTHONPATH=src python benchmarks/suite.py compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Every case has a setup (not timed) and a body timed --repeat times after
+one warm-up call; min/median/mean seconds and rows/s are recorded.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from datagen import synthetic_frame
+
+CASES: Dict[str, Callable] = {}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+# each case gets the params namespace and a scratch dir, returns (body, rows)
+
+@case("etl.extract_from_csv")
+def _extract(p, tmp):
+    from pipeline.etl import extract_from_csv
+    path = os.path.join(tmp, "extract.csv")
+    p.frame.to_csv(path, index=False)
+    return lambda: extract_from_csv(path), len(p.frame)
+
+
+@case("etl.transform")
+def _transform(p, tmp):
+    from pipeline.etl import transform
+    raw = p.frame.assign(ts=p.frame["ts"].astype(str))
+    return lambda: transform(raw), len(raw)
+
+
+def _detector_case(factory):
+    def build(p, tmp):
+        det = factory()
+        return lambda: det.detect(p.frame), len(p.frame)
+    return build
+
+
+def _register_detectors():
+    from infrastructure.detectors.lof import LOFDetector
+    from infrastructure.detectors.mad import MADDetector
+    from infrastructure.detectors.rolling import RollingDetector
+    from infrastructure.detectors.zscore import ZScoreDetector
+    case("detector.zscore")(_detector_case(lambda: ZScoreDetector(threshold=3.0)))
+    case("detector.mad")(_detector_case(lambda: MADDetector(threshold=3.5)))
+    case("detector.mad_approx")(_detector_case(lambda: MADDetector(threshold=3.5, approx=True, seed=0)))
+    case("detector.rolling")(_detector_case(lambda: RollingDetector(window=10, z_threshold=3.0)))
+    case("detector.lof")(_detector_case(lambda: LOFDetector(n_neighbors=20)))
+
+
+_register_detectors()
+
+
+@case("anomaly.detect_anomalies_zscore")
+def _anomalies_zscore(p, tmp):
+    from pipeline.anomaly import detect_anomalies_zscore
+    return lambda: detect_anomalies_zscore(p.frame), len(p.frame)
+
+
+@case("anomaly.detect_anomalies_isolation")
+def _anomalies_isolation(p, tmp):
+    # per-sensor forest fitting is slow; benchmark a capped number of sensors
+    from pipeline.anomaly import detect_anomalies_isolation
+    df = p.frame[p.frame["sensor_id"] < p.isolation_sensors]
+    return lambda: detect_anomalies_isolation(df), len(df)
+
+
+@case("anomaly.detect_anomalies_isolation_cached")
+def _anomalies_isolation_cached(p, tmp):
+    from pipeline.anomaly import IsolationModelCache, detect_anomalies_isolation
+    df = p.frame[p.frame["sensor_id"] < p.isolation_sensors]
+    cache = IsolationModelCache()
+    detect_anomalies_isolation(df, cache=cache)
+    return lambda: detect_anomalies_isolation(df, cache=cache), len(df)
+
+
+@case("anomaly.detect_anomalies_streaming")
+def _anomalies_streaming(p, tmp):
+    from infrastructure.detectors.streaming import StreamingDetectorSet
+    from pipeline.anomaly import detect_anomalies_streaming
+    return lambda: detect_anomalies_streaming(p.frame, StreamingDetectorSet()), len(p.frame)
+
+
+@case("db.write_timeseries")
+def _write_timeseries(p, tmp):
+    from bench_db import start_stub
+    from pipeline import db
+    server = start_stub()
+    db.CLICKHOUSE_URL = f"http://127.0.0.1:{server.server_port}"
+    p.cleanup.append(server.shutdown)
+    return lambda: db.write_timeseries(p.frame), len(p.frame)
+
+
+@case("service.run_once")
+def _run_once(p, tmp):
+    from application.service import AnomalyDetectionService
+    from infrastructure.detectors.mad import MADDetector
+    from infrastructure.detectors.rolling import RollingDetector
+    from infrastructure.detectors.zscore import ZScoreDetector
+    from infrastructure.repository.clickhouse_stub import ClickHouseRepositoryStub
+    os.makedirs(os.path.join(tmp, "data"), exist_ok=True)
+    p.frame.to_csv(os.path.join(tmp, "data", "window.csv"), index=False)
+    repo = ClickHouseRepositoryStub(repo_root=tmp)
+    svc = AnomalyDetectionService(repo, [ZScoreDetector(), MADDetector(), RollingDetector(window=10)],
+                                  group_by_sensor=True)
+    repo.persist_report = lambda report: None
+    return svc.run_once, len(p.frame)
+
+
+def _timed(body, repeat):
+    body()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def run(args) -> dict:
+    params = argparse.Namespace(**vars(args))
+    params.frame = synthetic_frame(args.sensors, args.points, args.anomaly_rate, args.seed)
+    params.cleanup = []
+    names = [n for n in CASES if not args.filter or any(f in n for f in args.filter)]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            try:
+                body, rows = CASES[name](params, tmp)
+                times = _timed(body, args.repeat)
+            except Exception as e:
+                print(f"{name:45s} FAILED: {e}")
+                results[name] = {"error": str(e)}
+                continue
+            best = min(times)
+            results[name] = {"rows": rows, "min": best, "median": statistics.median(times),
+                             "mean": statistics.fmean(times), "repeat": args.repeat,
+                             "rows_per_s": rows / best if best > 0 else None}
+            print(f"{name:45s} {best * 1e3:10.2f} ms  {rows / best / 1e6:8.2f} M rows/s")
+        for fn in params.cleanup:
+            fn()
+
+    return {
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {"sensors": args.sensors, "points": args.points, "anomaly_rate": args.anomaly_rate,
+                   "seed": args.seed, "repeat": args.repeat, "isolation_sensors": args.isolation_sensors},
+        "machine": {"python": sys.version.split()[0], "platform": platform.platform(),
+                    "cpus": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__},
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict, threshold: float) -> List[str]:
+    regressions = []
+    print(f"{'case':45s} {old['commit']:>10s} {new['commit']:>10s}   change")
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        a, b = old["results"].get(name, {}), new["results"].get(name, {})
+        if "min" not in a or "min" not in b:
+            print(f"{name:45s} {'-':>10s} {'-':>10s}")
+            continue
+        change = b["min"] / a["min"] - 1.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:45s} {a['min'] * 1e3:8.2f}ms {b['min'] * 1e3:8.2f}ms {change:+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("--sensors", type=int, default=100)
+    r.add_argument("--points", type=int, default=10_000)
+    r.add_argument("--anomaly-rate", type=float, default=0.001)
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--repeat", type=int, default=5)
+    r.add_argument("--isolation-sensors", type=int, default=10)
+    r.add_argument("--filter", nargs="*", default=None, help="only cases whose name contains one of these")
+    r.add_argument("--output", default=None, help="JSON path (default: benchmarks/results/<commit>.json)")
+    c = sub.add_parser("compare")
+    c.add_argument("old")
+    c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as regression")
+    args = ap.parse_args()
+
+    if args.cmd == "run":
+        report = run(args)
+        out = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"results: {out}")
+    else:
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        if compare(old, new, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,12 @@ CREATE TABLE IF NOT EXISTS pipeline.timeseries
     value Float64
 )
 ENGINE = MergeTree()
-ORDER BY ts;
+ORDER BY ts
+-- a plain MergeTree honours the async writer's insert_deduplication_token
+-- only within this window of recent inserts
+SETTINGS non_replicated_deduplication_window = 1000;
+
+ALTER TABLE pipeline.timeseries MODIFY SETTING non_replicated_deduplication_window = 1000;
 
 CREATE DATABASE IF NOT EXISTS anomaly_demo;
 
@@ -16,9 +21,14 @@ CREATE TABLE IF NOT EXISTS anomaly_demo.anomaly_reports
     generated_at DateTime DEFAULT now(),
     window_start DateTime,
     window_end DateTime,
+    sensor_id Nullable(Int64),
     severity Float64,
     severity_level String,
-    anomalies_count UInt64
+    anomalies_count UInt64,
+    detector_stats String DEFAULT '{}'
 )
 ENGINE = MergeTree()
 ORDER BY (generated_at);
+
+ALTER TABLE anomaly_demo.anomaly_reports ADD COLUMN IF NOT EXISTS sensor_id Nullable(Int64) AFTER window_end;
+ALTER TABLE anomaly_demo.anomaly_reports ADD COLUMN IF NOT EXISTS detector_stats String DEFAULT '{}';
@@ -15,5 +15,6 @@ class DetectorConfig(BaseModel):
 class PipelineConfig(BaseModel):
     clickhouse: ClickHouseConfig = ClickHouseConfig()
     window: Dict[str, str] = Field(default_factory=lambda: {'duration': '1h', 'step': '5m'})
+    executor: Dict[str, Any] = Field(default_factory=lambda: {'mode': 'serial'})
     detectors: List[Dict[str, Any]] = Field(default_factory=list)
     sinks: List[Dict[str, Any]] = Field(default_factory=lambda: [{'type': 'stdout'}])
@@ -0,0 +1,303 @@
+import gc
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from domain.models import DetectionResult
+from domain.prepared import PreparedInput
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("serial", "thread", "process", "auto")
+
+
+def _report_pid(pids) -> None:
+    # worker initializer: lets the executor terminate its own workers without pool internals
+    pids.put(os.getpid())
+
+
+def _name(det) -> str:
+    return getattr(det, "name", det.__class__.__name__)
+
+
+def _segment_keys(df: pd.DataFrame, order, starts, prepared: Optional[PreparedInput] = None) -> list:
+    if prepared is not None and prepared.sensor_codes is not None:
+        codes, uniques = prepared.sensor_codes
+        return [uniques[c] for c in codes[order[starts]]]
+    if "sensor_id" not in df.columns:
+        return [None] * len(starts)
+    return list(df["sensor_id"].to_numpy()[order[starts]])
+
+
+def detect_grouped(det, df: pd.DataFrame, layout, prepared: Optional[PreparedInput] = None) -> DetectionResult:
+    order, starts = layout
+    if prepared is not None:
+        values = prepared.sorted_values
+    elif hasattr(det, "_to_series"):
+        values = det._to_series(df).to_numpy(dtype=float)[order]
+    else:
+        values = pd.to_numeric(df["value"], errors="coerce").fillna(0.0).to_numpy(dtype=float)[order]
+
+    if hasattr(det, "detect_grouped"):
+        sev_sorted = np.asarray(det.detect_grouped(values, starts), dtype=float)
+    else:
+        # detectors without a segment kernel still see one sensor at a time
+        bounds = np.r_[starts, len(values)]
+        keys = _segment_keys(df, order, starts, prepared) if getattr(det, "stateful", False) else None
+        parts = []
+        for j, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            series = pd.Series(values[lo:hi])
+            # stateful detectors keep their state per sensor
+            raw = det.detect(series) if keys is None else det.detect(series, key=keys[j])
+            part = raw.anomalies if isinstance(raw, DetectionResult) else raw
+            parts.append(np.asarray(part, dtype=float))
+        sev_sorted = np.concatenate(parts) if parts else np.zeros(0)
+
+    sev = np.empty_like(sev_sorted)
+    sev[order] = sev_sorted
+    anomalies = pd.Series(sev, index=df.index, name="severity")
+    return DetectionResult(anomalies, float(sev.sum()))
+
+
+def run_detector(det, df: pd.DataFrame, layout=None, prepared: Optional[PreparedInput] = None):
+    # detectors with accepts_prepared share one PreparedInput; the rest get the frame
+    if not getattr(det, "accepts_prepared", False):
+        prepared = None
+    if layout is None:
+        return det.detect(prepared if prepared is not None else df)
+    return detect_grouped(det, df, layout, prepared)
+
+
+class SharedFrame:
+    """Numeric and datetime columns of a frame copied once into one shared-memory block.
+
+    Worker processes attach by name and get read-only views; nothing but the
+    block name and the column offsets is pickled per task.
+    """
+
+    def __init__(self, df: pd.DataFrame, extra: Optional[Dict[str, np.ndarray]] = None):
+        from multiprocessing import shared_memory
+
+        arrays = {}
+        for c in df.columns:
+            dtype = df[c].dtype
+            if isinstance(dtype, np.dtype) and dtype.kind in "biufM":
+                arrays[c] = df[c].to_numpy()
+        for k, v in (extra or {}).items():
+            arrays[k] = np.asarray(v)
+
+        columns, offset = [], 0
+        for name, arr in arrays.items():
+            columns.append((name, arr.dtype.str, offset, len(arr)))
+            offset += -(-arr.nbytes // 8) * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        for (name, dtype, off, n), arr in zip(columns, arrays.values()):
+            np.ndarray(n, dtype=dtype, buffer=self.shm.buf, offset=off)[:] = arr
+        self.spec = (self.shm.name, len(df), [c for c in columns if c[0] not in (extra or {})],
+                     [c for c in columns if c[0] in (extra or {})])
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    @staticmethod
+    def attach(spec):
+        from multiprocessing import shared_memory
+
+        name, n_rows, columns, extra = spec
+        shm = shared_memory.SharedMemory(name=name)
+
+        def view(dtype, off, n):
+            arr = np.ndarray(n, dtype=dtype, buffer=shm.buf, offset=off)
+            arr.flags.writeable = False
+            return arr
+
+        frame = pd.DataFrame({c: view(d, off, n) for c, d, off, n in columns}, index=pd.RangeIndex(n_rows), copy=False)
+        arrays = {c: view(d, off, n) for c, d, off, n in extra}
+        return shm, frame, arrays
+
+
+def _detect_shared(det, spec, grouped: bool) -> bytes:
+    shm, frame, arrays = SharedFrame.attach(spec)
+    try:
+        layout = (arrays["__order__"], arrays["__starts__"]) if grouped else None
+        prepared = PreparedInput.from_any(frame)
+        if layout is not None:
+            prepared.memo("layout", lambda: layout)
+        # pickle before detaching: results may still be views of the shared block
+        return pickle.dumps(run_detector(det, frame, layout, prepared), protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        frame = arrays = prepared = layout = None
+        gc.collect()
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+class DetectorExecutor:
+    """Runs the detectors of one window serially, on threads or on processes.
+
+    thread: NumPy/pandas/sklearn detectors that release the GIL share the frame
+    directly. process: the frame's numeric columns are placed in shared memory
+    once per run. auto: detectors with `releases_gil = True` go to the thread
+    pool, the rest to the process pool. Each detector gets its own timeout
+    (detector `timeout` attribute, then `timeouts[name]`, then `timeout`);
+    a detector that times out or fails yields None. Results always come back
+    in detector order. serial mode cannot preempt and ignores timeouts.
+    Detectors with `stateful = True` keep state between windows and never go
+    to the process pool; they run on a thread instead.
+    """
+
+    def __init__(self, mode: str = "serial", max_workers: Optional[int] = None,
+                 timeout: Optional[float] = None, timeouts: Optional[Dict[str, float]] = None):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"unknown executor mode {mode!r}, expected one of {EXECUTOR_MODES}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self._threads = None
+        self._processes = None
+        self._pids = None
+        # seconds per detector name for the last run(); pooled modes measure submit -> result
+        self.durations: Dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]):
+        cfg = dict(cfg or {})
+        return cls(mode=cfg.pop("mode", "serial"), **cfg)
+
+    def _timeout_for(self, det) -> Optional[float]:
+        t = getattr(det, "timeout", None)
+        if t is None:
+            t = self.timeouts.get(_name(det))
+        return self.timeout if t is None else t
+
+    def _thread_pool(self):
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="detector")
+        return self._threads
+
+    def _process_pool(self):
+        if self._processes is None:
+            self._pids = multiprocessing.SimpleQueue()
+            self._processes = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                  initializer=_report_pid, initargs=(self._pids,))
+        return self._processes
+
+    def _mode_for(self, det) -> str:
+        if getattr(det, "stateful", False) and self.mode in ("auto", "process"):
+            # state fitted in a worker process would be lost with the window
+            return "thread"
+        if self.mode != "auto":
+            return self.mode
+        return "thread" if getattr(det, "releases_gil", False) else "process"
+
+    def run(self, detectors, df: pd.DataFrame, layout=None, prepared: Optional[PreparedInput] = None) -> List[tuple]:
+        detectors = list(detectors)
+        modes = [self._mode_for(d) for d in detectors]
+        self.durations = {}
+        if self.mode == "serial" or len(detectors) == 0:
+            results = []
+            for det in detectors:
+                t0 = time.perf_counter()
+                results.append((det, self._call(det, lambda: run_detector(det, df, layout, prepared))))
+                self.durations[_name(det)] = time.perf_counter() - t0
+            return results
+
+        shared = None
+        futures = []
+        try:
+            for det, mode in zip(detectors, modes):
+                if mode == "process":
+                    if shared is None:
+                        extra = {"__order__": layout[0], "__starts__": layout[1]} if layout is not None else None
+                        shared = SharedFrame(df, extra)
+                    fut = self._process_pool().submit(_detect_shared, det, shared.spec, layout is not None)
+                else:
+                    fut = self._thread_pool().submit(run_detector, det, df, layout, prepared)
+                futures.append((det, mode, fut, time.monotonic()))
+                fut.add_done_callback(partial(self._record, _name(det), time.perf_counter()))
+
+            results, timed_out = [], set()
+            for det, mode, fut, submitted in futures:
+                timeout = self._timeout_for(det)
+                remaining = None if timeout is None else max(0.0, submitted + timeout - time.monotonic())
+                raw = self._call(det, lambda: fut.result(timeout=remaining))
+                if raw is None and not fut.done():
+                    timed_out.add(mode)
+                    logger.warning("Detector %s timed out after %.1fs", getattr(det, "name", det), timeout)
+                if mode == "process" and isinstance(raw, bytes):
+                    raw = self._relabel(pickle.loads(raw), df.index)
+                results.append((det, raw))
+        finally:
+            if shared is not None:
+                shared.close()
+
+        # a timed-out task keeps its worker busy; start the next run on a fresh pool
+        if "thread" in timed_out:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if "process" in timed_out:
+            self._kill_processes()
+        return results
+
+    def _record(self, name: str, submitted: float, fut):
+        self.durations[name] = time.perf_counter() - submitted
+
+    @staticmethod
+    def _relabel(raw, index: pd.Index):
+        # the shared frame has a RangeIndex; give results back the caller's row labels
+        if isinstance(raw, DetectionResult) and isinstance(raw.anomalies, pd.Series) and len(raw.anomalies) == len(index):
+            raw.anomalies.index = index
+        elif isinstance(raw, pd.Series) and len(raw) == len(index):
+            raw.index = index
+        return raw
+
+    @staticmethod
+    def _call(det, fn):
+        try:
+            return fn()
+        except FutureTimeout:
+            return None
+        except Exception as e:
+            logger.exception("Detector %s failed: %s", getattr(det, "__class__", det), e)
+            return None
+
+    def _worker_pids(self) -> List[int]:
+        pids = []
+        while self._pids is not None and not self._pids.empty():
+            pids.append(self._pids.get())
+        return pids
+
+    def _kill_processes(self):
+        pool, self._processes = self._processes, None
+        if pool is None:
+            return
+        for pid in self._worker_pids():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+        self._pids.close()
+        self._pids = None
+
+    def close(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+            self._processes = None
+            self._pids.close()
+            self._pids = None
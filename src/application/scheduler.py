@@ -0,0 +1,166 @@
+import logging
+import time
+from typing import Callable, List, Optional
+import numpy as np
+import pandas as pd
+
+from domain.models import AnomalyReport, DetectionResult
+from domain.prepared import prepare
+from .windowing import PaneAggregator, parse_duration
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindowScheduler:
+    """Evaluates overlapping windows of `duration` every `step`.
+
+    Each step reads only the newest pane, appends it to the PaneAggregator
+    and evicts the pane that fell out of the window. A window's report covers
+    the rows of its newest pane (older rows were reported by earlier windows)
+    scored against statistics of the whole window. Detectors exposing
+    `detect_with_stats` are scored from the pane summaries alone, approximate
+    detectors with `sketch`/`detect_with_sketch` (MAD with approx: true, not
+    grouped by sensor) from the merge of per-pane sketches; the others see
+    the concatenated window frame, i.e. re-score the whole window every step.
+    """
+
+    def __init__(self, service, duration="1h", step="5m", detectors=None):
+        self.service = service
+        self.detectors = service.detectors if detectors is None else detectors
+        self.panes = PaneAggregator(duration, step, by_sensor=getattr(service, "group_by_sensor", False))
+        for det in self.detectors:
+            if not hasattr(det, "detect_with_stats") and not self._mergeable(det):
+                logger.warning("Detector %s has no pane-mergeable state: the whole %s window is re-scored every %s",
+                               getattr(det, "name", det.__class__.__name__), self.duration, self.step_size)
+
+    @classmethod
+    def from_config(cls, service, window: Optional[dict] = None, detectors=None):
+        window = window or {}
+        return cls(service, window.get("duration", "1h"), window.get("step", "5m"), detectors)
+
+    @property
+    def duration(self) -> pd.Timedelta:
+        return self.panes.duration
+
+    @property
+    def step_size(self) -> pd.Timedelta:
+        return self.panes.step
+
+    @staticmethod
+    def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+        if df is None or df.empty or "timestamp" not in df.columns:
+            return pd.DataFrame() if df is None else df
+        ts = pd.to_datetime(df["timestamp"])
+        if not ts.is_monotonic_increasing:
+            df = df.iloc[np.argsort(ts.to_numpy(), kind="stable")]
+        return df.reset_index(drop=True)
+
+    def _split(self, df: pd.DataFrame, ends: List[pd.Timestamp]):
+        # one read covering several panes, cut at pane boundaries by binary search
+        if df.empty or "timestamp" not in df.columns:
+            return [df.iloc[0:0]] * len(ends)
+        ts = pd.DatetimeIndex(pd.to_datetime(df["timestamp"]))
+        cuts = ts.searchsorted(pd.DatetimeIndex([ends[0] - self.step_size] + list(ends)), side="left")
+        return [df.iloc[lo:hi] for lo, hi in zip(cuts[:-1], cuts[1:])]
+
+    def _mergeable(self, det) -> bool:
+        return (getattr(det, "approx", False) and hasattr(det, "detect_with_sketch")
+                and not self.panes.by_sensor)
+
+    def _window_sketch(self, i: int, det):
+        sketch = det.sketch()
+        for p in self.panes.panes:
+            if i not in p.sketches:
+                p.sketches[i] = det.sketch(p.frame) if not p.frame.empty else det.sketch()
+            sketch.merge(p.sketches[i])
+        return sketch
+
+    def _evaluate(self, pane) -> AnomalyReport:
+        frame = pane.frame
+        window_start = pane.end - self.duration
+        if frame.empty:
+            return self.service.evaluate(frame, window_start, pane.end, results=[])
+
+        window = None
+        pane_input = prepare(frame)
+        if any(hasattr(det, "detect_with_stats") for det in self.detectors):
+            mean, std = self.panes.row_stats(frame)
+        results = []
+        for i, det in enumerate(self.detectors):
+            try:
+                if hasattr(det, "detect_with_stats"):
+                    sev = np.asarray(det.detect_with_stats(pane_input.values, mean, std), dtype=float)
+                elif self._mergeable(det):
+                    raw = det.detect_with_sketch(pane_input, self._window_sketch(i, det))
+                    sev = np.asarray(raw.anomalies, dtype=float).reshape(-1)
+                else:
+                    if window is None:
+                        window = self.panes.frame()
+                    sev = self._detect_on_window(det, window)[len(window) - len(frame):]
+                raw = DetectionResult(pd.Series(sev, index=frame.index, name="severity"), float(sev.sum()))
+            except Exception as e:
+                logger.exception("Detector %s failed: %s", getattr(det, "__class__", det), e)
+                raw = None
+            results.append((det, raw))
+        return self.service.evaluate(frame, window_start, pane.end, results=results)
+
+    def _detect_on_window(self, det, window: pd.DataFrame) -> np.ndarray:
+        raw = self.service.run_detectors(window, [det])[0][1]
+        part = raw.anomalies if isinstance(raw, DetectionResult) else raw
+        return np.asarray(part, dtype=float).reshape(-1)
+
+    def advance(self, end, evaluate: bool = True) -> Optional[AnomalyReport]:
+        """Move the window so it ends at `end`, reading only the panes it has not seen."""
+        end = pd.Timestamp(end)
+        last = self.panes.end
+        if last is not None and end <= last:
+            return None
+        first = end - (self.panes.panes_per_window - 1) * self.step_size
+        if last is not None and last >= first:
+            first = last + self.step_size
+        else:
+            self.panes.reset()
+        ends = list(pd.date_range(first, end, freq=self.step_size))
+        df = self._sorted(self.service.read(ends[0] - self.step_size, end))
+        for pane_end, frame in zip(ends, self._split(df, ends)):
+            self.panes.add(pane_end - self.step_size, pane_end, frame)
+        self.panes.evict()
+        return self._evaluate(self.panes.panes[-1]) if evaluate else None
+
+    def backfill(self, start, end) -> List[AnomalyReport]:
+        """Reports for every window ending in (start, end], from a single read."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        ends = list(pd.date_range(start + self.step_size, end, freq=self.step_size))
+        if not ends:
+            return []
+        history = ends[0] - (self.panes.panes_per_window - 1) * self.step_size
+        warmup = list(pd.date_range(history, ends[0], freq=self.step_size))[:-1]
+        all_ends = warmup + ends
+        self.panes.reset()
+        df = self._sorted(self.service.read(all_ends[0] - self.step_size, end))
+        reports = []
+        for pane_end, frame in zip(all_ends, self._split(df, all_ends)):
+            pane = self.panes.add(pane_end - self.step_size, pane_end, frame)
+            self.panes.evict()
+            if pane_end >= ends[0]:
+                reports.append(self._evaluate(pane))
+        return reports
+
+    def run_live(self, stop: Optional[Callable[[], bool]] = None, max_steps: Optional[int] = None,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep,
+                 lag=0):
+        """Evaluate a window at every step boundary (plus `lag` for late rows) until stopped."""
+        lag = parse_duration(lag) if lag else pd.Timedelta(0)
+        now = pd.Timestamp(clock(), unit="s")
+        end = (now - lag).floor(self.step_size)
+        self.advance(end, evaluate=False)
+        steps = 0
+        while not (stop and stop()) and (max_steps is None or steps < max_steps):
+            end = end + self.step_size
+            wait = (end + lag - pd.Timestamp(clock(), unit="s")).total_seconds()
+            if wait > 0:
+                sleep(wait)
+            if stop and stop():
+                break
+            self.advance(end)
+            steps += 1
@@ -1,25 +1,74 @@
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 import logging
+import time
+import numpy as np
 import pandas as pd
 
 from domain.models import (
     AnomalyReport,
     DetectionResult,
     AnomalyDetector,
+    anomaly_frame,
     AlertSink,
 )
+from domain.prepared import PreparedInput
+from .executor import DetectorExecutor, detect_grouped
 
 logger = logging.getLogger(__name__)
 
 class AnomalyDetectionService:
-    def __init__(self, repository, detectors: List[AnomalyDetector], sinks: List[AlertSink] = None):
+    def __init__(self, repository, detectors: List[AnomalyDetector], sinks: List[AlertSink] = None,
+                 group_by_sensor: bool = False, executor: Optional[DetectorExecutor] = None,
+                 stage_observer: Optional[Callable[..., None]] = None):
         self.repository = repository
         self.detectors = detectors
         self.sinks = sinks or []
-
-    def _normalize_detector_result(self, det, raw):
+        self.group_by_sensor = group_by_sensor
+        self.executor = executor or DetectorExecutor("serial")
+        # stage_observer(stage, seconds, detector="") receives read/detect/publish timings
+        self.stage_observer = stage_observer
+
+    def _observe(self, stage: str, seconds: float, detector: str = ""):
+        if self.stage_observer is None:
+            return
+        try:
+            self.stage_observer(stage, seconds, detector)
+        except Exception:
+            logger.debug("stage observer failed", exc_info=True)
+
+    @staticmethod
+    def _sensor_layout(df: pd.DataFrame):
+        return PreparedInput.from_any(df).layout
+
+    def _detect_grouped(self, det, df: pd.DataFrame, layout) -> DetectionResult:
+        return detect_grouped(det, df, layout)
+
+    @staticmethod
+    def _locate(df: pd.DataFrame, labels: pd.Index):
+        # detector results are labelled like df rows; map labels to timestamp/sensor_id columns
+        try:
+            pos = df.index.get_indexer(labels)
+        except Exception:
+            pos = np.full(len(labels), -1)
+        found = pos >= 0
+        everywhere = bool(found.all())
+
+        def take(column, fallback):
+            values = df[column].to_numpy()
+            if everywhere:
+                return values[pos]
+            out = np.array(fallback, dtype=object) if fallback is not None else np.full(len(labels), None, dtype=object)
+            out[found] = values[pos[found]]
+            return out
+
+        ts = take("timestamp", labels.to_numpy(dtype=object)) if "timestamp" in df.columns else labels.to_numpy()
+        sensor = take("sensor_id", None) if "sensor_id" in df.columns else None
+        return ts, sensor
+
+    def _normalize_detector_result(self, det, raw, df: Optional[pd.DataFrame] = None):
         detector_name = getattr(det, "name", det.__class__.__name__)
+        df = df if df is not None else pd.DataFrame()
 
         if isinstance(raw, DetectionResult):
             series = raw.anomalies if raw.anomalies is not None else pd.Series(dtype=float)
@@ -31,53 +80,36 @@ class AnomalyDetectionService:
         
         elif isinstance(raw, list):
             if raw and isinstance(raw[0], dict):
-                normalized = []
-                for a in raw:
-                    norm = dict(a)  
-                    if "detector" not in norm:
-                        norm["detector"] = detector_name
-                    if "severity" not in norm:
-                        
-                        norm["severity"] = float(norm.get("value", 0.0) or 0.0)
-                    normalized.append({
-                        "timestamp": norm.get("timestamp"),
-                        "severity": float(norm.get("severity") or 0.0),
-                        "detector": norm.get("detector"),
-                    })
-                count = len(normalized)
-                return normalized, sum(a["severity"] for a in normalized), count
-            else:
-                
-                normalized = []
-                for idx, v in enumerate(raw):
-                    try:
-                        sev = float(v)
-                    except Exception:
-                        sev = 0.0
-                    if sev > 0:
-                        normalized.append({"timestamp": idx, "severity": sev, "detector": detector_name})
-                count = len(normalized)
-                return normalized, sum(a["severity"] for a in normalized), count
+                rows = pd.DataFrame(raw)
+                sev_col = pd.Series(np.nan, index=rows.index)
+                for col in ("severity", "value"):
+                    if col in rows.columns:
+                        sev_col = sev_col.fillna(pd.to_numeric(rows[col], errors="coerce"))
+                sev = sev_col.fillna(0.0).to_numpy(dtype=float)
+                detectors = rows["detector"].fillna(detector_name) if "detector" in rows.columns else detector_name
+                ts, sensor = self._locate(df, pd.Index(rows["timestamp"] if "timestamp" in rows.columns else [None] * len(rows)))
+                frame = anomaly_frame(ts, sensor, sev,
+                                      detectors if isinstance(detectors, str) else pd.Categorical(detectors))
+                return frame, float(sev.sum()), len(frame)
+            series = pd.Series(pd.to_numeric(pd.Series(raw, dtype=object), errors="coerce").fillna(0.0).to_numpy(dtype=float))
+            severity = float(series[series > 0].sum())
         else:
             series = pd.Series(dtype=float)
             severity = 0.0
 
-        anomalies_list = []
-
-        if isinstance(series, pd.Series):
-            for idx, sev in series.items():
-                try:
-                    sevf = float(sev)
-                except Exception:
-                    sevf = 0.0
-                if sevf > 0:
-                    anomalies_list.append({"timestamp": idx, "severity": sevf, "detector": detector_name})
+        sev = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+        mask = sev > 0
+        ts, sensor = self._locate(df, series.index[mask])
+        frame = anomaly_frame(ts, sensor, sev[mask], detector_name)
+        return frame, float(severity), int(mask.sum())
 
-        count = len(anomalies_list)
-        return anomalies_list, float(severity), count
-
-    def run_once(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> AnomalyReport:
+    def read(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        t0 = time.perf_counter()
+        df = self._read(start, end)
+        self._observe("read", time.perf_counter() - t0)
+        return df
 
+    def _read(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
         df = None
         for method in ("read_window", "read_latest_window", "load_timeseries"):
             fn = getattr(self.repository, method, None)
@@ -101,29 +133,60 @@ class AnomalyDetectionService:
 
         if df is None:
             df = pd.DataFrame()
-        
+        return df
+
+    def _publish(self, report: AnomalyReport):
+        t0 = time.perf_counter()
+        for s in self.sinks:
+            try:
+                s.send(report)
+            except Exception:
+                logger.exception("Sink %s failed", getattr(s, "__class__", s))
+
+        if hasattr(self.repository, "persist_report"):
+            try:
+                self.repository.persist_report(report)
+            except Exception:
+                logger.exception("persist_report failed")
+        self._observe("publish", time.perf_counter() - t0)
+
+    @staticmethod
+    def _concat_anomalies(frames) -> pd.DataFrame:
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return anomaly_frame()
+        # align detector categories so concat keeps the categorical dtype
+        names = pd.Index([]).append([f["detector"].cat.categories for f in frames]).unique()
+        frames = [f.assign(detector=f["detector"].cat.set_categories(names)) for f in frames]
+        return pd.concat(frames, ignore_index=True)
+
+    def run_detectors(self, df: pd.DataFrame, detectors=None):
+        detectors = self.detectors if detectors is None else detectors
+        # coerced once per window and shared by every detector
+        prepared = PreparedInput.from_any(df)
+        layout = None
+        if self.group_by_sensor and "sensor_id" in df.columns:
+            layout = prepared.layout
+
+        results = self.executor.run(detectors, df, layout, prepared)
+        for name, seconds in getattr(self.executor, "durations", {}).items():
+            self._observe("detect", seconds, name)
+        return results
+
+    def evaluate(self, df: pd.DataFrame, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 results=None) -> AnomalyReport:
+        # results: precomputed [(detector, raw)] pairs, e.g. from the sliding-window scheduler
         if df is None or (isinstance(df, pd.DataFrame) and df.empty):
             report = AnomalyReport(
                 sensor_id=None,
                 window_start=start,
                 window_end=end,
-                anomalies=[],
+                anomalies=anomaly_frame(),
                 severity=0.0,
                 severity_level="low",
                 detector_stats={},
             )
-            
-            for s in self.sinks:
-                try:
-                    s.send(report)
-                except Exception:
-                    logger.exception("Sink %s failed", getattr(s, "__class__", s))
-            
-            if hasattr(self.repository, "persist_report"):
-                try:
-                    self.repository.persist_report(report)
-                except Exception:
-                    logger.exception("persist_report failed")
+            self._publish(report)
             return report
 
         sensor_id = None
@@ -131,35 +194,22 @@ class AnomalyDetectionService:
             unique = df["sensor_id"].unique()
             sensor_id = int(unique[0]) if len(unique) == 1 else None
 
-        all_anomalies = []
+        if results is None:
+            results = self.run_detectors(df)
+
+        frames = []
         total_severity = 0.0
         stats: Dict[str, Dict[str, Any]] = {}
 
-        for det in self.detectors:
-            try:
-                raw = det.detect(df)
-            except Exception as e:
-                logger.exception("Detector %s failed: %s", getattr(det, "__class__", det), e)
-                raw = None
-
-            anomalies_list, severity, count = self._normalize_detector_result(det, raw)
+        for det, raw in results:
+            frame, severity, count = self._normalize_detector_result(det, raw, df)
 
             stats[det.__class__.__name__] = {"count": int(count), "severity": float(severity)}
-            
-            normalized = []
-            for a in anomalies_list:
-                ts = a.get("timestamp")
-                
-                if isinstance(ts, (int,)) and "timestamp" in df.columns:
-                    try:
-                        mapped = df.loc[int(ts), "timestamp"]
-                        ts = mapped
-                    except Exception:
-                        pass
-                normalized.append({"timestamp": ts, "severity": float(a.get("severity", 0.0)), "detector": a.get("detector")})
-            all_anomalies.extend(normalized)
+            frames.append(frame)
             total_severity += float(severity)
 
+        all_anomalies = self._concat_anomalies(frames)
+
         if total_severity > 100:
             severity_level = "high"
         elif total_severity > 10:
@@ -176,17 +226,8 @@ class AnomalyDetectionService:
             severity_level=severity_level,
             detector_stats=stats,
         )
+        self._publish(report)
+        return report
 
-        for s in self.sinks:
-            try:
-                s.send(report)
-            except Exception:
-                logger.exception("Sink %s failed", getattr(s, "__class__", s))
-
-        if hasattr(self.repository, "persist_report"):
-            try:
-                self.repository.persist_report(report)
-            except Exception:
-                logger.exception("persist_report failed")
-
-        return report
\ No newline at end of file
+    def run_once(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> AnomalyReport:
+        return self.evaluate(self.read(start, end), start, end)
@@ -0,0 +1,135 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from domain.prepared import prepare
+
+
+def parse_duration(value) -> pd.Timedelta:
+    # "1h", "5m", "30s", "1d" as written in config/pipeline.yaml
+    if isinstance(value, pd.Timedelta):
+        return value
+    if isinstance(value, (int, float)):
+        return pd.Timedelta(seconds=value)
+    text = str(value).strip().lower()
+    if text.endswith("m") and text[:-1].replace(".", "", 1).isdigit():
+        text = text[:-1] + "min"
+    td = pd.Timedelta(text)
+    if td <= pd.Timedelta(0):
+        raise ValueError(f"duration must be positive: {value!r}")
+    return td
+
+
+def pane_values(frame: pd.DataFrame) -> np.ndarray:
+    # same coercion the detectors apply
+    if frame.empty:
+        return np.zeros(0)
+    return prepare(frame).values
+
+
+@dataclass
+class Pane:
+    start: pd.Timestamp
+    end: pd.Timestamp
+    frame: pd.DataFrame
+    keys: pd.Index
+    count: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    # per-detector mergeable summaries of this pane (e.g. quantile sketches), built on first use
+    sketches: Dict[int, Any] = field(default_factory=dict)
+
+
+class PaneAggregator:
+    """Per-sensor count/mean/M2 kept per pane; the window is the merge of its panes.
+
+    Adding a pane and evicting the oldest one never touches rows of the other
+    panes, and merging pane summaries (Chan et al.) avoids the cancellation a
+    running sum/sumsq with subtraction would accumulate.
+    """
+
+    def __init__(self, duration, step, by_sensor: bool = True):
+        self.duration = parse_duration(duration)
+        self.step = parse_duration(step)
+        if self.duration < self.step:
+            raise ValueError("window duration must be >= step")
+        self.by_sensor = by_sensor
+        self.panes: Deque[Pane] = deque()
+
+    @property
+    def panes_per_window(self) -> int:
+        return int(np.ceil(self.duration / self.step))
+
+    @property
+    def end(self) -> Optional[pd.Timestamp]:
+        return self.panes[-1].end if self.panes else None
+
+    def _keys(self, frame: pd.DataFrame):
+        if self.by_sensor and "sensor_id" in frame.columns:
+            return pd.factorize(frame["sensor_id"])
+        return np.zeros(len(frame), dtype=np.int64), pd.Index([None])
+
+    def add(self, start, end, frame: pd.DataFrame) -> Pane:
+        frame = frame.reset_index(drop=True)
+        codes, keys = self._keys(frame)
+        keys = pd.Index(keys)
+        x = pane_values(frame)
+        k = len(keys)
+        count = np.bincount(codes, minlength=k).astype(float) if len(x) else np.zeros(k)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.bincount(codes, weights=x, minlength=k) / count if len(x) else np.zeros(k)
+            m2 = np.bincount(codes, weights=np.square(x - mean[codes]), minlength=k) if len(x) else np.zeros(k)
+        pane = Pane(pd.Timestamp(start), pd.Timestamp(end), frame, keys, count, np.nan_to_num(mean), m2)
+        self.panes.append(pane)
+        return pane
+
+    def evict(self, window_start=None) -> List[Pane]:
+        # drop panes that ended at or before the window start
+        if window_start is None:
+            window_start = self.end - self.duration if self.panes else None
+        evicted = []
+        while self.panes and self.panes[0].end <= window_start:
+            evicted.append(self.panes.popleft())
+        return evicted
+
+    def reset(self):
+        self.panes.clear()
+
+    def stats(self):
+        if not self.panes:
+            return pd.Index([]), np.zeros(0), np.zeros(0), np.zeros(0)
+        keys = self.panes[0].keys
+        for p in list(self.panes)[1:]:
+            keys = keys.union(p.keys, sort=False)
+        n = np.zeros(len(keys))
+        mean = np.zeros(len(keys))
+        m2 = np.zeros(len(keys))
+        for p in self.panes:
+            idx = keys.get_indexer(p.keys)
+            na, nb = n[idx], p.count
+            tot = na + nb
+            with np.errstate(divide="ignore", invalid="ignore"):
+                delta = p.mean - mean[idx]
+                mean[idx] = np.where(tot > 0, mean[idx] + delta * nb / tot, 0.0)
+                m2[idx] = m2[idx] + p.m2 + np.where(tot > 0, delta * delta * na * nb / tot, 0.0)
+            n[idx] = tot
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.where(n > 0, np.sqrt(m2 / n), 0.0)
+        return keys, n, mean, std
+
+    def row_stats(self, frame: pd.DataFrame):
+        # window mean/std broadcast onto the rows of frame
+        keys, _, mean, std = self.stats()
+        if self.by_sensor and "sensor_id" in frame.columns:
+            idx = keys.get_indexer(frame["sensor_id"])
+        else:
+            idx = np.zeros(len(frame), dtype=np.int64)
+        return mean[idx], std[idx]
+
+    def frame(self) -> pd.DataFrame:
+        frames = [p.frame for p in self.panes if not p.frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
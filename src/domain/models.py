@@ -1,8 +1,25 @@
 from dataclasses import dataclass
 from typing import Protocol, Dict, Any, Optional, List   
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
+ANOMALY_COLUMNS = ["timestamp", "sensor_id", "severity", "detector"]
+
+def anomaly_frame(timestamp=None, sensor_id=None, severity=(), detector=None) -> pd.DataFrame:
+    # columnar anomalies of a report: one row per flagged point, no per-row objects
+    severity = np.asarray(severity, dtype=float)
+    n = len(severity)
+    if detector is None or isinstance(detector, str):
+        codes = np.zeros(n, dtype=np.int8) if detector is not None else np.full(n, -1, dtype=np.int8)
+        detector = pd.Categorical.from_codes(codes, categories=[detector] if detector is not None else [])
+    return pd.DataFrame({
+        "timestamp": timestamp if timestamp is not None else np.full(n, None, dtype=object),
+        "sensor_id": sensor_id if sensor_id is not None else np.full(n, np.nan),
+        "severity": severity,
+        "detector": detector,
+    }, columns=ANOMALY_COLUMNS)
+
 @dataclass
 class DetectionResult:
     
@@ -20,7 +37,7 @@ class AnomalyReport:
     sensor_id: Optional[int]        
     window_start: Optional[datetime]
     window_end: Optional[datetime]
-    anomalies: List[int]
+    anomalies: pd.DataFrame
     severity: float
     severity_level: str
     detector_stats: Dict[str, Dict[str, Any]]
@@ -0,0 +1,127 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+import numpy as np
+import pandas as pd
+
+TS_COLUMNS = ("timestamp", "ts")
+
+
+def _value_series(obj) -> pd.Series:
+    # the column every detector scores: "value", else the first numeric column
+    if isinstance(obj, pd.DataFrame):
+        if "value" in obj.columns:
+            s = obj["value"]
+        else:
+            num = obj.select_dtypes(include=[np.number]).columns
+            if len(num) == 0:
+                return pd.Series(dtype=float)
+            s = obj[num[0]]
+    else:
+        s = obj if isinstance(obj, pd.Series) else pd.Series(obj)
+    s = pd.to_numeric(s, errors="coerce")
+    return s.fillna(0.0) if s.hasnans else s
+
+
+class PreparedInput:
+    """One window's detector input, coerced once and shared by every detector.
+
+    values is a contiguous float64 array (non-numeric -> NaN -> 0.0, as the
+    detectors always did). Reductions are computed on first use and memoized;
+    detectors can park their own intermediates with memo().
+    """
+
+    def __init__(self, values: np.ndarray, index: Optional[pd.Index] = None, frame: Optional[pd.DataFrame] = None):
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.index = index if index is not None else pd.RangeIndex(len(self.values))
+        self.frame = frame
+        self._memo: Dict[Hashable, Any] = {}
+
+    @classmethod
+    def from_any(cls, obj) -> "PreparedInput":
+        if isinstance(obj, PreparedInput):
+            return obj
+        s = _value_series(obj)
+        return cls(s.to_numpy(dtype=float), s.index, obj if isinstance(obj, pd.DataFrame) else None)
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.values) == 0
+
+    def memo(self, key: Hashable, fn: Callable[[], Any]):
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = fn()
+            return value
+
+    @property
+    def series(self) -> pd.Series:
+        return self.memo("series", lambda: pd.Series(self.values, index=self.index))
+
+    @property
+    def timestamps(self) -> Optional[np.ndarray]:
+        def ts():
+            if self.frame is None:
+                return None
+            col = next((c for c in TS_COLUMNS if c in self.frame.columns), None)
+            return None if col is None else self.frame[col].to_numpy()
+        return self.memo("timestamps", ts)
+
+    @property
+    def sensor_codes(self):
+        # (codes, uniques); None when the input has no sensor column
+        def codes():
+            if self.frame is None or "sensor_id" not in self.frame.columns:
+                return None
+            return pd.factorize(self.frame["sensor_id"])
+        return self.memo("sensor_codes", codes)
+
+    @property
+    def layout(self):
+        # one stable sort by sensor code; every sensor becomes a contiguous segment
+        def layout():
+            codes = self.sensor_codes[0]
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            if not len(sorted_codes):
+                # no rows, no segments (np.r_[True, ...] would open one)
+                return order, np.zeros(0, dtype=np.intp)
+            starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+            return order, starts
+        return self.memo("layout", layout)
+
+    @property
+    def sorted_values(self) -> np.ndarray:
+        # values in layout order, for the detect_grouped kernels
+        return self.memo("sorted_values", lambda: self.values[self.layout[0]])
+
+    @property
+    def mean(self) -> float:
+        return self.memo("mean", lambda: self.values.sum() / len(self.values))
+
+    @property
+    def abs_dev_mean(self) -> np.ndarray:
+        return self.memo("abs_dev_mean", lambda: np.abs(self.values - self.mean))
+
+    @property
+    def std(self) -> float:
+        # population std (ddof=0)
+        return self.memo("std", lambda: np.sqrt(np.square(self.abs_dev_mean).sum() / len(self.values)))
+
+    @property
+    def median(self) -> float:
+        return self.memo("median", lambda: float(np.median(self.values)))
+
+    @property
+    def abs_dev_median(self) -> np.ndarray:
+        return self.memo("abs_dev_median", lambda: np.abs(self.values - self.median))
+
+    @property
+    def mad(self) -> float:
+        return self.memo("mad", lambda: float(np.median(self.abs_dev_median)))
+
+
+def prepare(obj) -> PreparedInput:
+    return PreparedInput.from_any(obj)
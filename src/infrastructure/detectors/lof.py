@@ -1,5 +1,7 @@
+from __future__ import annotations
 import pandas as pd
 import numpy as np
+from domain.prepared import prepare
 
 try:
     from sklearn.neighbors import LocalOutlierFactor
@@ -7,25 +9,179 @@ try:
 except Exception:
     _SKLEARN_AVAILABLE = False
 
+LOF_CHUNK = 1 << 16
+
+
+def _nearest_runs(xs: np.ndarray, q: np.ndarray, w: int, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    # In 1-D the w nearest points of q form a contiguous run xs[l:l+w], l in
+    # [lo, hi]. Its radius max(q - xs[l], xs[l+w-1] - q) is unimodal in l:
+    # binary search for the first l whose right edge dominates, then check
+    # whether l - 1 is tighter.
+    left, right = lo.copy(), hi.copy()
+    while True:
+        active = left < right
+        if not active.any():
+            break
+        mid = (left + right) // 2
+        right_wins = xs[mid + w - 1] - q >= q - xs[mid]
+        right = np.where(active & right_wins, mid, right)
+        left = np.where(active & ~right_wins, mid + 1, left)
+    prev = np.maximum(left - 1, lo)
+    r_left = np.maximum(q - xs[left], xs[left + w - 1] - q)
+    r_prev = np.maximum(q - xs[prev], xs[prev + w - 1] - q)
+    return np.where(r_prev < r_left, prev, left)
+
+
+class SortedLOF:
+    """Exact Local Outlier Factor for one-dimensional data.
+
+    Points are sorted once; every k-neighbourhood is a contiguous run of the
+    sorted array found by binary search, so fitting is O(n log n) time and
+    O(n) memory (neighbour gathers run in chunks) instead of a k-d tree /
+    pairwise search. Matches sklearn's LocalOutlierFactor (fit on the window,
+    or novelty=True scoring against a reference) up to tie-breaking among
+    equidistant neighbours.
+    """
+
+    def __init__(self, n_neighbors: int = 20):
+        self.n_neighbors = int(n_neighbors)
+        self.xs = None
+        self.k = 0
+        self.dist_k = None
+        self.lrd = None
+        self.lof = None
+        self.order = None
+
+    def fit(self, values) -> "SortedLOF":
+        x = np.asarray(values, dtype=float).ravel()
+        n = len(x)
+        self.order = np.argsort(x, kind="stable")
+        self.xs = xs = x[self.order]
+        self.k = k = min(self.n_neighbors, n - 1)
+        if k < 1:
+            self.dist_k = self.lrd = self.lof = np.zeros(n)
+            return self
+
+        # neighbourhood of sorted point i: xs[l:l+k+1] minus i itself
+        i = np.arange(n)
+        lo = np.maximum(i - k, 0)
+        hi = np.minimum(i, n - k - 1)
+        starts = _nearest_runs(xs, xs, k + 1, lo, hi)
+        self.dist_k = np.maximum(xs - xs[starts], xs[starts + k] - xs)
+
+        reach = np.empty(n)
+        for a in range(0, n, LOF_CHUNK):
+            b = min(a + LOF_CHUNK, n)
+            nb = starts[a:b, None] + np.arange(k + 1)
+            d = np.maximum(self.dist_k[nb], np.abs(xs[nb] - xs[a:b, None]))
+            # the window includes the point itself, whose reach-distance is its own dist_k
+            reach[a:b] = (d.sum(axis=1) - self.dist_k[a:b]) / k
+        self.lrd = 1.0 / (reach + 1e-10)
+
+        lof = np.empty(n)
+        for a in range(0, n, LOF_CHUNK):
+            b = min(a + LOF_CHUNK, n)
+            nb = starts[a:b, None] + np.arange(k + 1)
+            lof[a:b] = (self.lrd[nb].sum(axis=1) - self.lrd[a:b]) / k / self.lrd[a:b]
+        self.lof = lof
+        return self
+
+    def fit_scores(self) -> np.ndarray:
+        # LOF of the fitted points, in input order
+        out = np.empty(len(self.lof))
+        out[self.order] = self.lof
+        return out
+
+    def score(self, values) -> np.ndarray:
+        # LOF of new points against the fitted reference (sklearn novelty=True)
+        q = np.asarray(values, dtype=float).ravel()
+        xs, k = self.xs, self.k
+        if k < 1 or len(q) == 0:
+            return np.ones(len(q))
+        n = len(xs)
+        pos = np.searchsorted(xs, q)
+        lo = np.clip(pos - k, 0, n - k)
+        hi = np.clip(pos, 0, n - k)
+        starts = _nearest_runs(xs, q, k, lo, hi)
+
+        out = np.empty(len(q))
+        for a in range(0, len(q), LOF_CHUNK):
+            b = min(a + LOF_CHUNK, len(q))
+            nb = starts[a:b, None] + np.arange(k)
+            reach = np.maximum(self.dist_k[nb], np.abs(xs[nb] - q[a:b, None])).mean(axis=1)
+            lrd = 1.0 / (reach + 1e-10)
+            out[a:b] = self.lrd[nb].mean(axis=1) / lrd
+        return out
+
+
 class LOFDetector:
     name = 'lof'
-    def __init__(self, n_neighbors: int = 20, contamination: float = 0.01):
+    releases_gil = True
+    accepts_prepared = True
+
+    def __init__(self, n_neighbors: int = 20, contamination: float = 0.01, method: str = 'sorted',
+                 reference_size: int | None = None, refit_every: int | None = None, seed: int | None = 0):
+        # method: 'sorted' (exact 1-D LOF, no sklearn) or 'sklearn' (LocalOutlierFactor)
+        # reference_size: fit once on a sample of that size and score later windows against it
         self.n_neighbors = int(n_neighbors)
         self.contamination = float(contamination)
-        if not _SKLEARN_AVAILABLE:
+        self.method = method
+        self.reference_size = reference_size
+        self.refit_every = refit_every
+        self.seed = seed
+        self.model: SortedLOF | None = None
+        # reference mode keeps one model and window count per sensor (key None: ungrouped input)
+        self._models: dict = {}
+        self._windows_scored: dict = {}
+        if method == 'sklearn' and not _SKLEARN_AVAILABLE:
             raise RuntimeError('sklearn is not available in environment')
+        if method not in ('sorted', 'sklearn'):
+            raise ValueError(f"unknown LOF method {method!r}")
 
-    def detect(self, series: pd.Series) -> pd.Series:
-        
-        if series.empty:
+    @property
+    def stateful(self) -> bool:
+        # the reference model must outlive a window, so it cannot run in a throwaway worker process
+        return bool(self.reference_size)
+
+    def fit(self, reference) -> "LOFDetector":
+        self.model = SortedLOF(self.n_neighbors).fit(prepare(reference).values)
+        self._windows_scored.pop(None, None)
+        return self
+
+    def _reference(self, x: np.ndarray, key) -> np.ndarray:
+        model = self.model if key is None else self._models.get(key)
+        scored = self._windows_scored.get(key, 0)
+        if model is None or (self.refit_every and scored >= self.refit_every):
+            rng = np.random.default_rng(self.seed)
+            sample = x if len(x) <= self.reference_size else rng.choice(x, self.reference_size, replace=False)
+            model = SortedLOF(self.n_neighbors).fit(sample)
+            scored = 0
+            if key is None:
+                self.model = model
+            else:
+                self._models[key] = model
+        self._windows_scored[key] = scored + 1
+        return model.score(x)
+
+    def _lof(self, x: np.ndarray, key=None) -> np.ndarray:
+        if self.reference_size:
+            return self._reference(x, key)
+        if self.model is not None:
+            return self.model.score(x)
+        if self.method == 'sklearn':
+            clf = LocalOutlierFactor(n_neighbors=self.n_neighbors, contamination=self.contamination)
+            clf.fit_predict(x.reshape(-1, 1))
+            return -clf.negative_outlier_factor_
+        return SortedLOF(self.n_neighbors).fit(x).fit_scores()
+
+    def detect(self, series, key=None) -> pd.Series:
+        # key: sensor id of a grouped segment, selects that sensor's reference model
+        p = prepare(series)
+        if p.empty:
             return pd.Series([], dtype=float)
-        X = series.values.reshape(-1, 1)
-        clf = LocalOutlierFactor(n_neighbors=self.n_neighbors, contamination=self.contamination)
-        pred = clf.fit_predict(X)  
-        
-        lof_scores = -clf.negative_outlier_factor_
+        lof_scores = self._lof(p.values, key)
 
         minv = lof_scores.min()
-        scores = pd.Series((lof_scores - minv), index=series.index)
+        scores = pd.Series((lof_scores - minv), index=p.index)
         
-        return scores
\ No newline at end of file
+        return scores
@@ -2,42 +2,70 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from domain.models import DetectionResult
+from domain.prepared import prepare
+from .segments import segment_counts, segment_median
+from .sketch import QuantileSketch
 
 class MADDetector:
-    def __init__(self, threshold: float = 3.5, name: str | None = None):
+    releases_gil = True
+    accepts_prepared = True
+
+    def __init__(self, threshold: float = 3.5, name: str | None = None, approx: bool = False,
+                 epsilon: float = 0.005, seed: int | None = None):
+        # approx: median/MAD from a mergeable QuantileSketch with rank error ~epsilon
         self.threshold = threshold
         self.name = name or self.__class__.__name__
+        self.approx = bool(approx)
+        self.epsilon = float(epsilon)
+        self.seed = seed
 
     def _to_series(self, obj):
-        if isinstance(obj, pd.DataFrame):
-            if "value" in obj.columns:
-                s = obj["value"]
-            else:
-                num = obj.select_dtypes(include=[np.number]).columns
-                if len(num) == 0:
-                    return pd.Series(dtype=float)
-                s = obj[num[0]]
-        else:
-            s = obj
-        return pd.to_numeric(s, errors="coerce").fillna(0.0)
+        return prepare(obj).series
+
+    def sketch(self, series_or_df=None) -> QuantileSketch:
+        # summary of one chunk; chunk/worker sketches combine with QuantileSketch.merge
+        sk = QuantileSketch.for_error(self.epsilon, seed=self.seed)
+        if series_or_df is not None:
+            sk.update(prepare(series_or_df).values)
+        return sk
+
+    def detect_with_sketch(self, series_or_df, sketch: QuantileSketch) -> DetectionResult:
+        p = prepare(series_or_df)
+        if p.empty:
+            return DetectionResult(pd.Series(dtype=float), 0.0)
+        med, mad = sketch.median_and_mad()
+        return self._result(p, np.abs(p.values - med), mad)
 
     def detect(self, series_or_df) -> DetectionResult:
-        s = self._to_series(series_or_df)
-        if s.empty:
+        p = prepare(series_or_df)
+        if p.empty:
             return DetectionResult(pd.Series(dtype=float), 0.0)
 
-        med = s.median()
-        abs_dev = (s - med).abs()
-        mad = abs_dev.median()
-        
+        if self.approx:
+            med, mad = p.memo(("sketch_median_mad", self.epsilon, self.seed),
+                              lambda: self.sketch(p).median_and_mad())
+            return self._result(p, np.abs(p.values - med), mad)
+        return self._result(p, p.abs_dev_median, p.mad)
+
+    def _result(self, p, abs_dev: np.ndarray, mad: float) -> DetectionResult:
         if mad == 0:
-            anomalies = abs_dev.where(abs_dev > self.threshold, 0.0)
-            anomalies.name = "severity"
-            severity = float(anomalies.sum())
-            return DetectionResult(anomalies, severity)
-
-        robust_z = 0.6745 * abs_dev / mad
-        anomalies = robust_z.where(robust_z > self.threshold, 0.0)
-        anomalies.name = "severity"
+            sev = np.where(abs_dev > self.threshold, abs_dev, 0.0)
+        else:
+            robust_z = 0.6745 * abs_dev / mad
+            sev = np.where(robust_z > self.threshold, robust_z, 0.0)
+        anomalies = pd.Series(sev, index=p.index, name="severity")
         severity = float(anomalies.sum())
-        return DetectionResult(anomalies, severity)
\ No newline at end of file
+        return DetectionResult(anomalies, severity)
+
+    def detect_grouped(self, values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        # per-sensor segments are small; always exact
+        counts = segment_counts(starts, len(values))
+        med = segment_median(values, starts)
+        abs_dev = np.abs(values - np.repeat(med, counts))
+        mad = np.repeat(segment_median(abs_dev, starts), counts)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            robust_z = 0.6745 * abs_dev / mad
+        return np.where(mad == 0,
+                        np.where(abs_dev > self.threshold, abs_dev, 0.0),
+                        np.where(robust_z > self.threshold, robust_z, 0.0))
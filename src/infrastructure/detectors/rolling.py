@@ -2,53 +2,50 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from domain.models import DetectionResult
+from domain.prepared import prepare
+from .segments import segment_rolling_mean_std
 
 class RollingDetector:
+    releases_gil = True
+    accepts_prepared = True
+
     def __init__(self, window: int = 3, z_threshold: float = 2.0, name: str | None = None):
         self.window = int(window)
         self.z_threshold = float(z_threshold)
         self.name = name or self.__class__.__name__
 
     def _to_series(self, obj):
-        if isinstance(obj, pd.DataFrame):
-            if "value" in obj.columns:
-                s = obj["value"]
-            else:
-                num = obj.select_dtypes(include=[np.number]).columns
-                if len(num) == 0:
-                    return pd.Series(dtype=float)
-                s = obj[num[0]]
-        else:
-            s = obj
-        return pd.to_numeric(s, errors="coerce").fillna(0.0)
+        return prepare(obj).series
 
     def detect(self, series_or_df) -> DetectionResult:
-        s = self._to_series(series_or_df)
-        if s.empty:
+        p = prepare(series_or_df)
+        if p.empty:
             return DetectionResult(pd.Series(dtype=float), 0.0)
 
-        rmean = s.rolling(self.window, min_periods=1).mean()
-        rstd = s.rolling(self.window, min_periods=1).std(ddof=0)
+        rmean, rstd = p.memo(("rolling_mean_std", self.window), lambda: self._rolling_mean_std(p.series))
 
-        anomalies = pd.Series(0.0, index=s.index, name="severity")
+        sev = self._score(p.values, rmean, rstd)
+        anomalies = pd.Series(sev, index=p.index, name="severity")
 
-        for i in s.index:
-            m = rmean[i]
-            std = rstd[i]
-            x = s[i]
+        severity = float(anomalies.sum())
+        return DetectionResult(anomalies, severity)
 
-            abs_dev = abs(x - m)
+    def _rolling_mean_std(self, s: pd.Series):
+        r = s.rolling(self.window, min_periods=1)
+        return r.mean().to_numpy(dtype=float), r.std(ddof=0).to_numpy(dtype=float)
 
-            if std == 0 or std < 1e-6:
-                if abs_dev > self.z_threshold:
-                    anomalies[i] = abs_dev
-                continue
+    def detect_grouped(self, values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        rmean, rstd = segment_rolling_mean_std(values, starts, self.window)
+        return self._score(values, rmean, rstd)
 
-            z = abs_dev / std
+    def _score(self, x, m, std):
+        abs_dev = np.abs(x - m)
+        flat = (std == 0) | (std < 1e-6)
 
-            if z > self.z_threshold or abs_dev > self.z_threshold:
-                
-                anomalies[i] = z if z > 0 else abs_dev
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(flat, 0.0, abs_dev / std)
 
-        severity = float(anomalies.sum())
-        return DetectionResult(anomalies, severity)
\ No newline at end of file
+        return np.where(flat,
+                        np.where(abs_dev > self.z_threshold, abs_dev, 0.0),
+                        np.where((z > self.z_threshold) | (abs_dev > self.z_threshold),
+                                 np.where(z > 0, z, abs_dev), 0.0))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+# Segment kernels: ``values`` is laid out so that each group (sensor) occupies
+# one contiguous run, and ``starts`` holds the first position of every run.
+
+
+def segment_counts(starts, n: int) -> np.ndarray:
+    return np.diff(np.r_[starts, n])
+
+
+def segment_ids(starts, n: int) -> np.ndarray:
+    return np.repeat(np.arange(len(starts)), segment_counts(starts, n))
+
+
+def segment_mean(values, starts) -> np.ndarray:
+    return np.add.reduceat(values, starts) / segment_counts(starts, len(values))
+
+
+def segment_std(values, starts, mean=None) -> np.ndarray:
+    counts = segment_counts(starts, len(values))
+    if mean is None:
+        mean = np.add.reduceat(values, starts) / counts
+    dev = values - np.repeat(mean, counts)
+    return np.sqrt(np.add.reduceat(dev * dev, starts) / counts)
+
+
+def segment_median(values, starts) -> np.ndarray:
+    n = len(values)
+    counts = segment_counts(starts, n)
+    ordered = values[np.lexsort((values, segment_ids(starts, n)))]
+    lo = ordered[starts + (counts - 1) // 2]
+    hi = ordered[starts + counts // 2]
+    return (lo + hi) / 2.0
+
+
+class SegmentWindowIndexer(BaseIndexer):
+    """Trailing window of ``window_size`` rows that never crosses a segment start."""
+
+    def __init__(self, starts, n: int, window_size: int):
+        super().__init__(window_size=window_size)
+        self.row_starts = np.repeat(starts, segment_counts(starts, n)).astype(np.int64)
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.row_starts[:num_values])
+        return start, end
+
+
+def segment_rolling_mean_std(values, starts, window: int):
+    s = pd.Series(values)
+    roll = s.rolling(SegmentWindowIndexer(starts, len(values), window), min_periods=1)
+    return roll.mean().to_numpy(), roll.std(ddof=0).to_numpy()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+BULK_BLOCK = 1 << 20
+
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch.
+
+    Level ``h`` holds items of weight ``2**h``; a full level is sorted and every
+    other item (random offset) is promoted to the next level. Rank error is
+    roughly ``1.7 / k`` of the stream length.
+
+    Large updates are sorted in blocks and compacted ``h`` times in one step
+    (every ``2**h``-th item, random offset) straight into level ``h``, keeping
+    2k..4k items per block, which adds at most ``1 / (2k)`` rank error.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = int(k)
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(8, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(level)
+                keep = level[:0]
+                if len(level) % 2:
+                    keep, level = level[-1:], level[:-1]
+                offset = int(self._rng.integers(2))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], level[offset::2]])
+                self.levels[h] = keep
+            h += 1
+
+    @classmethod
+    def for_error(cls, epsilon: float, seed: Optional[int] = None) -> "QuantileSketch":
+        # k for a target rank error epsilon (fraction of n), with margin for bulk blocks
+        return cls(k=max(8, int(np.ceil(2.0 / float(epsilon)))), seed=seed)
+
+    def update(self, values) -> "QuantileSketch":
+        values = np.asarray(values, dtype=float).ravel()
+        if np.isnan(values).any():
+            values = values[~np.isnan(values)]
+        if len(values) > 8 * self.k:
+            for lo in range(0, len(values), BULK_BLOCK):
+                self._update_block(values[lo:lo + BULK_BLOCK])
+        elif len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self._compress()
+        return self
+
+    def _update_block(self, block: np.ndarray) -> None:
+        h = max(0, int(np.log2(len(block) / (2 * self.k))))
+        w = 1 << h
+        m = len(block) // w
+        offset = int(self._rng.integers(w))
+        items = np.sort(block)[offset::w][:m]
+        while len(self.levels) <= h:
+            self.levels.append(np.empty(0))
+        self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += len(block)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    @staticmethod
+    def _weighted_quantile(items, weights, q: float) -> float:
+        cum = np.cumsum(weights)
+        pos = int(np.searchsorted(cum, q * cum[-1], side="left"))
+        return float(items[min(pos, len(items) - 1)])
+
+    def quantile(self, q: float) -> float:
+        if self.n == 0:
+            return float("nan")
+        items, weights = self._weighted()
+        return self._weighted_quantile(items, weights, q)
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def median_and_mad(self):
+        if self.n == 0:
+            return float("nan"), float("nan")
+        items, weights = self._weighted()
+        med = self._weighted_quantile(items, weights, 0.5)
+        dev = np.abs(items - med)
+        order = np.argsort(dev, kind="stable")
+        return med, self._weighted_quantile(dev[order], weights[order], 0.5)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"k": self.k, "n": self.n, "levels": [lvl.copy() for lvl in self.levels]}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "QuantileSketch":
+        sk = cls(k=state["k"])
+        sk.n = int(state["n"])
+        sk.levels = [np.asarray(lvl, dtype=float) for lvl in state["levels"]] or [np.empty(0)]
+        return sk
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from .rolling import RollingDetector
+from .segments import segment_rolling_mean_std
+from .sketch import QuantileSketch
+
+# Incremental per-sensor detectors. Each ``update(sensor_ids, values)`` call
+# folds one batch into the persisted state and returns the batch severities,
+# so cost is O(batch) no matter how much history has been seen.
+
+STATE_VERSION = 1
+
+
+def _key(k):
+    if k is None or (isinstance(k, float) and np.isnan(k)):
+        return None
+    return k.item() if isinstance(k, np.generic) else k
+
+
+class _SlotMap:
+    def __init__(self):
+        self.index: Dict[Any, int] = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, uniques) -> np.ndarray:
+        slots = np.empty(len(uniques), dtype=np.int64)
+        for i, k in enumerate(uniques):
+            slots[i] = self.index.setdefault(_key(k), len(self.index))
+        return slots
+
+    def keys(self) -> List[Any]:
+        return list(self.index)
+
+    @classmethod
+    def from_keys(cls, keys) -> "_SlotMap":
+        m = cls()
+        m.index = {k: i for i, k in enumerate(keys)}
+        return m
+
+
+def _factorize(sensor_ids):
+    codes, uniques = pd.factorize(np.asarray(sensor_ids), use_na_sentinel=False)
+    return codes, uniques
+
+
+class StreamingZScoreDetector:
+    """Z-score against per-sensor Welford mean/variance over all batches seen so far."""
+
+    def __init__(self, threshold: float = 3.0, name: str | None = None):
+        self.threshold = float(threshold)
+        self.name = name or "streaming_zscore"
+        self._slots = _SlotMap()
+        self.count = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+
+    def _grow(self):
+        extra = len(self._slots) - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+
+    def update(self, sensor_ids, values) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return np.zeros(0)
+        codes, uniques = _factorize(sensor_ids)
+        slots = self._slots.lookup(uniques)
+        self._grow()
+
+        k = len(uniques)
+        b_count = np.bincount(codes, minlength=k).astype(float)
+        b_mean = np.bincount(codes, weights=values, minlength=k) / b_count
+        dev = values - b_mean[codes]
+        b_m2 = np.bincount(codes, weights=dev * dev, minlength=k)
+
+        # Chan et al. parallel merge of (count, mean, M2)
+        n_a, mean_a, m2_a = self.count[slots], self.mean[slots], self.m2[slots]
+        n = n_a + b_count
+        delta = b_mean - mean_a
+        mean = mean_a + delta * b_count / n
+        m2 = m2_a + b_m2 + delta * delta * n_a * b_count / n
+        self.count[slots], self.mean[slots], self.m2[slots] = n, mean, m2
+
+        std = np.sqrt(m2 / n)[codes]
+        abs_dev = np.abs(values - mean[codes])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = abs_dev / std
+        return np.where(std < 1e-6,
+                        np.where(abs_dev > self.threshold, abs_dev, 0.0),
+                        np.where((z > self.threshold) | (abs_dev > self.threshold), z, 0.0))
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {"threshold": self.threshold, "keys": self._slots.keys(),
+                "count": self.count, "mean": self.mean, "m2": self.m2}
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        self._slots = _SlotMap.from_keys(state["keys"])
+        self.count = np.asarray(state["count"], dtype=float)
+        self.mean = np.asarray(state["mean"], dtype=float)
+        self.m2 = np.asarray(state["m2"], dtype=float)
+
+
+class StreamingMADDetector:
+    """Robust z-score against a per-sensor quantile sketch (approximate median/MAD)."""
+
+    def __init__(self, threshold: float = 3.5, k: int = 200, name: str | None = None):
+        self.threshold = float(threshold)
+        self.k = int(k)
+        self.name = name or "streaming_mad"
+        self._slots = _SlotMap()
+        self.sketches: List[QuantileSketch] = []
+
+    def update(self, sensor_ids, values) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return np.zeros(0)
+        codes, uniques = _factorize(sensor_ids)
+        slots = self._slots.lookup(uniques)
+        while len(self.sketches) < len(self._slots):
+            self.sketches.append(QuantileSketch(k=self.k))
+
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        sev = np.zeros(len(values))
+        # one sketch per sensor, so this loops over sensors in the batch, not rows
+        for code, slot in enumerate(slots):
+            rows = order[bounds[code]:bounds[code + 1]]
+            x = values[rows]
+            sketch = self.sketches[slot].update(x)
+            med, mad = sketch.median_and_mad()
+            abs_dev = np.abs(x - med)
+            if mad == 0:
+                sev[rows] = np.where(abs_dev > self.threshold, abs_dev, 0.0)
+            else:
+                robust_z = 0.6745 * abs_dev / mad
+                sev[rows] = np.where(robust_z > self.threshold, robust_z, 0.0)
+        return sev
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {"threshold": self.threshold, "k": self.k, "keys": self._slots.keys(),
+                "sketches": [s.to_state() for s in self.sketches]}
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        self._slots = _SlotMap.from_keys(state["keys"])
+        self.sketches = [QuantileSketch.from_state(s) for s in state["sketches"]]
+
+
+class StreamingRollingDetector:
+    """RollingDetector whose trailing window continues across batches via per-sensor ring buffers."""
+
+    def __init__(self, window: int = 3, z_threshold: float = 2.0, name: str | None = None):
+        self._kernel = RollingDetector(window=window, z_threshold=z_threshold)
+        self.window = self._kernel.window
+        self.z_threshold = self._kernel.z_threshold
+        self.name = name or "streaming_rolling"
+        self._slots = _SlotMap()
+        self.tail = np.zeros((0, self.window - 1))
+        self.tail_len = np.zeros(0, dtype=np.int64)
+
+    def update(self, sensor_ids, values) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return np.zeros(0)
+        codes, uniques = _factorize(sensor_ids)
+        slots = self._slots.lookup(uniques)
+        extra = len(self._slots) - len(self.tail_len)
+        if extra > 0:
+            self.tail = np.vstack([self.tail, np.zeros((extra, self.window - 1))])
+            self.tail_len = np.concatenate([self.tail_len, np.zeros(extra, dtype=np.int64)])
+
+        w1 = self.window - 1
+        k = len(uniques)
+        hist_len = self.tail_len[slots]
+        held = np.arange(w1)[None, :] >= (w1 - hist_len)[:, None]
+        hist_vals = self.tail[slots][held]
+        hist_codes = np.repeat(np.arange(k), hist_len)
+
+        # history rows go first so a stable sort keeps them ahead of the batch
+        all_codes = np.concatenate([hist_codes, codes])
+        all_vals = np.concatenate([hist_vals, values])
+        order = np.argsort(all_codes, kind="stable")
+        sorted_vals = all_vals[order]
+        starts = np.searchsorted(all_codes[order], np.arange(k))
+
+        rmean, rstd = segment_rolling_mean_std(sorted_vals, starts, self.window)
+        sev_sorted = self._kernel._score(sorted_vals, rmean, rstd)
+        sev = np.empty_like(sev_sorted)
+        sev[order] = sev_sorted
+
+        ends = np.r_[starts[1:], len(sorted_vals)]
+        idx = ends[:, None] - w1 + np.arange(w1)[None, :]
+        valid = idx >= starts[:, None]
+        self.tail[slots] = np.where(valid, sorted_vals[np.clip(idx, 0, None)], 0.0)
+        self.tail_len[slots] = valid.sum(axis=1)
+
+        return sev[len(hist_vals):]
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {"window": self.window, "z_threshold": self.z_threshold, "keys": self._slots.keys(),
+                "tail": self.tail, "tail_len": self.tail_len}
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        self._slots = _SlotMap.from_keys(state["keys"])
+        self.tail = np.asarray(state["tail"], dtype=float).reshape(-1, self.window - 1)
+        self.tail_len = np.asarray(state["tail_len"], dtype=np.int64)
+
+
+class StreamingDetectorSet:
+    def __init__(self, detectors: Optional[List[Any]] = None):
+        if detectors is None:
+            detectors = [StreamingZScoreDetector(), StreamingMADDetector(), StreamingRollingDetector()]
+        self.detectors = detectors
+
+    def update(self, sensor_ids, values) -> Dict[str, np.ndarray]:
+        return {det.name: det.update(sensor_ids, values) for det in self.detectors}
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {"version": STATE_VERSION,
+                "detectors": {det.name: det.state_dict() for det in self.detectors}}
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported streaming state version: {state.get('version')}")
+        saved = state.get("detectors", {})
+        for det in self.detectors:
+            if det.name in saved:
+                det.load_state_dict(saved[det.name])
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".state-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self.state_dict(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str, detectors: Optional[List[Any]] = None) -> "StreamingDetectorSet":
+        det_set = cls(detectors)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                det_set.load_state_dict(pickle.load(f))
+        return det_set
@@ -3,48 +3,60 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from domain.models import DetectionResult
+from domain.prepared import prepare
+from .segments import segment_counts, segment_mean, segment_std
 
 class ZScoreDetector:
+    releases_gil = True
+    accepts_prepared = True
+
     def __init__(self, threshold: float = 3.0, name: str | None = None):
         self.threshold = threshold
         self.name = name or self.__class__.__name__
 
     def _to_series(self, obj):
-        if isinstance(obj, pd.DataFrame):
-            if "value" in obj.columns:
-                s = obj["value"]
-            else:
-                num = obj.select_dtypes(include=[np.number]).columns
-                if len(num) == 0:
-                    return pd.Series(dtype=float)
-                s = obj[num[0]]
-        else:
-            s = obj
-        s = pd.to_numeric(s, errors="coerce").fillna(0.0)
-        return s
+        return prepare(obj).series
 
     def detect(self, series_or_df) -> DetectionResult:
-        s = self._to_series(series_or_df)
-        if s.empty:
+        p = prepare(series_or_df)
+        if p.empty:
             return DetectionResult(anomalies=pd.Series(dtype=float), severity=0.0)
 
-        mean = s.mean()
-        std = s.std(ddof=0)
-
-        anomalies = pd.Series(0.0, index=s.index, name="severity")
-
-        for i, x in s.items():
-            abs_dev = abs(x - mean)
-
-            if std < 1e-6:
-                if abs_dev > self.threshold:
-                    anomalies[i] = abs_dev
-                continue
+        n = len(p)
+        abs_dev = p.abs_dev_mean
+        std = p.std
 
+        sev = np.zeros(n)
+        if std < 1e-6:
+            mask = abs_dev > self.threshold
+            sev[mask] = abs_dev[mask]
+        else:
+            # z > t <=> abs_dev > t * std: prefilter cheaply, then apply the
+            # exact comparison on the few candidates only.
+            bound = min(self.threshold * std, self.threshold) * (1 - 1e-9)
+            cand = np.flatnonzero(abs_dev > bound)
+            dev = abs_dev[cand]
+            z = dev / std
+            keep = (z > self.threshold) | (dev > self.threshold)
+            sev[cand[keep]] = z[keep]
+
+        anomalies = pd.Series(sev, index=p.index, name="severity")
+        severity = float(sev.sum())
+        return DetectionResult(anomalies=anomalies, severity=severity)
+
+    def detect_grouped(self, values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        counts = segment_counts(starts, len(values))
+        mean = segment_mean(values, starts)
+        std = np.repeat(segment_std(values, starts, mean), counts)
+        return self.detect_with_stats(values, np.repeat(mean, counts), std)
+
+    def detect_with_stats(self, values: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+        # score rows against externally maintained (e.g. sliding-window) statistics
+        abs_dev = np.abs(values - mean)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
             z = abs_dev / std
-
-            if z > self.threshold or abs_dev > self.threshold:
-                anomalies[i] = z
-
-        severity = float(anomalies.sum())
-        return DetectionResult(anomalies=anomalies, severity=severity)
\ No newline at end of file
+        flat = std < 1e-6
+        return np.where(flat,
+                        np.where(abs_dev > self.threshold, abs_dev, 0.0),
+                        np.where((z > self.threshold) | (abs_dev > self.threshold), z, 0.0))
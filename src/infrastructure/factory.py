@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 def build_detectors(config: List[Dict[str, Any]]):
     detectors = []
@@ -25,4 +25,25 @@ def build_detectors(config: List[Dict[str, Any]]):
                 params["z_threshold"] = params.pop("threshold")
             detectors.append(RollingDetector(**params))
 
-    return detectors
\ No newline at end of file
+    return detectors
+
+def build_sinks(config: List[Dict[str, Any]], clickhouse: Optional[Dict[str, Any]] = None,
+                dispatcher: Optional[Dict[str, Any]] = None):
+    sinks = []
+    for item in config:
+        t = item.get('type')
+        params = {k: v for k, v in item.items() if k != 'type'}
+
+        if t == 'stdout':
+            from .sinks.alert_sinks import StdOutAlertSink
+            sinks.append(StdOutAlertSink(**params))
+
+        elif t == 'clickhouse':
+            from .sinks.alert_sinks import ClickHouseReportSink
+            sinks.append(ClickHouseReportSink.from_config(params, clickhouse))
+
+    if dispatcher is not None and sinks:
+        # one background dispatcher in front of all sinks: publishing never waits on a sink
+        from .sinks.dispatcher import AlertDispatcher
+        return [AlertDispatcher.from_config(sinks, dispatcher)]
+    return sinks
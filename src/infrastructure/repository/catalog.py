@@ -0,0 +1,104 @@
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class FileCatalog:
+    """Data files of one directory, oldest first (mtime, then name).
+
+    Adding/removing/renaming a file bumps the directory mtime, so the
+    directory is only re-listed when that changed, and only files not seen
+    before are stat'ed. In-place rewrites keep their position; FileIndex
+    freshness checks take care of their contents.
+    """
+
+    def __init__(self, directory: str, extensions: Sequence[str]):
+        self.directory = directory
+        self.extensions = tuple(extensions)
+        self._key = None
+        self._mtimes: Dict[str, int] = {}
+        self._files: List[str] = []
+
+    def files(self) -> List[str]:
+        try:
+            key = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            self._key, self._mtimes, self._files = None, {}, []
+            return []
+        if key == self._key:
+            return self._files
+        names = {f for f in os.listdir(self.directory) if f.endswith(self.extensions)}
+        mtimes = {}
+        for name in names:
+            if name in self._mtimes:
+                mtimes[name] = self._mtimes[name]
+                continue
+            try:
+                mtimes[name] = os.stat(os.path.join(self.directory, name)).st_mtime_ns
+            except FileNotFoundError:
+                continue
+        self._key, self._mtimes = key, mtimes
+        self._files = [os.path.join(self.directory, n) for n in sorted(mtimes, key=lambda n: (mtimes[n], n))]
+        return self._files
+
+    def latest(self) -> Optional[str]:
+        files = self.files()
+        return files[-1] if files else None
+
+
+def _ts_ns(col: pd.Series) -> np.ndarray:
+    if getattr(col.dtype, 'tz', None) is not None:
+        col = col.dt.tz_convert('UTC').dt.tz_localize(None)
+    return col.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def merge_sorted(sources: Iterable[Iterable[pd.DataFrame]], key: str) -> Iterator[pd.DataFrame]:
+    """k-way merge of streams of frames, each stream sorted on `key`.
+
+    Every round emits, from all streams, the rows up to the smallest of the
+    streams' current last keys, so at most one frame per stream is held at a
+    time. Equal keys keep stream order, then row order.
+    """
+    its = [iter(s) for s in sources]
+    heads: List[Optional[Tuple[pd.DataFrame, np.ndarray]]] = [None] * len(its)
+
+    def refill(i):
+        for frame in its[i]:
+            if len(frame):
+                heads[i] = (frame, _ts_ns(frame[key]))
+                return
+        heads[i] = None
+
+    for i in range(len(its)):
+        refill(i)
+    while True:
+        active = [i for i, h in enumerate(heads) if h is not None]
+        if not active:
+            return
+        if len(active) == 1:
+            i = active[0]
+            yield heads[i][0]
+            for frame in its[i]:
+                if len(frame):
+                    yield frame
+            return
+        bound = min(heads[i][1][-1] for i in active)
+        parts, keys = [], []
+        for i in active:
+            frame, ts = heads[i]
+            n = int(np.searchsorted(ts, bound, side='right'))
+            if not n:
+                continue
+            parts.append(frame.iloc[:n])
+            keys.append(ts[:n])
+            if n == len(ts):
+                refill(i)
+            else:
+                heads[i] = (frame.iloc[n:], ts[n:])
+        if len(parts) == 1:
+            yield parts[0]
+            continue
+        order = np.argsort(np.concatenate(keys), kind='stable')
+        yield pd.concat(parts, ignore_index=True).take(order).reset_index(drop=True)
@@ -1,56 +1,130 @@
+import itertools
 import pandas as pd
 import os
-from typing import Optional
+import logging
+from typing import Dict, Iterator, Optional
+
+from .catalog import FileCatalog, merge_sorted
+from .report_store import ReportReader, ReportWriter
+from .window_index import FileIndex
+
+logger = logging.getLogger("infrastructure.repository.clickhouse_stub")
+
+DATA_EXTENSIONS = ('.csv', '.parquet', '.arrow')
+INDEX_DIR = '.index'
+REPORTS_DIR = 'reports'
 
 class ClickHouseRepositoryStub:
-    def __init__(self, repo_root: Optional[str] = None):
+    def __init__(self, repo_root: Optional[str] = None, indexed: bool = True, reports: Optional[dict] = None):
         self.repo_root = repo_root or '.'
         self.data_dir = os.path.join(self.repo_root, 'data')
         os.makedirs(self.data_dir, exist_ok=True)
         self.saved_report = None  
+        self.indexed = indexed
+        self.index_dir = os.path.join(self.data_dir, INDEX_DIR)
+        self.catalog = FileCatalog(self.data_dir, DATA_EXTENSIONS)
+        self._indexes: Dict[str, FileIndex] = {}
+        # reports live in data/reports/ so parquet segments are never mistaken for input files
+        self.reports_dir = os.path.join(self.data_dir, REPORTS_DIR)
+        self.report_options = dict(reports or {})
+        self._reports: Optional[ReportWriter] = None
 
     def _find_latest_file(self) -> Optional[str]:
-        files = [
-            os.path.join(self.data_dir, f)
-            for f in os.listdir(self.data_dir)
-            if f.endswith('.csv')
-        ]
-        if not files:
-            return None
-        latest = max(files, key=os.path.getmtime)
-        return latest
-
-    def read_window(self, start=None, end=None) -> pd.DataFrame:
-        latest = self._find_latest_file()
-        if not latest:
-            return pd.DataFrame()
+        return self.catalog.latest()
+
+    def _index_for(self, path: str) -> Optional[FileIndex]:
+        index = self._indexes.get(path)
+        if index is not None and index.is_fresh(path):
+            return index
+        directory = os.path.join(self.index_dir, os.path.basename(path))
+        index = FileIndex.open(directory)
+        if index is None or not index.is_fresh(path):
+            try:
+                df = self._read_csv(path) if path.endswith('.csv') else self._read_columnar(path)
+                index = FileIndex.build(path, df, directory)
+            except Exception as e:
+                logger.warning("Failed to index %s: %s", path, e)
+                return None
+        if index is not None:
+            self._indexes[path] = index
+        return index
+
+    def _read_columnar(self, path: str, start=None, end=None, columns=None, sensor_ids=None) -> pd.DataFrame:
+        from pipeline.formats import read_columnar
+        return read_columnar(path, columns=columns, start=start, end=end, sensor_ids=sensor_ids)
+
+    def _read_csv(self, path: str, columns=None) -> pd.DataFrame:
+        wanted = set(columns) if columns is not None else None
+        df = pd.read_csv(path, usecols=(lambda c: c in wanted) if wanted is not None else None)
+        ts_col = 'timestamp' if 'timestamp' in df.columns else 'ts' if 'ts' in df.columns else None
+        if ts_col is not None:
+            try:
+                df[ts_col] = pd.to_datetime(df[ts_col])
+            except Exception:
+                pass
+        return df
 
-        try:
-            header = pd.read_csv(latest, nrows=0)
-            cols = set(header.columns.tolist())
-        except Exception:
-            return pd.read_csv(latest)
-
-        parse_dates = []
-        if 'timestamp' in cols:
-            parse_dates = ['timestamp']
-        elif 'ts' in cols:
-            parse_dates = ['ts']
-
-        try:
-            if parse_dates:
-                df = pd.read_csv(latest, parse_dates=parse_dates)
+    def _iter_file(self, path, start, end, columns, sensor_ids, chunk_rows) -> Iterator[pd.DataFrame]:
+        index = self._index_for(path) if self.indexed else None
+        if index is not None:
+            if not index.overlaps(start, end, sensor_ids):
+                return
+            chunks = index.iter_read(start=start, end=end, columns=columns, sensor_ids=sensor_ids,
+                                     chunk_rows=chunk_rows)
+        else:
+            if path.endswith('.csv'):
+                df = self._read_csv(path, columns=columns)
             else:
-                df = pd.read_csv(latest)
-        except Exception:
-            df = pd.read_csv(latest)
-
-        
-        if 'ts' in df.columns and 'timestamp' not in df.columns:
-            df = df.rename(columns={'ts': 'timestamp'})
-
-        df = df.reset_index(drop=True)
-        return df
+                df = self._read_columnar(path, start=start, end=end, columns=columns, sensor_ids=sensor_ids)
+            ts_col = 'timestamp' if 'timestamp' in df.columns else 'ts' if 'ts' in df.columns else None
+            if ts_col is not None and df[ts_col].dtype.kind == 'M':
+                ts = df[ts_col]
+                keep = pd.Series(True, index=df.index)
+                if start is not None:
+                    keep &= ts >= pd.Timestamp(start)
+                if end is not None:
+                    keep &= ts < pd.Timestamp(end)
+                if sensor_ids is not None and 'sensor_id' in df.columns:
+                    keep &= df['sensor_id'].isin(list(sensor_ids))
+                df = df[keep].sort_values(ts_col, kind='stable')
+            chunks = [df]
+        for df in chunks:
+            if 'ts' in df.columns and 'timestamp' not in df.columns:
+                df = df.rename(columns={'ts': 'timestamp'})
+            yield df.reset_index(drop=True)
+
+    def iter_window(self, start=None, end=None, columns=None, sensor_ids=None,
+                    chunk_rows: int = 1_000_000) -> Iterator[pd.DataFrame]:
+        """All data files as one ts-ordered stream of frames (k-way merge, one chunk per file in memory)."""
+        files = self.catalog.files()
+        self._indexes = {p: i for p, i in self._indexes.items() if p in set(files)}
+        if columns is not None:
+            columns = list(columns)
+            if 'timestamp' in columns or 'ts' in columns:
+                columns = columns + [c for c in ('ts', 'timestamp') if c not in columns]
+
+        timed, untimed = [], []
+        for path in files:
+            it = self._iter_file(path, start, end, columns, sensor_ids, chunk_rows)
+            first = next(it, None)
+            if first is None:
+                continue
+            stream = itertools.chain([first], it)
+            if 'timestamp' in first.columns and first['timestamp'].dtype.kind == 'M':
+                timed.append(stream)
+            else:
+                untimed.append(stream)
+        yield from merge_sorted(timed, 'timestamp')
+        # files without a parseable timestamp cannot be ordered; they follow in catalog order
+        for stream in untimed:
+            yield from stream
+
+    def read_window(self, start=None, end=None, columns=None, sensor_ids=None) -> pd.DataFrame:
+        frames = [f for f in self.iter_window(start=start, end=end, columns=columns, sensor_ids=sensor_ids)]
+        if not frames:
+            return pd.DataFrame()
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        return df.reset_index(drop=True)
 
     def read_latest_window(self):
         return self.read_window()
@@ -64,48 +138,22 @@ class ClickHouseRepositoryStub:
 
         return df
 
-    def persist_report(self, report):
-        self.saved_report = report  
-
-        out = os.path.join(self.data_dir, 'anomaly_reports.jsonl')
-        os.makedirs(self.data_dir, exist_ok=True)
-
-        with open(out, 'a', encoding='utf-8') as f:
-            import json
-
-            def default(o):
-                if hasattr(o, 'isoformat'):
-                    try:
-                        return o.isoformat()
-                    except Exception:
-                        return str(o)
-                if isinstance(o, dict):
-                    return o
-                return str(o)
+    @property
+    def reports(self) -> ReportWriter:
+        if self._reports is None:
+            self._reports = ReportWriter(self.reports_dir, **self.report_options)
+        return self._reports
 
-            try:
-                window_start = (
-                    report.window_start.isoformat()
-                    if getattr(report, 'window_start', None) is not None else None
-                )
-            except Exception:
-                window_start = str(getattr(report, 'window_start', None))
-
-            try:
-                window_end = (
-                    report.window_end.isoformat()
-                    if getattr(report, 'window_end', None) is not None else None
-                )
-            except Exception:
-                window_end = str(getattr(report, 'window_end', None))
-
-            payload = {
-                'window_start': window_start,
-                'window_end': window_end,
-                'severity': getattr(report, 'severity', None),
-                'severity_level': getattr(report, 'severity_level', None),
-                'anomalies_count': len(getattr(report, 'anomalies', []) or []),
-                'detector_stats': getattr(report, 'detector_stats', {})
-            }
-
-            f.write(json.dumps(payload, default=default) + '\n')
\ No newline at end of file
+    def persist_report(self, report):
+        self.saved_report = report
+        self.reports.write(report)
+
+    def read_reports(self, start=None, end=None) -> pd.DataFrame:
+        if self._reports is not None:
+            self._reports.flush()
+        return ReportReader(self.reports_dir).query(start=start, end=end)
+
+    def close(self):
+        if self._reports is not None:
+            self._reports.close()
+            self._reports = None
@@ -0,0 +1,344 @@
+import atexit
+import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .window_index import _to_ns
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _ARROW_AVAILABLE = True
+except Exception:
+    _ARROW_AVAILABLE = False
+
+logger = logging.getLogger('infrastructure.repository.report_store')
+
+# Reports are appended to segments named anomaly_reports-<YYYYMMDD>-<seq>.<ext>,
+# the date being the UTC date of window_end. A jsonl segment has a sidecar
+# .idx with one line per flushed block (byte offset, length, window_end range),
+# a parquet segment has one row group per flush, so a time-range query skips
+# other days by file name and other blocks by their range.
+
+PREFIX = 'anomaly_reports'
+FORMATS = ('jsonl', 'parquet')
+COLUMNS = ['window_start', 'window_end', 'sensor_id', 'severity', 'severity_level',
+           'anomalies_count', 'detector_stats']
+
+
+def _json_default(o):
+    if hasattr(o, 'isoformat'):
+        try:
+            return o.isoformat()
+        except Exception:
+            return str(o)
+    if hasattr(o, 'item'):
+        return o.item()
+    return str(o)
+
+
+_ENCODER = json.JSONEncoder(default=_json_default)
+
+
+def _naive_utc(value) -> Optional[pd.Timestamp]:
+    if isinstance(value, pd.Timestamp) and value.tzinfo is None:
+        return value
+    ns = _to_ns(value) if value is not None else None
+    return pd.Timestamp(ns) if ns is not None else None
+
+
+def report_row(report) -> Dict[str, Any]:
+    anomalies = getattr(report, 'anomalies', None)
+    start = getattr(report, 'window_start', None)
+    end = getattr(report, 'window_end', None)
+    sensor = getattr(report, 'sensor_id', None)
+    return {
+        'window_start': _naive_utc(start) if start is not None else None,
+        'window_end': _naive_utc(end) if end is not None else None,
+        'sensor_id': int(sensor) if sensor is not None and not pd.isna(sensor) else None,
+        'severity': getattr(report, 'severity', None),
+        'severity_level': getattr(report, 'severity_level', None),
+        # anomalies is a DataFrame: its truth value is ambiguous, so no `or []`
+        'anomalies_count': len(anomalies) if anomalies is not None else 0,
+        'detector_stats': getattr(report, 'detector_stats', None) or {},
+    }
+
+
+def _segment_date(name: str) -> Optional[datetime.date]:
+    try:
+        return datetime.datetime.strptime(name[len(PREFIX) + 1:len(PREFIX) + 9], '%Y%m%d').date()
+    except ValueError:
+        return None
+
+
+if _ARROW_AVAILABLE:
+    PARQUET_SCHEMA = pa.schema([
+        ('window_start', pa.timestamp('ns')),
+        ('window_end', pa.timestamp('ns')),
+        ('sensor_id', pa.int64()),
+        ('severity', pa.float64()),
+        ('severity_level', pa.string()),
+        ('anomalies_count', pa.int64()),
+        ('detector_stats', pa.string()),
+    ])
+
+
+class ReportWriter:
+    """Append-only report store with one open segment.
+
+    Rows are buffered and written when `flush_rows` are pending or
+    `flush_interval` seconds passed since the last write (checked on write
+    and by a background timer, so an idle writer does not hold rows); a new
+    segment is started when the current one exceeds `max_bytes` or a
+    report's window_end falls on another day. Parquet segments are only
+    readable once rotated or closed (the footer is written last), so
+    flush() closes the open one. A `flush_interval` of None or 0 flushes on
+    row count only.
+    """
+
+    def __init__(self, directory: str, format: str = 'jsonl', flush_rows: int = 256, flush_interval: float = 5.0,
+                 max_bytes: int = 64 * 1024 * 1024, clock=time.monotonic):
+        if format not in FORMATS:
+            raise ValueError(f'Unknown report format {format!r}, expected one of {FORMATS}')
+        if format == 'parquet' and not _ARROW_AVAILABLE:
+            raise RuntimeError('parquet report store requires pyarrow')
+        self.directory = directory
+        self.fmt = format
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+        self._file = None
+        self._index = None
+        self._parquet = None
+        self._path = None
+        self._date = None
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+        self._stop = threading.Event()
+        self._timer = None
+        if flush_interval and flush_interval > 0:
+            self._timer = threading.Thread(target=self._run_timer, name='report-flush', daemon=True)
+            self._timer.start()
+        atexit.register(self.close)
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._path
+
+    def write(self, report) -> None:
+        row = report_row(report)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('ReportWriter is closed')
+            day = (row['window_end'] or pd.Timestamp.utcnow().tz_localize(None)).date()
+            if self._date is not None and day != self._date:
+                self._flush()
+                self._close_segment()
+            self._date = day
+            self._buffer.append(row)
+            if len(self._buffer) >= self.flush_rows or (
+                    self.flush_interval and self.clock() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self) -> None:
+        """Write buffered rows so that a ReportReader sees them."""
+        with self._lock:
+            self._flush()
+            if self.fmt == 'parquet':
+                self._close_segment()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                with self._lock:
+                    if not self._closed and self._buffer and self.clock() - self._last_flush >= self.flush_interval:
+                        self._flush()
+            except Exception:
+                logger.exception('Timed flush of %s failed', self.directory)
+
+    def _flush(self):
+        self._last_flush = self.clock()
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        if self._path is None:
+            self._open_segment()
+        if self.fmt == 'jsonl':
+            self._write_jsonl(rows)
+        else:
+            self._write_parquet(rows)
+        if self._size() >= self.max_bytes:
+            self._close_segment()
+
+    def _size(self) -> int:
+        if self.fmt == 'jsonl':
+            return self._file.tell()
+        return self._parquet_bytes
+
+    def _open_segment(self):
+        stem = f'{PREFIX}-{self._date:%Y%m%d}'
+        seqs = [int(os.path.basename(p)[len(stem) + 1:].split('.')[0])
+                for p in glob.glob(os.path.join(self.directory, f'{stem}-*.{self.fmt}'))]
+        self._path = os.path.join(self.directory, f'{stem}-{max(seqs, default=-1) + 1:04d}.{self.fmt}')
+        if self.fmt == 'jsonl':
+            self._file = open(self._path, 'ab')
+            self._index = open(self._path + '.idx', 'a', encoding='utf-8')
+        else:
+            self._parquet = pq.ParquetWriter(self._path + '.tmp', PARQUET_SCHEMA)
+            self._parquet_bytes = 0
+
+    def _write_jsonl(self, rows):
+        lines = []
+        for r in rows:
+            start, end = r['window_start'], r['window_end']
+            lines.append(_ENCODER.encode(dict(r, window_start=start.isoformat() if start is not None else None,
+                                              window_end=end.isoformat() if end is not None else None)))
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        offset = self._file.tell()
+        self._file.write(data)
+        self._file.flush()
+        ends = [r['window_end'].value for r in rows if r['window_end'] is not None]
+        self._index.write(json.dumps({'offset': offset, 'length': len(data), 'rows': len(rows),
+                                      'min': min(ends, default=None), 'max': max(ends, default=None)}) + '\n')
+        self._index.flush()
+
+    def _write_parquet(self, rows):
+        columns = {c: [r[c] for r in rows] for c in COLUMNS}
+        columns['detector_stats'] = [json.dumps(s, default=_json_default) for s in columns['detector_stats']]
+        table = pa.Table.from_pydict(columns, schema=PARQUET_SCHEMA)
+        self._parquet.write_table(table, row_group_size=len(rows))
+        self._parquet_bytes += table.nbytes
+
+    def _close_segment(self):
+        if self._path is None:
+            return
+        if self.fmt == 'jsonl':
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+        else:
+            self._parquet.close()
+            os.replace(self._path + '.tmp', self._path)
+            self._parquet = None
+        self._path = None
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.join()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                self._flush()
+            finally:
+                self._close_segment()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReportReader:
+    """Reads reports with window_end in [start, end) from a ReportWriter directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def segments(self, start=None, end=None) -> List[str]:
+        lo = _naive_utc(start).date() if start is not None else None
+        hi = _naive_utc(end).date() if end is not None else None
+        out = []
+        for path in sorted(glob.glob(os.path.join(self.directory, f'{PREFIX}-*'))):
+            if not path.endswith(tuple(f'.{f}' for f in FORMATS)):
+                continue
+            day = _segment_date(os.path.basename(path))
+            if day is not None and ((lo is not None and day < lo) or (hi is not None and day > hi)):
+                continue
+            out.append(path)
+        return out
+
+    def query(self, start=None, end=None) -> pd.DataFrame:
+        lo, hi = _to_ns(start), _to_ns(end)
+        frames = []
+        for path in self.segments(start, end):
+            df = self._read_jsonl(path, lo, hi) if path.endswith('.jsonl') else self._read_parquet(path, lo, hi)
+            if len(df):
+                frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        if lo is not None or hi is not None:
+            ends = df['window_end'].to_numpy(dtype='datetime64[ns]').view('int64')
+            keep = ~df['window_end'].isna().to_numpy()
+            if lo is not None:
+                keep &= ends >= lo
+            if hi is not None:
+                keep &= ends < hi
+            df = df[keep]
+        return df.sort_values('window_end', kind='stable', ignore_index=True)
+
+    def _blocks(self, path: str, lo, hi):
+        blocks, covered = [], 0
+        try:
+            with open(path + '.idx', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        b = json.loads(line)
+                    except ValueError:
+                        break
+                    covered = b['offset'] + b['length']
+                    if b['min'] is None or ((hi is None or b['min'] < hi) and (lo is None or b['max'] >= lo)):
+                        blocks.append((b['offset'], b['length']))
+        except FileNotFoundError:
+            pass
+        # rows written after the last indexed block (crash between data and index write)
+        size = os.path.getsize(path)
+        if size > covered:
+            blocks.append((covered, size - covered))
+        return blocks
+
+    def _read_jsonl(self, path: str, lo, hi) -> pd.DataFrame:
+        rows = []
+        with open(path, 'rb') as f:
+            for offset, length in self._blocks(path, lo, hi):
+                f.seek(offset)
+                rows.extend(json.loads(line) for line in f.read(length).splitlines() if line.strip())
+        df = pd.DataFrame(rows, columns=COLUMNS)
+        for c in ('window_start', 'window_end'):
+            df[c] = pd.to_datetime(df[c], format='ISO8601')
+        return df
+
+    def _read_parquet(self, path: str, lo, hi) -> pd.DataFrame:
+        if not _ARROW_AVAILABLE:
+            raise RuntimeError('reading parquet reports requires pyarrow')
+        pf = pq.ParquetFile(path)
+        end_col = pf.schema_arrow.get_field_index('window_end')
+        groups = []
+        for i in range(pf.num_row_groups):
+            stats = pf.metadata.row_group(i).column(end_col).statistics
+            if stats is not None and stats.has_min_max:
+                mn, mx = _to_ns(stats.min), _to_ns(stats.max)
+                if (hi is not None and mn >= hi) or (lo is not None and mx < lo):
+                    continue
+            groups.append(i)
+        if not groups:
+            return pd.DataFrame(columns=COLUMNS)
+        df = pf.read_row_groups(groups).to_pandas()
+        df['detector_stats'] = [json.loads(s) if s is not None else {} for s in df['detector_stats']]
+        return df
@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+
+# Sorted on-disk layout of one data file: every column is a .npy array in
+# ts order, so a [start, end) window is two binary searches on the memory-mapped
+# ts column plus contiguous slices of the other columns.
+
+INDEX_VERSION = 2
+TS_COLUMNS = ('ts', 'timestamp')
+
+
+def _to_ns(value) -> Optional[int]:
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return int(ts.as_unit('ns').value)
+
+
+def _sensor_key(value) -> str:
+    # 1, 1.0 and np.int64(1) name the same sensor in meta['sensors']
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    return str(value)
+
+
+class FileIndex:
+    def __init__(self, directory: str, meta: Dict[str, Any]):
+        self.directory = directory
+        self.meta = meta
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    @property
+    def ts_name(self) -> str:
+        return self.meta['ts_name']
+
+    @property
+    def ts_min(self) -> Optional[int]:
+        return self.meta['ts_min']
+
+    @property
+    def ts_max(self) -> Optional[int]:
+        return self.meta['ts_max']
+
+    def is_fresh(self, source: str) -> bool:
+        try:
+            st = os.stat(source)
+        except FileNotFoundError:
+            return False
+        return (self.meta.get('version') == INDEX_VERSION
+                and self.meta['source_mtime_ns'] == st.st_mtime_ns
+                and self.meta['source_size'] == st.st_size)
+
+    def overlaps(self, start=None, end=None, sensor_ids=None) -> bool:
+        lo, hi = _to_ns(start), _to_ns(end)
+        ranges = [(self.ts_min, self.ts_max)]
+        if sensor_ids is not None:
+            sensors = self.meta['sensors']
+            ranges = [tuple(sensors[k][:2]) for k in map(_sensor_key, sensor_ids) if k in sensors]
+        return any(r[0] is not None and (lo is None or r[1] >= lo) and (hi is None or r[0] < hi)
+                   for r in ranges)
+
+    def _array(self, name: str) -> np.ndarray:
+        arr = self._arrays.get(name)
+        if arr is None:
+            arr = np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+            self._arrays[name] = arr
+        return arr
+
+    def row_range(self, start=None, end=None):
+        ts = self._array(self.ts_name)
+        lo = 0 if start is None else int(np.searchsorted(ts, _to_ns(start), side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, _to_ns(end), side='left'))
+        return lo, max(lo, hi)
+
+    def _column(self, spec: Dict[str, Any], lo: int, hi: int):
+        data = np.array(self._array(spec['name'])[lo:hi])
+        if spec['kind'] == 'datetime':
+            col = pd.Series(data.view('datetime64[ns]'))
+            return col.dt.tz_localize('UTC').dt.tz_convert(spec['tz']) if spec.get('tz') else col
+        if spec['kind'] == 'codes':
+            return pd.Categorical.from_codes(data, categories=spec['categories']).astype(object)
+        return data
+
+    def read(self, start=None, end=None, columns=None, sensor_ids=None) -> pd.DataFrame:
+        lo, hi = self.row_range(start, end)
+        return self._read_rows(lo, hi, columns, sensor_ids)
+
+    def iter_read(self, start=None, end=None, columns=None, sensor_ids=None,
+                  chunk_rows: int = 1_000_000) -> Iterator[pd.DataFrame]:
+        # same rows as read(), in ts order, at most chunk_rows per frame
+        lo, hi = self.row_range(start, end)
+        for a in range(lo, hi, chunk_rows):
+            yield self._read_rows(a, min(a + chunk_rows, hi), columns, sensor_ids)
+
+    def _read_rows(self, lo: int, hi: int, columns=None, sensor_ids=None) -> pd.DataFrame:
+        specs = self.meta['columns']
+        if columns is not None:
+            wanted = set(columns) | ({'sensor_id'} if sensor_ids is not None else set())
+            specs = [c for c in specs if c['name'] in wanted]
+        df = pd.DataFrame({c['name']: self._column(c, lo, hi) for c in specs})
+        if sensor_ids is not None and 'sensor_id' in df.columns:
+            df = df[df['sensor_id'].isin(list(sensor_ids))]
+            if columns is not None and 'sensor_id' not in columns:
+                df = df.drop(columns='sensor_id')
+        return df.reset_index(drop=True)
+
+    @classmethod
+    def open(cls, directory: str) -> Optional['FileIndex']:
+        try:
+            with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+                return cls(directory, json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @classmethod
+    def build(cls, source: str, df: pd.DataFrame, directory: str) -> Optional['FileIndex']:
+        ts_name = next((c for c in TS_COLUMNS if c in df.columns), None)
+        if ts_name is None:
+            return None
+        st = os.stat(source)
+        ts = pd.to_datetime(df[ts_name])
+        tz = str(ts.dt.tz) if ts.dt.tz is not None else None
+        if tz:
+            ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+        ts_ns = ts.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        order = np.argsort(ts_ns, kind='stable')
+
+        tmp = directory + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        specs: List[Dict[str, Any]] = []
+        for name in df.columns:
+            col = df[name]
+            if name == ts_name:
+                spec, data = {'name': name, 'kind': 'datetime', 'tz': tz}, ts_ns
+            elif col.dtype.kind == 'M':
+                spec = {'name': name, 'kind': 'datetime', 'tz': None}
+                data = col.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            elif col.dtype.kind in 'biuf':
+                spec, data = {'name': name, 'kind': 'numeric'}, col.to_numpy()
+            else:
+                codes, uniques = pd.factorize(col.astype(object))
+                spec = {'name': name, 'kind': 'codes', 'categories': [u.item() if hasattr(u, 'item') else u for u in uniques]}
+                data = codes.astype(np.int32)
+            np.save(os.path.join(tmp, f'{name}.npy'), np.ascontiguousarray(data[order]))
+            specs.append(spec)
+
+        sensors = {}
+        if 'sensor_id' in df.columns and len(df):
+            g = pd.DataFrame({'s': df['sensor_id'].to_numpy(), 't': ts_ns}).groupby('s', sort=False, dropna=False)['t']
+            stats = g.agg(['min', 'max', 'count'])
+            for k, a, b, c in zip(stats.index, stats['min'], stats['max'], stats['count']):
+                key = _sensor_key(k)
+                if key in sensors:
+                    a, b, c = min(a, sensors[key][0]), max(b, sensors[key][1]), c + sensors[key][2]
+                sensors[key] = [int(a), int(b), int(c)]
+
+        meta = {
+            'version': INDEX_VERSION,
+            'source': os.path.basename(source),
+            'source_mtime_ns': st.st_mtime_ns,
+            'source_size': st.st_size,
+            'rows': int(len(df)),
+            'ts_name': ts_name,
+            'ts_min': int(ts_ns.min()) if len(ts_ns) else None,
+            'ts_max': int(ts_ns.max()) if len(ts_ns) else None,
+            'sensors': sensors,
+            'columns': specs,
+        }
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+        return cls(directory, meta)
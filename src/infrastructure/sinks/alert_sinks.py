@@ -1,16 +1,90 @@
-from typing import Any
+from typing import Any, Dict, Iterable, Optional
 from domain.models import AnomalyReport
-import json, datetime
+import json, datetime, logging, sys
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(ts) -> Optional[str]:
+    return ts.isoformat() if ts is not None and hasattr(ts, 'isoformat') else (None if ts is None else str(ts))
+
+
+def report_summary(report: AnomalyReport) -> Dict[str, Any]:
+    return {'window_start': _iso(report.window_start),
+            'window_end': _iso(report.window_end),
+            'sensor_id': report.sensor_id,
+            'severity': report.severity,
+            'severity_level': report.severity_level,
+            'anomalies_count': len(report.anomalies)}
+
 
 class StdOutAlertSink:
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def _format(self, report: AnomalyReport) -> str:
+        return (f'--- ALERT ---\n'
+                f'window: {report.window_start} -> {report.window_end}\n'
+                f'severity: {report.severity} ({report.severity_level})\n'
+                f'anomalies: {len(report.anomalies)}\n'
+                f'{json.dumps(report_summary(report), default=str)}\n')
+
     def send(self, report: AnomalyReport) -> None:
-        print('--- ALERT ---')
-        print(f'window: {report.window_start} -> {report.window_end}')
-        print(f'severity: {report.severity} ({report.severity_level})')
-        print(f'anomalies: {len(report.anomalies)}')
-        
-        print(json.dumps({'window_start': report.window_start.isoformat(),
-                          'window_end': report.window_end.isoformat(),
-                          'severity': report.severity,
-                          'severity_level': report.severity_level,
-                          'anomalies_count': len(report.anomalies)}, default=str))
+        self.send_batch([report])
+
+    def send_batch(self, reports: Iterable[AnomalyReport]) -> None:
+        # one write per batch instead of five prints per report
+        stream = self.stream or sys.stdout
+        stream.write(''.join(self._format(r) for r in reports))
+        stream.flush()
+
+
+class ClickHouseReportSink:
+    """Inserts report summaries into `database.table` with one JSONEachRow INSERT per batch.
+
+    Columns as in clickhouse/init.sql (anomaly_demo.anomaly_reports):
+    generated_at, window_start, window_end, sensor_id (Nullable), severity,
+    severity_level, anomalies_count, detector_stats (JSON string).
+    """
+
+    def __init__(self, table: str = 'anomaly_reports', host: str = 'localhost', port: int = 8123,
+                 username: str = 'default', password: str = '', database: str = 'default',
+                 timeout: float = 10.0, session=None):
+        self.table = table
+        self.url = f'http://{host}:{port}/'
+        self.auth = (username, password or '')
+        self.database = database
+        self.timeout = timeout
+        self._session = session
+
+    @classmethod
+    def from_config(cls, item: Dict[str, Any], clickhouse: Optional[Dict[str, Any]] = None):
+        params = dict(clickhouse or {})
+        params.update({k: v for k, v in item.items() if k != 'type'})
+        return cls(**params)
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def _row(self, report: AnomalyReport) -> str:
+        row = report_summary(report)
+        row['detector_stats'] = json.dumps(report.detector_stats or {}, default=str)
+        row['generated_at'] = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None).isoformat()
+        return json.dumps(row, default=str)
+
+    def send(self, report: AnomalyReport) -> None:
+        self.send_batch([report])
+
+    def send_batch(self, reports: Iterable[AnomalyReport]) -> None:
+        body = '\n'.join(self._row(r) for r in reports)
+        if not body:
+            return
+        query = f'INSERT INTO {self.database}.{self.table} FORMAT JSONEachRow'
+        r = self.session.post(self.url, params={'query': query, 'date_time_input_format': 'best_effort'},
+                              data=body.encode('utf-8'), auth=self.auth, timeout=self.timeout)
+        if r.status_code >= 300:
+            raise RuntimeError(f'ClickHouse report insert failed: HTTP {r.status_code}: {r.text[:200]}')
@@ -0,0 +1,186 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from domain.models import AnomalyReport
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+
+def _bucket_of(report: AnomalyReport, seconds: Optional[float]):
+    ts = report.window_end or report.window_start
+    if not seconds or ts is None:
+        return ts
+    return int(pd.Timestamp(ts).value // int(seconds * 1e9))
+
+
+def _coalesce(reports: List[AnomalyReport]) -> AnomalyReport:
+    # one alert per sensor/bucket: the most severe report, covering all windows and anomalies
+    top = max(reports, key=lambda r: (SEVERITY_ORDER.get(r.severity_level, 0), r.severity))
+    if len(reports) == 1:
+        return top
+    starts = [r.window_start for r in reports if r.window_start is not None]
+    ends = [r.window_end for r in reports if r.window_end is not None]
+    frames = [r.anomalies for r in reports if r.anomalies is not None and len(r.anomalies)]
+    anomalies = top.anomalies
+    if len(frames) > 1:
+        cats = pd.Index([]).append([f["detector"].astype("category").cat.categories for f in frames]).unique()
+        frames = [f.assign(detector=f["detector"].astype("category").cat.set_categories(cats)) for f in frames]
+        anomalies = (pd.concat(frames, ignore_index=True)
+                     .drop_duplicates(["timestamp", "sensor_id", "detector"], keep="last", ignore_index=True))
+    return replace(top, window_start=min(starts) if starts else None, window_end=max(ends) if ends else None,
+                   anomalies=anomalies)
+
+
+def _fingerprint(report: AnomalyReport) -> int:
+    anomalies = report.anomalies
+    body = 0
+    if anomalies is not None and len(anomalies):
+        cols = anomalies[["timestamp", "sensor_id", "detector"]].astype(str)
+        body = int(pd.util.hash_pandas_object(cols, index=False).sum())
+    return hash((report.sensor_id, report.severity_level, body))
+
+
+class AlertDispatcher:
+    """AlertSink that hands reports to a background thread and returns at once.
+
+    Reports wait in a bounded queue (a full queue drops the new report and
+    counts it in `dropped`). The dispatcher thread takes up to `batch_size`
+    reports or whatever arrived within `flush_interval` seconds, then
+    - coalesces reports of the same sensor whose window ends fall into the
+      same `coalesce_seconds` bucket,
+    - drops a report whose anomalies/severity repeat an alert sent less than
+      `dedup_seconds` ago,
+    - limits each sensor to `rate_per_minute` alerts (token bucket),
+    and passes the batch to every sink, through `send_batch` when the sink
+    has one. Sink errors are logged and never reach the service.
+    """
+
+    def __init__(self, sinks, queue_size: int = 1000, batch_size: int = 100, flush_interval: float = 1.0,
+                 coalesce_seconds: Optional[float] = None, dedup_seconds: Optional[float] = None,
+                 rate_per_minute: Optional[float] = None, clock=time.monotonic):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.coalesce_seconds = coalesce_seconds
+        self.dedup_seconds = dedup_seconds
+        self.rate_per_minute = rate_per_minute
+        self.clock = clock
+        self.dropped = 0
+        self.suppressed = 0
+        self.coalesced = 0
+        self.sent = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._recent: Dict[int, float] = {}
+        self._tokens: Dict[object, tuple] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, sinks, cfg: Optional[dict]):
+        return cls(sinks, **dict(cfg or {}))
+
+    def send(self, report: AnomalyReport) -> None:
+        try:
+            self._queue.put_nowait(report)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning("Alert queue full, %d reports dropped so far", self.dropped)
+
+    def _take_batch(self) -> List[AnomalyReport]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                self._dispatch(self._filter(batch))
+            except Exception:
+                logger.exception("Alert dispatch failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _filter(self, batch: List[AnomalyReport]) -> List[AnomalyReport]:
+        groups: Dict[tuple, List[AnomalyReport]] = {}
+        if self.coalesce_seconds:
+            for r in batch:
+                groups.setdefault((r.sensor_id, _bucket_of(r, self.coalesce_seconds)), []).append(r)
+            reports = [_coalesce(g) for g in groups.values()]
+            self.coalesced += len(batch) - len(reports)
+        else:
+            reports = batch
+
+        now = self.clock()
+        out = []
+        for r in reports:
+            if self.dedup_seconds:
+                key = _fingerprint(r)
+                if now - self._recent.get(key, float("-inf")) < self.dedup_seconds:
+                    self.suppressed += 1
+                    continue
+                self._recent[key] = now
+            if self.rate_per_minute and not self._allow(r.sensor_id, now):
+                self.suppressed += 1
+                continue
+            out.append(r)
+        if self.dedup_seconds and len(self._recent) > 10_000:
+            self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedup_seconds}
+        return out
+
+    def _allow(self, sensor, now: float) -> bool:
+        rate = self.rate_per_minute / 60.0
+        burst = max(1.0, self.rate_per_minute)
+        tokens, last = self._tokens.get(sensor, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        if tokens < 1.0:
+            self._tokens[sensor] = (tokens, now)
+            return False
+        self._tokens[sensor] = (tokens - 1.0, now)
+        return True
+
+    def _dispatch(self, reports: List[AnomalyReport]):
+        if not reports:
+            return
+        for sink in self.sinks:
+            try:
+                if hasattr(sink, "send_batch"):
+                    sink.send_batch(reports)
+                else:
+                    for r in reports:
+                        sink.send(r)
+            except Exception:
+                logger.exception("Sink %s failed", sink.__class__.__name__)
+        self.sent += len(reports)
+
+    def flush(self):
+        """Block until every queued report has been dispatched."""
+        self._queue.join()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
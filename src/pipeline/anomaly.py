@@ -1,23 +1,162 @@
-from typing import Dict
+from collections import OrderedDict
+from typing import Dict, Optional
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 from .config import settings
 
-def detect_anomalies_isolation(df: pd.DataFrame, contamination=0.01) -> pd.DataFrame:
+MIN_TRAIN_ROWS = 10
+
+
+class CompiledForest:
+    """A fitted 1-D IsolationForest reduced to a step function.
+
+    On one feature every tree maps an interval between consecutive split
+    thresholds to the same leaf, so the forest's score_samples is constant
+    between the union of all thresholds. Trees compare float32 inputs with
+    `x <= threshold`; rounding each threshold down to float32 keeps that
+    comparison exact. Scoring is then one searchsorted instead of one
+    tree.apply per estimator, and the table is much smaller than the trees.
+    """
+
+    __slots__ = ('breaks', 'scores', 'offset', 'median', 'scale', 'batches')
+
+    def __init__(self, model: IsolationForest, X: np.ndarray, contamination):
+        thresholds = np.concatenate([e.tree_.threshold[e.tree_.children_left >= 0] for e in model.estimators_])
+        t32 = thresholds.astype(np.float32)
+        t32 = np.where(t32.astype(np.float64) > thresholds, np.nextafter(t32, np.float32(-np.inf)), t32)
+        self.breaks = np.unique(t32)
+        points = np.r_[self.breaks, np.float32(np.inf)].reshape(-1, 1)
+        self.scores = model.score_samples(points)
+        x = np.asarray(X, dtype=float).ravel()
+        self.offset = -0.5 if contamination == 'auto' else float(np.nanpercentile(self.score(x), 100.0 * contamination))
+        self.median = float(np.nanmedian(x))
+        mad = float(np.nanmedian(np.abs(x - self.median))) * 1.4826
+        self.scale = mad if mad > 0 else (float(np.nanstd(x)) or 1.0)
+        self.batches = 0
+
+    def score(self, values: np.ndarray) -> np.ndarray:
+        x32 = np.asarray(values, dtype=np.float32)
+        return self.scores[np.searchsorted(self.breaks, x32, side='left')]
+
+    def predict(self, values: np.ndarray) -> np.ndarray:
+        # same convention as IsolationForest.predict: -1 outlier, 1 inlier
+        return np.where(self.score(values) - self.offset < 0, -1, 1)
+
+    def drift(self, values: np.ndarray) -> float:
+        return abs(float(np.nanmedian(values)) - self.median) / self.scale
+
+
+def _fit_compiled(batch, contamination, params):
+    out = []
+    for sid, X in batch:
+        # contamination='auto' skips sklearn's own scoring pass over X; the
+        # offset is recomputed from the compiled scores exactly as fit() would
+        model = IsolationForest(contamination='auto', **params).fit(X.reshape(-1, 1))
+        out.append((sid, CompiledForest(model, X, contamination)))
+    return out
+
+
+class IsolationModelCache:
+    """Fitted per-sensor isolation forests reused across batches.
+
+    A sensor is (re)trained on its current batch when it has no model, when
+    its model has scored `retrain_every` batches, or when the batch median
+    moved more than `drift_threshold` robust standard deviations away from
+    the training median. Training of all sensors that need it in a batch is
+    spread over `n_jobs` joblib workers. At most `max_models` models are kept
+    (least recently used evicted first).
+    """
+
+    def __init__(self, contamination=0.01, max_models: int = 1024, retrain_every: Optional[int] = None,
+                 drift_threshold: Optional[float] = None, n_jobs: Optional[int] = 1, random_state=42,
+                 min_rows: int = MIN_TRAIN_ROWS, **params):
+        self.contamination = contamination
+        self.max_models = int(max_models)
+        self.retrain_every = retrain_every
+        self.drift_threshold = drift_threshold
+        self.n_jobs = n_jobs
+        self.min_rows = int(min_rows)
+        self.params = dict(params, random_state=random_state)
+        self.models: "OrderedDict[object, CompiledForest]" = OrderedDict()
+        self.fits = 0
+
+    def __len__(self):
+        return len(self.models)
+
+    def __contains__(self, sid):
+        return sid in self.models
+
+    def _needs_training(self, sid, values: np.ndarray) -> bool:
+        model = self.models.get(sid)
+        if model is None:
+            return len(values) >= self.min_rows
+        if len(values) < self.min_rows:
+            return False
+        if self.retrain_every and model.batches >= self.retrain_every:
+            return True
+        return self.drift_threshold is not None and model.drift(values) > self.drift_threshold
+
+    def _train(self, batch):
+        if not batch:
+            return
+        n_jobs = self.n_jobs or 1
+        if n_jobs == 1 or len(batch) < 2:
+            fitted = _fit_compiled(batch, self.contamination, self.params)
+        else:
+            from joblib import Parallel, delayed, effective_n_jobs
+            parts = min(len(batch), effective_n_jobs(n_jobs) * 4)
+            fitted = [m for chunk in Parallel(n_jobs=n_jobs)(
+                delayed(_fit_compiled)(batch[i::parts], self.contamination, self.params) for i in range(parts))
+                for m in chunk]
+        for sid, model in fitted:
+            self.models[sid] = model
+            self.models.move_to_end(sid)
+        self.fits += len(fitted)
+
+    def _evict(self):
+        while len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+
+    def predict(self, groups: Dict[object, np.ndarray]) -> Dict[object, np.ndarray]:
+        """groups: sensor -> values; returns sensor -> 0/1 anomaly flags."""
+        self._train([(sid, v) for sid, v in groups.items() if self._needs_training(sid, v)])
+        out = {}
+        for sid, values in groups.items():
+            model = self.models.get(sid)
+            if model is None:
+                out[sid] = np.zeros(len(values), dtype=int)
+                continue
+            self.models.move_to_end(sid)
+            model.batches += 1
+            out[sid] = (model.predict(values) == -1).astype(int)
+        self._evict()
+        return out
+
+
+def detect_anomalies_isolation(df: pd.DataFrame, contamination=0.01,
+                               cache: Optional[IsolationModelCache] = None) -> pd.DataFrame:
     df = df.copy()
     df['anomaly'] = 0
+    if df.empty:
+        return df
+    if cache is None:
+        cache = IsolationModelCache(contamination=contamination)
 
-    for sid, g in df.groupby('sensor_id'):
-        X = g['value'].astype(float).values.reshape(-1, 1)
-        if len(X) < 10:
-            continue
-        clf = IsolationForest(contamination=contamination, random_state=42)
-        preds = clf.fit_predict(X)
-        
-        mask = (preds == -1)
-        df.loc[g.index, 'anomaly'] = mask.astype(int)
+    # one stable sort instead of groupby; rows without a sensor (code -1) stay 0
+    codes, sensors = pd.factorize(df['sensor_id'])
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(sensors) + 1))
+    values = df['value'].astype(float).to_numpy()[order]
+    groups = {sid: values[bounds[i]:bounds[i + 1]] for i, sid in enumerate(sensors)}
 
+    flags = cache.predict(groups)
+    sorted_flags = np.zeros(len(df), dtype=int)
+    for i, sid in enumerate(sensors):
+        sorted_flags[bounds[i]:bounds[i + 1]] = flags[sid]
+    out = np.empty(len(df), dtype=int)
+    out[order] = sorted_flags
+    df['anomaly'] = out
     return df
 
 def _modified_z_scores(vals: np.ndarray) -> np.ndarray:
@@ -33,18 +172,99 @@ def _modified_z_scores(vals: np.ndarray) -> np.ndarray:
     return 0.6745 * (vals - median) / mad
 
 
+def _segment_sort(codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # order by (code, value): one float argsort for the value ranks, then one
+    # int64 argsort on code * n + rank (unique keys) -- ~3x faster than np.lexsort
+    n = len(values)
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.argsort(values)] = np.arange(n)
+    return np.argsort(codes.astype(np.int64) * n + rank)
+
+
+def _kth_of_halves(x, med, starts, split, ends, k):
+    """k-th smallest |x - med| of each sorted run x[starts:ends], without sorting the deviations.
+
+    Left of `split` the deviations med - x[split-1], med - x[split-2], ... are
+    ascending, right of it x[split] - med, ... too; the k-th smallest of the
+    two sorted halves is found with one vectorized binary search over all runs.
+    """
+    a, b = split - starts, ends - split
+    lo, hi = np.maximum(0, k + 1 - b), np.minimum(k + 1, a)
+    while True:
+        active = lo < hi
+        if not active.any():
+            break
+        i = (lo + hi) // 2
+        j = k + 1 - i
+        # take more from the left half while its next deviation is smaller than the right half's last taken
+        a_next = med - x[np.clip(split - 1 - i, 0, len(x) - 1)]
+        b_last = x[np.clip(split + j - 1, 0, len(x) - 1)] - med
+        more = active & (i < a) & (j > 0) & (b_last > a_next)
+        lo = np.where(more, i + 1, lo)
+        hi = np.where(active & ~more, i, hi)
+    i, j = lo, k + 1 - lo
+    from_a = np.where(i > 0, med - x[np.clip(split - i, 0, len(x) - 1)], -np.inf)
+    from_b = np.where(j > 0, x[np.clip(split + j - 1, 0, len(x) - 1)] - med, -np.inf)
+    return np.maximum(from_a, from_b)
+
+
+def _grouped_modified_z_scores(codes: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """_modified_z_scores of every row against its own group, all groups at once.
+
+    One sort by (code, value) lays each group out as a sorted run: the median
+    is the middle of the run and the MAD the middle of the two sorted halves
+    of deviations (_kth_of_halves). Groups with MAD 0 fall back to the plain
+    z-score, groups holding a NaN score 0 (np.median would be NaN there).
+    """
+    counts = np.bincount(codes, minlength=groups)
+    has_nan = np.bincount(codes, weights=np.isnan(values), minlength=groups) > 0
+    starts = np.cumsum(counts) - counts
+    ends = starts + counts
+    mid_lo, mid_hi = (counts - 1) // 2, counts // 2
+    x = values[_segment_sort(codes, values)]
+
+    median = np.full(groups, np.nan)
+    mad = np.full(groups, np.nan)
+    ok = (counts > 0) & ~has_nan
+    if ok.any():
+        s, e, lo, hi = starts[ok], ends[ok], mid_lo[ok], mid_hi[ok]
+        med = (x[s + lo] + x[s + hi]) / 2.0
+        split = s + hi
+        median[ok] = med
+        mad[ok] = (_kth_of_halves(x, med, s, split, e, lo) + _kth_of_halves(x, med, s, split, e, hi)) / 2.0
+
+    safe = np.maximum(counts, 1)
+    mean = np.bincount(codes, weights=values, minlength=groups) / safe
+    std = np.sqrt(np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=groups) / safe)
+
+    fallback = (mad == 0)[codes]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(fallback, (values - mean[codes]) / std[codes], 0.6745 * (values - median[codes]) / mad[codes])
+    z[(fallback & (std == 0)[codes]) | ~ok[codes]] = 0.0
+    return z
+
+
 def detect_anomalies_zscore(df: pd.DataFrame, z_thresh: float = 3.5) -> pd.DataFrame:
     df = df.copy()
-    df['anomaly'] = 0
+    # rows without a sensor (code -1) stay 0, like groupby's dropped NaN keys
+    codes, sensors = pd.factorize(df['sensor_id'])
+    flags = np.zeros(len(df), dtype=np.int64)
+    rows = np.flatnonzero(codes >= 0)
+    if len(rows):
+        z = _grouped_modified_z_scores(codes[rows], df['value'].astype(float).to_numpy()[rows], len(sensors))
+        flags[rows] = np.abs(z) > z_thresh
+    df['anomaly'] = flags
+    return df
 
-    for sid, g in df.groupby('sensor_id'):
-        if len(g) < 2:
-            continue
-        vals = g['value'].astype(float).values
-        mz = _modified_z_scores(vals)
-        mask = np.abs(mz) > z_thresh
-        df.loc[g.index, 'anomaly'] = mask.astype(int)
+def detect_anomalies_streaming(df: pd.DataFrame, detectors) -> pd.DataFrame:
+    df = df.copy()
+    values = pd.to_numeric(df['value'], errors='coerce').fillna(0.0).to_numpy(dtype=float)
+    sensors = df['sensor_id'].to_numpy() if 'sensor_id' in df.columns else np.zeros(len(df), dtype=int)
 
+    flagged = np.zeros(len(df), dtype=bool)
+    for sev in detectors.update(sensors, values).values():
+        flagged |= sev > 0
+    df['anomaly'] = flagged.astype(int)
     return df
 
 def anomaly_stats(df: pd.DataFrame) -> Dict[str, float]:
@@ -52,9 +272,10 @@ def anomaly_stats(df: pd.DataFrame) -> Dict[str, float]:
     an = int(df['anomaly'].sum()) if 'anomaly' in df else 0
     return {'total_rows': total, 'anomalies': an, 'anomaly_rate': an / total if total else 0.0}
 
-def detect_anomalies(df: pd.DataFrame, contamination=0.01) -> pd.DataFrame:
+def detect_anomalies(df: pd.DataFrame, contamination=0.01,
+                     cache: Optional[IsolationModelCache] = None) -> pd.DataFrame:
     
     method = getattr(settings, 'detect_method', 'isolation')
     if method == 'zscore':
         return detect_anomalies_zscore(df)
-    return detect_anomalies_isolation(df, contamination=contamination)
\ No newline at end of file
+    return detect_anomalies_isolation(df, contamination=contamination, cache=cache)
\ No newline at end of file
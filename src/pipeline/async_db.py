@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, wait
+from typing import Dict, Optional
+
+import pandas as pd
+
+from . import db
+from .config import settings
+
+try:
+    import aiohttp
+    _AIOHTTP_AVAILABLE = True
+except Exception:
+    _AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger("pipeline.async_db")
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def encode_batch(ts_seconds, sensor_ids, values, block_rows: int = db.NATIVE_BLOCK_ROWS,
+                 compress: bool = True) -> bytes:
+    return b"".join(db._NativeBody(ts_seconds, sensor_ids, values, block_rows, compress))
+
+
+def dedup_token(key: str, part: int, batch: int, body: bytes) -> str:
+    # same file, chunk, batch and bytes -> same token, so a re-sent insert is dropped by ClickHouse
+    return f"{key}:{part}:{batch}:{hashlib.blake2b(body, digest_size=8).hexdigest()}"
+
+
+class AsyncClickHouseWriter:
+    """Uploads timeseries inserts from a background asyncio loop.
+
+    submit() only slices the frame into batches and queues them; encoding
+    and upload happen on the loop, so the caller can extract/detect the next
+    file while this one uploads. At most `concurrency` connections are open
+    and at most `max_in_flight` batches are queued; submit() blocks while the
+    queue is full. Batches with the same key (one input file) are inserted strictly in
+    submission order; if one fails after `retries` attempts, the later
+    batches of that key fail too instead of being inserted out of order.
+    Every insert carries an `insert_deduplication_token`, so retries and
+    re-processed files are at-least-once on the wire but stored once
+    (needs a Replicated*MergeTree table or `non_replicated_deduplication_window`, which
+    clickhouse/init.sql sets on pipeline.timeseries).
+    """
+
+    def __init__(self, url: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 concurrency: Optional[int] = None, max_in_flight: int = 8, batch_rows: Optional[int] = None,
+                 block_rows: int = db.NATIVE_BLOCK_ROWS, compress: bool = True, timeout: float = 30.0,
+                 retries: int = 5, backoff: float = 0.3):
+        if not _AIOHTTP_AVAILABLE:
+            raise RuntimeError("AsyncClickHouseWriter requires aiohttp (pip install aiohttp)")
+        self.url = url or f"{db.CLICKHOUSE_URL}/"
+        self.user = user or db.CLICKHOUSE_USER
+        self.password = password or db.CLICKHOUSE_PASSWORD
+        self.concurrency = concurrency or settings.clickhouse_pool_size
+        self.max_in_flight = max_in_flight
+        self.batch_rows = batch_rows or settings.clickhouse_insert_batch_rows
+        self.block_rows = block_rows
+        self.compress = compress
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._tails: Dict[str, asyncio.Future] = {}
+        self._closed = False
+        self._session = None
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="clickhouse-writer", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._open())
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.run_until_complete(self._session.close())
+            self._loop.close()
+
+    async def _open(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            headers={"Authorization": aiohttp.BasicAuth(self.user, self.password).encode()},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    def submit(self, df: pd.DataFrame, key: str, part: int = 0) -> Future:
+        """Queue `df` (ts, sensor_id, value) for insertion under `key`.
+
+        `part` numbers the chunks of one file for the dedup token. The
+        returned Future resolves to the number of rows inserted once every
+        batch of this call is acknowledged, or raises RuntimeError.
+        """
+        if self._closed:
+            raise RuntimeError("AsyncClickHouseWriter is closed")
+        done = Future()
+        if df is None or df.empty:
+            done.set_result(0)
+            return done
+
+        ts_seconds = db._epoch_seconds(df["ts"])
+        sensor_ids = df["sensor_id"].to_numpy()
+        values = pd.to_numeric(df["value"], errors="coerce").to_numpy(dtype="<f8")
+        batches = []
+        for i, lo in enumerate(range(0, len(values), self.batch_rows)):
+            hi = lo + self.batch_rows
+            # backpressure: wait for a free slot before queueing another batch
+            self._slots.acquire()
+            fut = asyncio.run_coroutine_threadsafe(
+                self._enqueue(key, part, i, ts_seconds[lo:hi], sensor_ids[lo:hi], values[lo:hi]), self._loop)
+            with self._lock:
+                self._pending.add(fut)
+            fut.add_done_callback(self._release)
+            batches.append(fut)
+
+        remaining = [len(batches)]
+
+        def _collect(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            errors = [f.exception() for f in batches if f.exception() is not None]
+            if errors:
+                done.set_exception(errors[0])
+            else:
+                done.set_result(sum(f.result() for f in batches))
+
+        for fut in batches:
+            fut.add_done_callback(_collect)
+        return done
+
+    def _release(self, fut):
+        with self._lock:
+            self._pending.discard(fut)
+        self._slots.release()
+
+    async def _enqueue(self, key, part, batch, ts_seconds, sensor_ids, values):
+        # runs in submission order: chaining on the key's previous batch keeps per-file ordering
+        prev = self._tails.get(key)
+        task = asyncio.ensure_future(self._send(prev, key, part, batch, ts_seconds, sensor_ids, values))
+        self._tails[key] = task
+        try:
+            return await task
+        finally:
+            if self._tails.get(key) is task:
+                del self._tails[key]
+
+    async def _send(self, prev, key, part, batch, ts_seconds, sensor_ids, values) -> int:
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(None, encode_batch, ts_seconds, sensor_ids, values,
+                                          self.block_rows, self.compress)
+        if prev is not None:
+            try:
+                await prev
+            except Exception as e:
+                raise RuntimeError(f"{key}: batch {part}/{batch} not inserted, an earlier batch failed") from e
+
+        params = {"query": db.TIMESERIES_INSERT, "insert_deduplicate": "1",
+                  "insert_deduplication_token": dedup_token(key, part, batch, body)}
+        headers = {"Content-Type": "application/octet-stream"}
+        if self.compress:
+            headers["Content-Encoding"] = "gzip"
+        err = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                async with self._session.post(self.url, params=params, data=body, headers=headers) as r:
+                    if r.status < 300:
+                        return len(values)
+                    err = RuntimeError(f"ClickHouse insert failed: HTTP {r.status}: {(await r.text())[:200]}")
+                    if r.status not in RETRY_STATUSES:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                err = RuntimeError(f"ClickHouse insert failed: {e!r}")
+            logger.warning("%s: insert of batch %d/%d failed (attempt %d): %s", key, part, batch, attempt + 1, err)
+        logger.error("%s: giving up on batch %d/%d (%d rows)", key, part, batch, len(values))
+        raise err
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every queued batch; False if some are still running after `timeout`."""
+        with self._lock:
+            pending = list(self._pending)
+        return not wait(pending, timeout=timeout).not_done
+
+    def close(self, timeout: Optional[float] = None):
+        if self._closed:
+            return
+        self._closed = True
+        if not self.flush(timeout):
+            logger.warning("Closing ClickHouse writer with inserts still in flight")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -14,6 +14,13 @@ def _env_int(name: str, default: Optional[int]):
     except Exception:
         return default
 
+def _env_float(name: str, default: Optional[float]):
+    v = os.getenv(name)
+    try:
+        return float(v) if v is not None else default
+    except Exception:
+        return default
+
 settings = SimpleNamespace(
     clickhouse_host = _env("CLICKHOUSE_HOST", "clickhouse"),
     clickhouse_port = _env_int("CLICKHOUSE_PORT", 9000),
@@ -23,6 +30,18 @@ settings = SimpleNamespace(
     clickhouse_database = _env("CLICKHOUSE_DATABASE", "pipeline"),
     prometheus_port = _env_int("PROMETHEUS_PORT", None),
     detect_method = _env("DETECT_METHOD", "isolation"),
+    clickhouse_insert_batch_rows = _env_int("CLICKHOUSE_INSERT_BATCH_ROWS", 1_000_000),
+    clickhouse_pool_size = _env_int("CLICKHOUSE_POOL_SIZE", 4),
+    clickhouse_async_insert = _env("CLICKHOUSE_ASYNC_INSERT", "0").lower() in ("1", "true", "yes"),
+    clickhouse_max_in_flight = _env_int("CLICKHOUSE_MAX_IN_FLIGHT", 8),
+    isolation_max_models = _env_int("ISOLATION_MAX_MODELS", 1024),
+    isolation_retrain_every = _env_int("ISOLATION_RETRAIN_EVERY", None),
+    isolation_drift_threshold = _env_float("ISOLATION_DRIFT_THRESHOLD", 3.0),
+    isolation_n_jobs = _env_int("ISOLATION_N_JOBS", 1),
+    low_memory = _env("PIPELINE_LOW_MEMORY", "0").lower() in ("1", "true", "yes"),
+    profile_dir = _env("PIPELINE_PROFILE_DIR", None),
+    profile_threshold_ms = _env_int("PIPELINE_PROFILE_THRESHOLD_MS", 5000),
+    profile_interval_ms = _env_float("PIPELINE_PROFILE_INTERVAL_MS", 5.0),
 )
 
 @dataclass
@@ -36,6 +55,18 @@ class PipelineConfig:
     clickhouse_table: str = "timeseries"
     prometheus_port: Optional[int] = settings.prometheus_port
     detect_method: str = settings.detect_method
+    clickhouse_insert_batch_rows: int = settings.clickhouse_insert_batch_rows
+    clickhouse_pool_size: int = settings.clickhouse_pool_size
+    clickhouse_async_insert: bool = settings.clickhouse_async_insert
+    clickhouse_max_in_flight: int = settings.clickhouse_max_in_flight
+    isolation_max_models: int = settings.isolation_max_models
+    isolation_retrain_every: Optional[int] = settings.isolation_retrain_every
+    isolation_drift_threshold: Optional[float] = settings.isolation_drift_threshold
+    isolation_n_jobs: Optional[int] = settings.isolation_n_jobs
+    low_memory: bool = settings.low_memory
+    profile_dir: Optional[str] = settings.profile_dir
+    profile_threshold_ms: Optional[int] = settings.profile_threshold_ms
+    profile_interval_ms: Optional[float] = settings.profile_interval_ms
 
 def load_pipeline_config(path: Optional[str] = None) -> SimpleNamespace:
     default = SimpleNamespace(detectors=[], raw={})
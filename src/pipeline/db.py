@@ -1,5 +1,9 @@
 import logging
 import os
+import threading
+import zlib
+import numpy as np
+import pandas as pd
 import requests
 from requests.adapters import HTTPAdapter, Retry
 from .config import settings
@@ -20,28 +24,129 @@ CLICKHOUSE_USER = os.environ.get("CLICKHOUSE_USER", settings.clickhouse_user)
 CLICKHOUSE_PASSWORD = os.environ.get("CLICKHOUSE_PASSWORD", settings.clickhouse_password)
 CLICKHOUSE_URL = f"http://{CLICKHOUSE_HOST}:{CLICKHOUSE_PORT}"
 
-def _http_session(retries: int = 3, backoff: float = 0.3) -> requests.Session:
+TIMESERIES_INSERT = "INSERT INTO pipeline.timeseries (ts, sensor_id, value) FORMAT Native"
+NATIVE_BLOCK_ROWS = 65536
+GZIP_LEVEL = 1
+DATETIME_MAX = 2**32 - 1
+
+def _http_session(retries: int = 3, backoff: float = 0.3, pool_size: int = 4) -> requests.Session:
     s = requests.Session()
     retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(500, 502, 503, 504))
-    s.mount("http://", HTTPAdapter(max_retries=retry))
+    s.mount("http://", HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=pool_size))
     return s
 
-def write_timeseries(df, timeout: int = 10):
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _http_session(pool_size=settings.clickhouse_pool_size)
+        return _session
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+def _native_string(s: str) -> bytes:
+    raw = s.encode("utf-8")
+    return _varint(len(raw)) + raw
+
+def _native_string_column(values) -> bytes:
+    # sensors repeat a lot: encode each distinct value once, then gather the
+    # encoded bytes for every row with one fancy-indexing pass
+    codes, uniques = pd.factorize(values)
+    encoded = [_native_string(str(u)) for u in uniques]
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    enc_len = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    enc_start = np.concatenate([[0], np.cumsum(enc_len)[:-1]])
+
+    row_len = enc_len[codes]
+    row_start = np.concatenate([[0], np.cumsum(row_len)[:-1]])
+    shift = np.repeat(enc_start[codes] - row_start, row_len)
+    return blob[np.arange(int(row_len.sum())) + shift].tobytes()
+
+def _epoch_seconds(ts) -> np.ndarray:
+    ts = pd.Series(ts)
+    if ts.dtype.kind == "M":
+        if getattr(ts.dt, "tz", None) is not None:
+            ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+        secs = ts.to_numpy(dtype="datetime64[ns]").astype(np.int64) // 1_000_000_000
+    else:
+        ts = pd.to_datetime(ts)
+        secs = ts.to_numpy(dtype="datetime64[ns]").astype(np.int64) // 1_000_000_000
+    # DateTime is a UInt32 on the wire: NaT (int64 min) and dates outside
+    # 1970..2106 would silently wrap instead of failing like a text insert
+    if ts.isna().any():
+        raise ValueError(f"{int(ts.isna().sum())} rows have no timestamp (NaT); ClickHouse DateTime needs one")
+    if len(secs) and (secs.min() < 0 or secs.max() > DATETIME_MAX):
+        raise ValueError(f"timestamps {ts.min()} .. {ts.max()} are outside the ClickHouse DateTime range "
+                         "1970-01-01 .. 2106-02-07")
+    return secs.astype("<u4")
+
+def native_block(ts_seconds: np.ndarray, sensor_ids, values: np.ndarray) -> bytes:
+    parts = [
+        _varint(3), _varint(len(values)),
+        _native_string("ts"), _native_string("DateTime"), np.asarray(ts_seconds, dtype="<u4").tobytes(),
+        _native_string("sensor_id"), _native_string("String"), _native_string_column(sensor_ids),
+        _native_string("value"), _native_string("Float64"), np.asarray(values, dtype="<f8").tobytes(),
+    ]
+    return b"".join(parts)
+
+class _NativeBody:
+    # re-iterable so urllib3 can replay the body on a retried connection
+    def __init__(self, ts_seconds, sensor_ids, values, block_rows: int, compress: bool):
+        self.ts_seconds = ts_seconds
+        self.sensor_ids = sensor_ids
+        self.values = values
+        self.block_rows = block_rows
+        self.compress = compress
+
+    def __iter__(self):
+        comp = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if self.compress else None
+        for lo in range(0, len(self.values), self.block_rows):
+            hi = lo + self.block_rows
+            raw = native_block(self.ts_seconds[lo:hi], self.sensor_ids[lo:hi], self.values[lo:hi])
+            chunk = comp.compress(raw) if comp else raw
+            if chunk:
+                yield chunk
+        if comp:
+            tail = comp.flush()
+            if tail:
+                yield tail
+
+def write_timeseries(df, timeout: int = 10, batch_rows: int = None, block_rows: int = NATIVE_BLOCK_ROWS,
+                     compress: bool = True):
     if df is None or df.empty:
         return
 
-    lines = []
-    for _, row in df.iterrows():
-        lines.append(f"{row['ts']}\t{row['sensor_id']}\t{row['value']}")
-    payload = "\n".join(lines).encode("utf-8")
-
-    query = "INSERT INTO pipeline.timeseries (ts, sensor_id, value) FORMAT TSV"
-    url = f"{CLICKHOUSE_URL}/?query={query}"
-
-    session = _http_session()
-    try:
-        r = session.post(url, data=payload, auth=(CLICKHOUSE_USER, CLICKHOUSE_PASSWORD), timeout=timeout)
-        r.raise_for_status()
-    except requests.RequestException as e:
-        logger.error("ClickHouse insert error: %s (url=%s host=%s)", e, url, CLICKHOUSE_HOST)
-        raise RuntimeError(f"ClickHouse insert failed: {e}")
\ No newline at end of file
+    batch_rows = batch_rows or settings.clickhouse_insert_batch_rows
+    ts_seconds = _epoch_seconds(df["ts"])
+    sensor_ids = df["sensor_id"].to_numpy()
+    values = pd.to_numeric(df["value"], errors="coerce").to_numpy(dtype="<f8")
+
+    url = f"{CLICKHOUSE_URL}/"
+    headers = {"Content-Type": "application/octet-stream"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    session = get_session()
+    for lo in range(0, len(df), batch_rows):
+        hi = lo + batch_rows
+        body = _NativeBody(ts_seconds[lo:hi], sensor_ids[lo:hi], values[lo:hi], block_rows, compress)
+        try:
+            r = session.post(url, params={"query": TIMESERIES_INSERT}, data=body, headers=headers,
+                             auth=(CLICKHOUSE_USER, CLICKHOUSE_PASSWORD), timeout=timeout)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            logger.error("ClickHouse insert error: %s (url=%s host=%s rows=%d..%d)",
+                         e, url, CLICKHOUSE_HOST, lo, min(hi, len(df)))
+            raise RuntimeError(f"ClickHouse insert failed: {e}")
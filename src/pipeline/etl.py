@@ -1,12 +1,131 @@
+import logging
+import re
+from typing import Iterator, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from .utils import ensure_datetime
+from .formats import detect_format, estimate_row_bytes, iter_columnar_batches, read_columnar
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    _ARROW_AVAILABLE = True
+except Exception:
+    _ARROW_AVAILABLE = False
+
+logger = logging.getLogger("pipeline.etl")
+
+# transform/detect/load keep a few copies of a chunk alive at once
+CHUNK_MEMORY_FACTOR = 4
+DEFAULT_CHUNK_ROWS = 1_000_000
+# transform(low_memory=True): values are detector inputs, single precision is enough
+LOW_MEMORY_VALUE_DTYPE = "float32"
 
 def extract_from_csv(path: str) -> pd.DataFrame:
     return pd.read_csv(path)
 
-def transform(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def extract(path: str, columns=None, low_memory: bool = False, fmt: Optional[str] = None) -> pd.DataFrame:
+    # fmt overrides the extension, e.g. for a claimed "a.parquet@host-pid.claimed"
+    fmt = fmt or detect_format(path)
+    if fmt == "csv":
+        if low_memory:
+            return read_csv_compact(path, columns=columns)
+        df = pd.read_csv(path, usecols=columns)
+        # lets transform() reuse the timestamp format detected for this file
+        df.attrs["source"] = path
+        return df
+    return read_columnar(path, columns=columns, fmt=fmt)
+
+def _compact_sensor(sensor: np.ndarray) -> np.ndarray:
+    if sensor.dtype.kind in "iu" and len(sensor) and -2**31 <= sensor.min() and sensor.max() < 2**31:
+        return sensor.astype(np.int32)
+    return sensor
+
+def _count_lines(path: str, block: int = 1 << 24) -> int:
+    n = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(block)
+            if not buf:
+                break
+            n += buf.count(b"\n")
+            last = buf[-1:]
+    return n + (last != b"\n")
+
+_NAIVE_ISO = re.compile(r"\d{4}-\d\d-\d\d([T ]\d\d:\d\d(:\d\d(\.\d{1,9})?)?)?")
+
+def read_csv_compact(path: str, columns=None, value_dtype: str = LOW_MEMORY_VALUE_DTYPE,
+                     block_rows: int = 250_000) -> pd.DataFrame:
+    """Read a CSV without ever holding the timestamp column as Python strings.
+
+    The file is parsed block by block (pyarrow's streaming reader when
+    available, pandas chunks otherwise) into columns preallocated from a
+    line count: datetime64 ts, int32 sensor ids, `value_dtype` values.
+    Naive ISO timestamps are parsed by the reader; anything else (offsets,
+    other formats) goes through ensure_datetime block by block as arrow
+    strings, so it comes out as in the default path.
+    """
+    ts_col, _ = _csv_schema(path)
+    head = pd.read_csv(path, nrows=1, usecols=columns, dtype=str)
+    names = list(head.columns)
+    capacity = max(_count_lines(path) - 1, 0)
+    if _ARROW_AVAILABLE:
+        naive_iso = ts_col not in head or not len(head) or bool(_NAIVE_ISO.fullmatch(str(head[ts_col].iloc[0])))
+        # small blocks: the reader keeps several blocks in flight
+        ts_type = pa.timestamp("ns") if naive_iso else pa.string()
+        convert = pa_csv.ConvertOptions(column_types={ts_col: ts_type, "value": pa.float64()},
+                                        include_columns=list(columns) if columns is not None else None)
+        reader = pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=1 << 20),
+                                 convert_options=convert)
+        batches = ({name: batch.column(name).to_pandas(types_mapper=pd.ArrowDtype) if name == ts_col and not naive_iso
+                    else batch.column(name).to_numpy(zero_copy_only=False) for name in batch.schema.names}
+                   for batch in reader)
+    else:
+        chunks = pd.read_csv(path, chunksize=block_rows, usecols=columns)
+        batches = ({name: chunk[name] if name == ts_col else chunk[name].to_numpy() for name in chunk.columns}
+                   for chunk in chunks)
+
+    out, pos, tz = {}, 0, None
+    for batch in batches:
+        k = len(next(iter(batch.values()), ()))
+        if pos + k > capacity:
+            capacity = max(pos + k, capacity * 2)
+            out = {name: np.resize(col, capacity) for name, col in out.items()}
+        for name, arr in batch.items():
+            if name == ts_col and arr.dtype.kind != "M":
+                ts = ensure_datetime(arr, source=path)
+                if pos and getattr(ts.dt, "tz", None) != tz:
+                    raise ValueError(f"{path}: timestamps mix time zones/offsets (or naive and aware values); "
+                                     "normalise them to one offset or to UTC before loading")
+                tz = getattr(ts.dt, "tz", None)
+                if tz is not None:
+                    ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+                arr = ts.to_numpy(dtype="datetime64[ns]")
+            elif name == "value":
+                arr = pd.to_numeric(arr, errors="coerce").astype(value_dtype, copy=False)
+            elif name == "sensor_id":
+                arr = _compact_sensor(arr)
+            col = out.get(name)
+            if col is None:
+                col = out[name] = np.empty(capacity, dtype=arr.dtype)
+            elif not np.can_cast(arr.dtype, col.dtype, casting="same_kind") or arr.dtype.itemsize > col.dtype.itemsize:
+                col = out[name] = col.astype(np.result_type(col.dtype, arr.dtype)) if arr.dtype.kind != "O" else col.astype(object)
+            col[pos:pos + k] = arr
+        pos += k
+    if _ARROW_AVAILABLE:
+        # hand the reader's buffers back to the OS before the caller builds on the frame
+        pa.default_memory_pool().release_unused()
+    # a header-only file still gets its columns, typed as a non-empty one would be
+    empty = {ts_col: "datetime64[ns]", "sensor_id": np.int32, "value": value_dtype}
+    df = pd.DataFrame({name: out[name][:pos] if name in out else np.empty(0, dtype=empty.get(name, object))
+                       for name in names}, copy=False)
+    if tz is not None:
+        df[ts_col] = df[ts_col].dt.tz_localize("UTC").dt.tz_convert(tz)
+    return df
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
     if "ts" in df.columns:
         ts_col = "ts"
     elif "timestamp" in df.columns:
@@ -16,19 +135,259 @@ def transform(df: pd.DataFrame) -> pd.DataFrame:
     else:
         raise KeyError("Input DataFrame must contain either 'ts' or 'timestamp' column")
 
-    df["ts"] = ensure_datetime(df["ts"])
+    df["ts"] = ensure_datetime(df["ts"], source=df.attrs.get("source"))
 
-    df["value"] = pd.to_numeric(df.get("value"), errors="coerce").fillna(0.0)
+    df["value"] = pd.to_numeric(df.get("value"), errors="coerce")
 
     if "sensor_id" not in df.columns:
         
         df["sensor_id"] = 0
 
-    df = df.sort_values(["sensor_id", "ts"])
+    return df.sort_values(["sensor_id", "ts"])
+
+def transform(df: pd.DataFrame, low_memory: bool = False, value_dtype: Optional[str] = None) -> pd.DataFrame:
+    if low_memory:
+        return _transform_compact(df, value_dtype or LOW_MEMORY_VALUE_DTYPE)
+    df = _prepare(df.copy())
 
-    df["value"] = df.groupby("sensor_id")["value"].ffill().fillna(0.0)
+    df["value"] = df.groupby("sensor_id", observed=True)["value"].ffill().fillna(0.0)
 
     return df
 
+def _ffill_segments(values: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    # forward-fill NaNs within each [bounds[i], bounds[i+1]) segment, leading NaNs -> 0
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    last = np.arange(len(values), dtype=np.int32 if len(values) < 2**31 else np.int64)
+    last[missing] = 0
+    np.maximum.accumulate(last, out=last)
+    rows = np.flatnonzero(missing)
+    src = last[rows]
+    del last
+    seg_start = bounds[np.searchsorted(bounds, rows, side="right") - 1]
+    fill = values[src]
+    fill[src < seg_start] = 0.0
+    values[rows] = np.nan_to_num(fill, nan=0.0)
+    return values
+
+SORT_BLOCK_ROWS = 1 << 20
+
+def _sensor_codes(sensor: pd.Series):
+    # integer ids in a compact range: a lookup table instead of a hash factorize with intp codes
+    arr = sensor.to_numpy()
+    n = len(arr)
+    if arr.dtype.kind in "iu" and n:
+        lo, hi = int(arr.min()), int(arr.max())
+        if hi - lo < max(n, 1 << 16):
+            present = np.zeros(hi - lo + 1, dtype=bool)
+            for i in range(0, n, SORT_BLOCK_ROWS):
+                present[np.unique(arr[i:i + SORT_BLOCK_ROWS]) - lo] = True
+            lookup = (np.cumsum(present) - 1).astype(np.int32)
+            codes = np.empty(n, dtype=np.int32)
+            for i in range(0, n, SORT_BLOCK_ROWS):
+                codes[i:i + SORT_BLOCK_ROWS] = lookup[arr[i:i + SORT_BLOCK_ROWS] - lo]
+            return codes, pd.Index(np.flatnonzero(present) + lo)
+    codes, categories = pd.factorize(sensor, sort=True)
+    return codes.astype(np.int32), categories
+
+def _group_counts(key: np.ndarray, groups: int) -> np.ndarray:
+    counts = np.zeros(groups, dtype=np.int64)
+    for lo in range(0, len(key), SORT_BLOCK_ROWS):
+        counts += np.bincount(key[lo:lo + SORT_BLOCK_ROWS], minlength=groups)
+    return counts
+
+def _group_order(key: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Stable argsort of small-range integer keys, built block by block as int32.
+
+    A counting sort: each block is argsorted on its own and its rows are
+    placed after the rows of the same key from earlier blocks.
+    """
+    offset = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    order = np.empty(len(key), dtype=np.int32)
+    for lo in range(0, len(key), SORT_BLOCK_ROWS):
+        k = key[lo:lo + SORT_BLOCK_ROWS]
+        o = np.argsort(k, kind="stable")
+        ks = k[o]
+        block_counts = np.bincount(k, minlength=len(counts))
+        first = np.concatenate(([0], np.cumsum(block_counts)[:-1]))
+        order[offset[ks] + np.arange(len(k)) - first[ks]] = o + lo
+        offset += block_counts
+    return order
+
+def _transform_compact(df: pd.DataFrame, value_dtype: str) -> pd.DataFrame:
+    """transform() without defensive copies; `df` is consumed (its columns are popped).
+
+    sensor_id becomes a categorical, value is stored as `value_dtype`, ts stays
+    datetime64[ns] (an int64 epoch underneath). Time-ordered input is grouped
+    by sensor with an int32 counting sort (any other input falls back to a
+    lexsort of (sensor, ts)); each column is then permuted and released in
+    turn, and the sorted sensor codes are rebuilt from the group counts, so
+    at most one extra column is alive at a time. The result has a RangeIndex.
+    """
+    if "ts" in df.columns:
+        ts_col = "ts"
+    elif "timestamp" in df.columns:
+        ts_col = "timestamp"
+    else:
+        raise KeyError("Input DataFrame must contain either 'ts' or 'timestamp' column")
+    names = ["ts" if c == ts_col else c for c in df.columns]
+    if "sensor_id" not in names:
+        names.append("sensor_id")
+    n = len(df)
+
+    source = df.attrs.get("source")
+    ts = df.pop(ts_col)
+    if ts.dtype.kind != "M":
+        ts = ensure_datetime(ts, source=source)
+    tz = getattr(ts.dt, "tz", None)
+    ts_ns = ts.dt.tz_convert("UTC").dt.tz_localize(None) if tz is not None else ts
+    ts_ns = ts_ns.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    del ts
+
+    if "sensor_id" in df.columns:
+        key, categories = _sensor_codes(df.pop("sensor_id"))
+    else:
+        key, categories = np.zeros(n, dtype=np.int32), pd.Index([0])
+    values = pd.to_numeric(df.pop("value") if "value" in df.columns else pd.Series(np.nan, index=range(n)),
+                           errors="coerce").to_numpy(dtype=value_dtype)
+
+    # rows without a sensor (code -1) sort last, like sort_values
+    groups = len(categories)
+    if (key < 0).any():
+        key[key < 0] = groups
+        groups += 1
+    counts = _group_counts(key, groups)
+    if n < 2**31 and (n < 2 or bool((ts_ns[1:] >= ts_ns[:-1]).all())):
+        order = _group_order(key, counts)
+    else:
+        order = np.lexsort((ts_ns, key))
+    del key
+
+    values = values[order]
+    ts_ns = ts_ns[order]
+    out = {}
+    for name in list(df.columns):
+        out[name] = df.pop(name).to_numpy()[order]
+    del order
+
+    code_dtype = np.int8 if groups < 2**7 else np.int16 if groups < 2**15 else np.int32
+    codes = np.repeat(np.arange(groups, dtype=code_dtype), counts)
+    bounds = np.cumsum(counts)
+    if groups > len(categories):
+        # groupby drops rows without a sensor; the default path ends up with 0.0 there
+        start = bounds[-2] if groups > 1 else 0
+        values[start:] = 0.0
+        codes[start:] = -1
+    values = _ffill_segments(values, np.r_[0, bounds])
+
+    ts = pd.Series(ts_ns.view("datetime64[ns]"), copy=False)
+    if tz is not None:
+        ts = ts.dt.tz_localize("UTC").dt.tz_convert(tz)
+    out["ts"] = ts
+    out["sensor_id"] = pd.Categorical.from_codes(codes, categories=categories)
+    out["value"] = values
+    return pd.DataFrame({name: out[name] for name in names}, copy=False)
+
+class ChunkTransformer:
+    """transform() for consecutive chunks of one file.
+
+    Keeps the last seen value per sensor so forward-fill continues across
+    chunk boundaries instead of restarting at 0.0 in every chunk.
+    """
+
+    def __init__(self):
+        self.last_values = pd.Series(dtype=float)
+
+    def __call__(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        df = _prepare(chunk)
+        df["value"] = df.groupby("sensor_id", observed=True)["value"].ffill()
+
+        missing = df["value"].isna().to_numpy()
+        if missing.any() and len(self.last_values):
+            keys = df["sensor_id"].to_numpy()[missing]
+            df.loc[missing, "value"] = self.last_values.reindex(keys).to_numpy()
+
+        seen = df.loc[df["value"].notna(), ["sensor_id", "value"]]
+        if len(seen):
+            last = seen.groupby("sensor_id", observed=True)["value"].last()
+            last.index = last.index.astype(object)
+            self.last_values = last.combine_first(self.last_values)
+
+        df["value"] = df["value"].fillna(0.0)
+        return df
+
+def _csv_schema(path: str, value_dtype: str = "float64"):
+    header = pd.read_csv(path, nrows=0).columns
+    if "ts" in header:
+        ts_col = "ts"
+    elif "timestamp" in header:
+        ts_col = "timestamp"
+    else:
+        raise KeyError(f"{path}: CSV must contain either 'ts' or 'timestamp' column")
+    dtype = {}
+    if "sensor_id" in header:
+        dtype["sensor_id"] = "category"
+    if "value" in header:
+        dtype["value"] = value_dtype
+    return ts_col, dtype
+
+def chunk_rows_for_budget(path: str, memory_limit_mb: float, value_dtype: str = "float64",
+                          sample_rows: int = 10_000) -> int:
+    ts_col, dtype = _csv_schema(path, value_dtype)
+    sample = pd.read_csv(path, nrows=sample_rows, dtype=dtype, parse_dates=[ts_col])
+    if sample.empty:
+        return DEFAULT_CHUNK_ROWS
+    row_bytes = sample.memory_usage(index=True, deep=True).sum() / len(sample)
+    return max(1_000, int(memory_limit_mb * 1024 * 1024 / (row_bytes * CHUNK_MEMORY_FACTOR)))
+
+def _numeric_categories(col: pd.Series) -> pd.Series:
+    # categories are read as strings; keep integer sensor ids identical to the
+    # non-chunked path (and to persisted detector state)
+    cats = col.cat.categories
+    as_num = pd.to_numeric(cats, errors="coerce")
+    if len(cats) and not np.isnan(as_num).any() and (as_num == np.round(as_num)).all():
+        return col.cat.rename_categories(as_num.astype(np.int64))
+    return col
+
+def iter_csv_chunks(path: str, chunksize: Optional[int] = None, memory_limit_mb: Optional[float] = None,
+                    value_dtype: str = "float64") -> Iterator[pd.DataFrame]:
+    ts_col, dtype = _csv_schema(path, value_dtype)
+    if chunksize is None:
+        chunksize = (chunk_rows_for_budget(path, memory_limit_mb, value_dtype)
+                     if memory_limit_mb else DEFAULT_CHUNK_ROWS)
+    logger.info("Reading %s in chunks of %d rows", path, chunksize)
+
+    reader = pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+    with reader:
+        for chunk in reader:
+            # format is inferred on the first chunk and reused for the rest
+            chunk[ts_col] = ensure_datetime(chunk[ts_col], source=path)
+            if "sensor_id" in chunk.columns:
+                chunk["sensor_id"] = _numeric_categories(chunk["sensor_id"])
+            yield chunk
+
+def iter_raw_chunks(path: str, chunksize: Optional[int] = None,
+                    memory_limit_mb: Optional[float] = None,
+                    value_dtype: str = "float64", fmt: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    fmt = fmt or detect_format(path)
+    if fmt != "csv":
+        if chunksize is None:
+            chunksize = DEFAULT_CHUNK_ROWS
+            if memory_limit_mb:
+                row_bytes = estimate_row_bytes(path, fmt)
+                chunksize = max(1_000, int(memory_limit_mb * 1024 * 1024 / (row_bytes * CHUNK_MEMORY_FACTOR)))
+        yield from iter_columnar_batches(path, chunksize, fmt=fmt)
+        return
+    yield from iter_csv_chunks(path, chunksize=chunksize, memory_limit_mb=memory_limit_mb,
+                               value_dtype=value_dtype)
+
+def iter_transformed_chunks(path: str, chunksize: Optional[int] = None,
+                            memory_limit_mb: Optional[float] = None,
+                            value_dtype: str = "float64") -> Iterator[pd.DataFrame]:
+    step = ChunkTransformer()
+    for chunk in iter_raw_chunks(path, chunksize, memory_limit_mb, value_dtype):
+        yield step(chunk)
+
 def load(df, client_writer):
-    client_writer(df)
\ No newline at end of file
+    client_writer(df)
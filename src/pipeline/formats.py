@@ -0,0 +1,183 @@
+import os
+from typing import Iterator, List, Optional, Sequence
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    _ARROW_AVAILABLE = True
+except Exception:
+    _ARROW_AVAILABLE = False
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".ipc", ".feather")
+INPUT_PATTERNS = ("*.csv", "*.parquet", "*.arrow")
+TS_COLUMNS = ("ts", "timestamp")
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return "parquet"
+    if ext in ARROW_EXTENSIONS:
+        return "arrow"
+    return "csv"
+
+def _require_arrow():
+    if not _ARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is not available in environment")
+
+def read_schema(path: str, fmt: Optional[str] = None) -> "pa.Schema":
+    _require_arrow()
+    if (fmt or detect_format(path)) == "parquet":
+        return pq.read_schema(path, memory_map=True)
+    with pa.memory_map(path, "r") as source:
+        return ipc.open_file(source).schema
+
+def ts_column(names: Sequence[str]) -> Optional[str]:
+    for name in TS_COLUMNS:
+        if name in names:
+            return name
+    return None
+
+def _bounds(start, end):
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    return start, end
+
+def _predicates(ts_col: Optional[str], start=None, end=None, sensor_ids=None) -> List[tuple]:
+    start, end = _bounds(start, end)
+    filters = []
+    if ts_col and start is not None:
+        filters.append((ts_col, ">=", start.as_unit("ns").to_datetime64()))
+    if ts_col and end is not None:
+        filters.append((ts_col, "<", end.as_unit("ns").to_datetime64()))
+    if sensor_ids is not None:
+        filters.append(("sensor_id", "in", list(sensor_ids)))
+    return filters
+
+def _filter_batch(batch, filters):
+    mask = None
+    for col, op, value in filters:
+        arr = batch.column(col)
+        if op == ">=":
+            m = pc.greater_equal(arr, pa.scalar(value, type=arr.type))
+        elif op == "<":
+            m = pc.less(arr, pa.scalar(value, type=arr.type))
+        else:
+            m = pc.is_in(arr, value_set=pa.array(value, type=arr.type))
+        mask = m if mask is None else pc.and_(mask, m)
+    return batch if mask is None else batch.filter(mask)
+
+def read_columnar_table(path: str, columns: Optional[Sequence[str]] = None, start=None, end=None,
+                        sensor_ids=None, fmt: Optional[str] = None) -> "pa.Table":
+    """Read a Parquet/Arrow IPC file with column projection and ts/sensor_id predicates.
+
+    Parquet predicates are pushed down to row-group statistics; Arrow IPC files
+    are memory-mapped and record batches are sliced without copying.
+    """
+    _require_arrow()
+    fmt = fmt or detect_format(path)
+    schema = read_schema(path, fmt)
+    filters = _predicates(ts_column(schema.names), start, end, sensor_ids)
+    if columns is not None:
+        columns = [c for c in columns if c in schema.names]
+
+    if fmt == "parquet":
+        return pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+
+    source = pa.memory_map(path, "r")
+    reader = ipc.open_file(source)
+    batches = []
+    for i in range(reader.num_record_batches):
+        batch = _filter_batch(reader.get_batch(i), filters)
+        if columns is not None:
+            batch = batch.select(columns)
+        if batch.num_rows:
+            batches.append(batch)
+    if batches:
+        return pa.Table.from_batches(batches)
+    out_schema = schema if columns is None else pa.schema([schema.field(c) for c in columns])
+    return out_schema.empty_table()
+
+def read_columnar(path: str, columns: Optional[Sequence[str]] = None, start=None, end=None,
+                  sensor_ids=None, fmt: Optional[str] = None) -> pd.DataFrame:
+    table = read_columnar_table(path, columns=columns, start=start, end=end, sensor_ids=sensor_ids, fmt=fmt)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def estimate_row_bytes(path: str, fmt: Optional[str] = None) -> float:
+    _require_arrow()
+    if (fmt or detect_format(path)) == "parquet":
+        meta = pq.ParquetFile(path, memory_map=True).metadata
+        size = sum(meta.row_group(i).total_byte_size for i in range(meta.num_row_groups))
+        rows = meta.num_rows
+    else:
+        with pa.memory_map(path, "r") as source:
+            reader = ipc.open_file(source)
+            rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        size = os.path.getsize(path)
+    return size / rows if rows else 64.0
+
+def iter_columnar_batches(path: str, batch_rows: int, columns: Optional[Sequence[str]] = None,
+                          fmt: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    _require_arrow()
+    if (fmt or detect_format(path)) == "parquet":
+        pf = pq.ParquetFile(path, memory_map=True)
+        for batch in pf.iter_batches(batch_size=batch_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+    with pa.memory_map(path, "r") as source:
+        reader = ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(list(columns))
+            for lo in range(0, batch.num_rows, batch_rows):
+                yield batch.slice(lo, batch_rows).to_pandas()
+
+def _plain_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # per-chunk categories would give every row group a different dictionary type
+    cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not cats:
+        return df
+    return df.assign(**{c: df[c].astype(df[c].cat.categories.dtype) for c in cats})
+
+class ColumnarWriter:
+    """Append DataFrames to one Parquet file (a row group per write) or Arrow IPC file."""
+
+    def __init__(self, path: str, row_group_rows: int = 1_000_000):
+        _require_arrow()
+        self.path = path
+        self.format = detect_format(path)
+        if self.format == "csv":
+            raise ValueError(f"Not a columnar output path: {path}")
+        self.row_group_rows = row_group_rows
+        self._writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(_plain_columns(df), preserve_index=False)
+        if self._writer is None:
+            if self.format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                self._writer = ipc.new_file(self.path, table.schema)
+        if self.format == "parquet":
+            self._writer.write_table(table, row_group_size=self.row_group_rows)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_rows)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_columnar(df: pd.DataFrame, path: str, row_group_rows: int = 1_000_000) -> None:
+    with ColumnarWriter(path, row_group_rows=row_group_rows) as w:
+        w.write(df)
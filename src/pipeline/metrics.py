@@ -1,6 +1,42 @@
-from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
 
 rows_processed = Counter("pipeline_rows_processed", "Total rows processed")
+bytes_processed = Counter("pipeline_bytes_processed", "Total input bytes processed")
 anomalies_detected = Counter("pipeline_anomalies_detected", "Total anomalies detected")
 anomaly_rate_gauge = Gauge("pipeline_anomaly_rate", "Last run anomaly rate")
 run_duration = Histogram("pipeline_run_duration_ms", "Processing duration in ms")
+stage_duration = Histogram("pipeline_stage_duration_seconds", "Time spent per pipeline stage",
+                           ["stage", "detector"], buckets=STAGE_BUCKETS)
+file_rows_per_second = Gauge("pipeline_file_rows_per_second", "Throughput of the last processed file in rows/s")
+file_bytes_per_second = Gauge("pipeline_file_bytes_per_second", "Throughput of the last processed file in bytes/s")
+file_peak_rss = Gauge("pipeline_file_peak_rss_bytes", "Peak resident memory while processing the last file")
+file_latency = Histogram("pipeline_file_latency_seconds", "Time from file arrival in the incoming directory to its alert",
+                         buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300))
+
+
+def observe_stage(stage: str, seconds: float, detector: str = ""):
+    stage_duration.labels(stage=stage, detector=detector or "").observe(seconds)
+
+
+def set_metrics(metrics: dict):
+    # metrics: the per-file dict built by runner.process_file
+    rows_processed.inc(metrics.get("rows_processed", 0))
+    bytes_processed.inc(metrics.get("bytes", 0) or 0)
+    anomalies_detected.inc(metrics.get("anomalies", 0))
+    anomaly_rate_gauge.set(metrics.get("anomaly_rate", 0.0))
+    run_duration.observe(metrics.get("duration_ms", 0))
+    if metrics.get("rows_per_s") is not None:
+        file_rows_per_second.set(metrics["rows_per_s"])
+    if metrics.get("bytes_per_s") is not None:
+        file_bytes_per_second.set(metrics["bytes_per_s"])
+    if metrics.get("peak_rss_bytes") is not None:
+        file_peak_rss.set(metrics["peak_rss_bytes"])
+    for key, ms in (metrics.get("stages_ms") or {}).items():
+        stage, _, detector = key.partition(":")
+        observe_stage(stage, ms / 1000.0, detector)
+
+
+def start_server(port: int):
+    start_http_server(int(port))
@@ -0,0 +1,224 @@
+import glob
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .watcher import glob_patterns
+
+logger = logging.getLogger("pipeline.parallel")
+
+CLAIM_SUFFIX = ".claimed"
+
+def claim_token() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def claim_file(path: str, token: Optional[str] = None) -> Optional[str]:
+    # rename is atomic within a directory: exactly one worker/instance wins
+    claimed = f"{path}@{token or claim_token()}{CLAIM_SUFFIX}"
+    try:
+        os.rename(path, claimed)
+    except (FileNotFoundError, PermissionError):
+        return None
+    return claimed
+
+def release_claim(claimed: str) -> Optional[str]:
+    original = claimed[:-len(CLAIM_SUFFIX)].rsplit("@", 1)[0]
+    try:
+        os.rename(claimed, original)
+    except FileNotFoundError:
+        return None
+    return original
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def recover_stale_claims(incoming_dir: str) -> int:
+    host = socket.gethostname()
+    recovered = 0
+    for claimed in glob.glob(os.path.join(incoming_dir, f"*{CLAIM_SUFFIX}")):
+        token = claimed[:-len(CLAIM_SUFFIX)].rsplit("@", 1)[-1]
+        owner, _, pid = token.rpartition("-")
+        # only claims from this host can be checked for a dead owner
+        if owner != host or not pid.isdigit() or _pid_alive(int(pid)):
+            continue
+        if release_claim(claimed):
+            logger.warning("Recovered stale claim %s", claimed)
+            recovered += 1
+    return recovered
+
+
+class RetryBackoff:
+    """Failed attempts per file and when its next attempt may start.
+
+    The delay doubles with every failure; after ``max_retries`` failures the
+    file is given up on and the caller moves it to its failed directory.
+    """
+
+    def __init__(self, max_retries: int = 3, backoff: float = 5.0):
+        self.max_retries = int(max_retries)
+        self.backoff = float(backoff)
+        self.attempts: Dict[str, int] = {}
+        self.retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def failed(self, path: str) -> Tuple[int, Optional[float]]:
+        """Record a failure; returns (attempts so far, delay before the next one or None to give up)."""
+        with self._lock:
+            n = self.attempts.get(path, 0) + 1
+            if n < self.max_retries:
+                delay = self.backoff * 2 ** (n - 1)
+                self.attempts[path] = n
+                self.retry_at[path] = time.time() + delay
+                return n, delay
+            self.attempts.pop(path, None)
+            self.retry_at.pop(path, None)
+            return n, None
+
+    def forget(self, path: str) -> None:
+        with self._lock:
+            self.attempts.pop(path, None)
+            self.retry_at.pop(path, None)
+
+    def waiting(self, path: str) -> bool:
+        return self.retry_at.get(path, 0.0) > time.time()
+
+    def any_waiting(self) -> bool:
+        now = time.time()
+        with self._lock:
+            return any(t > now for t in self.retry_at.values())
+
+    def take_due(self) -> List[str]:
+        """Files whose retry deadline passed; their deadline is cleared, the attempt count kept."""
+        now = time.time()
+        with self._lock:
+            due = sorted(p for p, t in self.retry_at.items() if t <= now)
+            for p in due:
+                del self.retry_at[p]
+        return due
+
+def move_to_failed(path: str, failed_dir: str, name: Optional[str] = None) -> str:
+    os.makedirs(failed_dir, exist_ok=True)
+    dest = os.path.join(failed_dir, name or os.path.basename(path))
+    shutil.move(path, dest)
+    return dest
+
+class ParallelFileProcessor:
+    """Process files from ``incoming_dir`` on a bounded process pool.
+
+    A file is claimed only when a worker is free, so other pipeline instances
+    can pick up the rest, and a slow file occupies a single worker.
+    ``process_fn(claimed_path, original_name)`` runs in the worker and is
+    responsible for archiving; failures are retried with exponential backoff
+    and moved to ``failed_dir`` after ``max_retries`` attempts.
+    """
+
+    def __init__(self, incoming_dir: str, process_fn: Callable[[str, str], object], workers: int,
+                 pattern: Union[str, Sequence[str]] = "*.csv", max_retries: int = 3, retry_backoff: float = 5.0,
+                 failed_dir: Optional[str] = None):
+        self.incoming_dir = incoming_dir
+        self.process_fn = process_fn
+        self.workers = int(workers)
+        self.pattern = pattern
+        self.max_retries = int(max_retries)
+        self.retry_backoff = float(retry_backoff)
+        self.failed_dir = failed_dir or os.path.join(incoming_dir, "failed")
+        self.token = claim_token()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.in_flight: Dict[Future, Tuple[str, str]] = {}
+        self.retries = RetryBackoff(self.max_retries, self.retry_backoff)
+
+    def submit_ready(self, candidates: Optional[Iterable[str]] = None) -> int:
+        free = self.workers - len(self.in_flight)
+        if free <= 0:
+            return 0
+        if candidates is None:
+            candidates = glob_patterns(self.incoming_dir, self.pattern)
+        submitted = 0
+        # sorted names keep the arrival order for files dropped in sequence
+        for path in sorted(candidates):
+            if submitted >= free:
+                break
+            if self.retries.waiting(path):
+                continue
+            claimed = claim_file(path, self.token)
+            if claimed is None:
+                continue
+            fut = self.pool.submit(self.process_fn, claimed, os.path.basename(path))
+            self.in_flight[fut] = (claimed, path)
+            submitted += 1
+        return submitted
+
+    def collect(self, timeout: Optional[float] = None) -> List[Tuple[str, bool]]:
+        """Wait for finished files; returns ``(path, finished)`` where ``finished``
+        is False only for files released for another attempt."""
+        if not self.in_flight:
+            return []
+        done, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        broken = False
+        finished = []
+        for fut in done:
+            claimed, path = self.in_flight.pop(fut)
+            exc = fut.exception()
+            if exc is None:
+                self.retries.forget(path)
+                finished.append((path, True))
+                continue
+            broken |= isinstance(exc, BrokenProcessPool)
+            finished.append((path, not self._handle_failure(claimed, path, exc)))
+        if broken:
+            finished.extend(self._restart_pool())
+        return finished
+
+    def _handle_failure(self, claimed: str, path: str, exc: BaseException) -> bool:
+        """Returns True when the file was put back for a retry."""
+        if not os.path.exists(claimed):
+            logger.error("File %s failed after it was moved: %s", path, exc)
+            self.retries.forget(path)
+            return False
+        n, delay = self.retries.failed(path)
+        if delay is not None:
+            logger.warning("File %s failed (attempt %d/%d), retry in %.1fs: %s",
+                           path, n, self.max_retries, delay, exc)
+            release_claim(claimed)
+            return True
+        dest = move_to_failed(claimed, self.failed_dir, os.path.basename(path))
+        logger.error("File %s failed %d times, moved to %s: %s", path, n, dest, exc)
+        return False
+
+    def _restart_pool(self) -> List[Tuple[str, bool]]:
+        logger.error("Worker pool broke, restarting")
+        finished = []
+        for fut, (claimed, path) in list(self.in_flight.items()):
+            self.in_flight.pop(fut)
+            retried = self._handle_failure(claimed, path, BrokenProcessPool("worker pool restarted"))
+            finished.append((path, not retried))
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return finished
+
+    def run_until_idle(self, poll_interval: float = 0.1) -> None:
+        while True:
+            self.submit_ready()
+            if not self.in_flight:
+                if not self.retries.any_waiting():
+                    return
+                time.sleep(poll_interval)
+                continue
+            self.collect(timeout=poll_interval)
+
+    def close(self) -> None:
+        while self.in_flight:
+            self.collect()
+        self.pool.shutdown(wait=True)
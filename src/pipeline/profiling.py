@@ -0,0 +1,114 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger("pipeline.profiling")
+
+
+def peak_rss_bytes() -> Optional[int]:
+    # VmHWM is resettable (see reset_peak_rss); ru_maxrss is the process-lifetime peak
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+    except Exception:
+        return None
+
+
+def reset_peak_rss() -> bool:
+    # Linux only: makes the next peak_rss_bytes() the peak since this call
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class StageTimer:
+    """Accumulates wall time per (stage, detector); chunked files add up all chunks."""
+
+    def __init__(self):
+        self.seconds: Dict[tuple, float] = {}
+
+    @contextmanager
+    def stage(self, name: str, detector: str = ""):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = (name, detector)
+            self.seconds[key] = self.seconds.get(key, 0.0) + time.perf_counter() - t0
+
+    def as_ms(self) -> Dict[str, float]:
+        return {f"{stage}:{det}" if det else stage: round(s * 1000, 3) for (stage, det), s in self.seconds.items()}
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread every `interval` seconds from a background thread.
+
+    Stacks are kept in collapsed form ("outer;inner;leaf count"), which
+    flamegraph.pl, speedscope and inferno read directly. Overhead is one
+    sys._current_frames() call per sample, so it can stay on for every file
+    and be dumped only for the slow ones.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.thread_id = self.thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+    def dump(self, path: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return path
@@ -1,16 +1,22 @@
 import argparse
+import itertools
 import logging
 import time
 import json
 import os
 import shutil
-import glob
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional
-from .etl import extract_from_csv, transform, load
+from .etl import ChunkTransformer, extract, transform, load, iter_raw_chunks
+from .formats import INPUT_PATTERNS, ColumnarWriter, detect_format
 from .db import write_timeseries
-from .anomaly import detect_anomalies, anomaly_stats
+from .anomaly import IsolationModelCache, detect_anomalies, detect_anomalies_streaming, anomaly_stats
 from .config import settings
+from .parallel import ParallelFileProcessor, RetryBackoff, move_to_failed, recover_stale_claims
+from .profiling import SamplingProfiler, StageTimer, peak_rss_bytes, reset_peak_rss
+from .watcher import glob_patterns, make_watcher
 
 settings.clickhouse_host = os.environ.get("CLICKHOUSE_HOST", settings.clickhouse_host)
 
@@ -26,73 +32,332 @@ logger = logging.getLogger('pipeline')
 def _make_dirs(path: str):
     Path(path).mkdir(parents=True, exist_ok=True)
 
-def process_file(csv_path: str, archive_dir: Optional[str] = None):
+def _load_streaming_state(state_path: Optional[str]):
+    if not state_path:
+        return None
+    from infrastructure.detectors.streaming import StreamingDetectorSet
+    state = StreamingDetectorSet.load(state_path)
+    logger.info("Streaming detector state: %s", state_path)
+    return state
+
+_isolation_cache = None
+
+def _model_cache() -> IsolationModelCache:
+    # one cache per process: watch mode scores later files with the models fitted on earlier ones
+    global _isolation_cache
+    if _isolation_cache is None:
+        _isolation_cache = IsolationModelCache(max_models=settings.isolation_max_models,
+                                               retrain_every=settings.isolation_retrain_every,
+                                               drift_threshold=settings.isolation_drift_threshold,
+                                               n_jobs=settings.isolation_n_jobs)
+    return _isolation_cache
+
+def _detector_name(state=None) -> str:
+    return 'streaming' if state is not None else getattr(settings, 'detect_method', 'isolation')
+
+def _detect(df, state=None):
+    if state is not None:
+        return detect_anomalies_streaming(df, state)
+    return detect_anomalies(df, cache=_model_cache())
+
+_writer = None
+# files whose archiving waits for an upload: they are still in the incoming dir
+_pending_archive = set()
+# failed uploads (serial watch): retried with backoff, then moved to <archive>/failed
+UPLOAD_RETRY_BACKOFF = 5.0
+_upload_retries = RetryBackoff(backoff=UPLOAD_RETRY_BACKOFF)
+_archiver = None
+
+def _async_writer():
+    # CLICKHOUSE_ASYNC_INSERT: upload in the background while the next file is processed
+    global _writer
+    if not settings.clickhouse_async_insert:
+        return None
+    if _writer is None:
+        from .async_db import AsyncClickHouseWriter
+        try:
+            _writer = AsyncClickHouseWriter(max_in_flight=settings.clickhouse_max_in_flight)
+        except RuntimeError as e:
+            logger.warning("%s; falling back to synchronous inserts", e)
+            settings.clickhouse_async_insert = False
+            return None
+    return _writer
+
+def _archive_executor():
+    # archive moves run here, not on the upload loop's thread
+    global _archiver
+    if _archiver is None:
+        _archiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+    return _archiver
+
+def _close_writer():
+    global _writer, _archiver
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+    if _archiver is not None:
+        _archiver.shutdown(wait=True)
+        _archiver = None
+
+def _insert(df, source_name: str, part: int, uploads: list):
+    writer = _async_writer()
+    if writer is None:
+        load(df, write_timeseries)
+    else:
+        load(df, lambda d: uploads.append(writer.submit(d, key=source_name, part=part)))
+
+EXPORT_COLUMNS = ['ts', 'sensor_id', 'value', 'anomaly']
+
+def _export_path(export_dir: Optional[str], source_name: str) -> Optional[str]:
+    if not export_dir:
+        return None
+    _make_dirs(export_dir)
+    return os.path.join(export_dir, f"{os.path.splitext(source_name)[0]}.parquet")
+
+def _process_chunks(csv_path: str, state=None, chunksize: Optional[int] = None,
+                    memory_limit_mb: Optional[float] = None, export_path: Optional[str] = None,
+                    timer: Optional[StageTimer] = None, source_name: Optional[str] = None,
+                    uploads: Optional[list] = None):
+    timer = timer or StageTimer()
+    source_name = source_name or os.path.basename(csv_path)
+    uploads = [] if uploads is None else uploads
+    rows = 0
+    anomalies = 0
+    writer = ColumnarWriter(export_path) if export_path else None
+    step = ChunkTransformer()
+    # the format comes from the original name: a claimed file ends in ".claimed"
+    chunks = iter_raw_chunks(csv_path, chunksize=chunksize, memory_limit_mb=memory_limit_mb,
+                             fmt=detect_format(source_name))
+    try:
+        for i in itertools.count():
+            with timer.stage('extract'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            with timer.stage('transform'):
+                chunk = step(chunk)
+            with timer.stage('detect', _detector_name(state)):
+                chunk = _detect(chunk, state)
+            rows += len(chunk)
+            anomalies += int(chunk['anomaly'].sum())
+            logger.info("Load chunk %d (%d rows) to ClickHouse", i, len(chunk))
+            with timer.stage('load'):
+                _insert(chunk[['ts', 'sensor_id', 'value']], source_name, i, uploads)
+                if writer is not None:
+                    writer.write(chunk[EXPORT_COLUMNS])
+    finally:
+        if writer is not None:
+            writer.close()
+    return {'total_rows': rows, 'anomalies': anomalies, 'anomaly_rate': anomalies / rows if rows else 0.0}
+
+def _start_profiler() -> Optional[SamplingProfiler]:
+    if not getattr(settings, 'profile_dir', None):
+        return None
+    return SamplingProfiler(interval=(settings.profile_interval_ms or 5.0) / 1000.0).start()
+
+def _dump_profile(profiler: Optional[SamplingProfiler], source_name: str, duration_ms: int) -> Optional[str]:
+    if profiler is None:
+        return None
+    profiler.stop()
+    if duration_ms < (settings.profile_threshold_ms or 0):
+        return None
+    path = os.path.join(settings.profile_dir, f"{source_name}.{int(time.time())}.collapsed")
+    try:
+        profiler.dump(path)
+        logger.info("Slow file %s (%d ms): profile written to %s", source_name, duration_ms, path)
+        return path
+    except OSError:
+        logger.exception("Failed to write profile %s", path)
+        return None
+
+def process_file(csv_path: str, archive_dir: Optional[str] = None, state=None,
+                 state_path: Optional[str] = None, chunksize: Optional[int] = None,
+                 memory_limit_mb: Optional[float] = None, source_name: Optional[str] = None,
+                 export_dir: Optional[str] = None, low_memory: Optional[bool] = None,
+                 wait_upload: bool = False):
     
+    source_name = source_name or os.path.basename(csv_path)
+    low_memory = settings.low_memory if low_memory is None else low_memory
+    export_path = _export_path(export_dir, source_name)
+    try:
+        size = os.path.getsize(csv_path)
+    except OSError:
+        size = None
+    timer = StageTimer()
+    reset_peak_rss()
+    profiler = _start_profiler()
     start = time.time()
     logger.info("Processing file: %s", csv_path)
-    df = extract_from_csv(csv_path)
-    df = transform(df)
-    df = detect_anomalies(df)
-    stats = anomaly_stats(df)
-    duration_ms = int((time.time() - start) * 1000)
-    rows = len(df)
+    chunked = bool(chunksize or memory_limit_mb)
+    uploads = []
+    if chunked:
+        # bounded memory: each chunk is detected and loaded before the next is read
+        stats = _process_chunks(csv_path, state, chunksize, memory_limit_mb, export_path, timer,
+                                source_name, uploads)
+        rows = stats['total_rows']
+    else:
+        with timer.stage('extract'):
+            df = extract(csv_path, low_memory=low_memory, fmt=detect_format(source_name))
+        with timer.stage('transform'):
+            df = transform(df, low_memory=low_memory)
+        with timer.stage('detect', _detector_name(state)):
+            df = _detect(df, state)
+        stats = anomaly_stats(df)
+        rows = len(df)
+
+    if not chunked:
+        logger.info("Load to ClickHouse")
+        with timer.stage('load'):
+            _insert(df[['ts', 'sensor_id', 'value']], source_name, 0, uploads)
+            if export_path:
+                with ColumnarWriter(export_path) as writer:
+                    writer.write(df[EXPORT_COLUMNS])
+
+    if uploads and (wait_upload or (state is not None and state_path)):
+        # the checkpoint (and a worker's claim) must not get ahead of the stored rows
+        with timer.stage('load'):
+            for f in uploads:
+                f.result()
+        uploads = []
+
+    if state is not None and state_path:
+        # checkpoint before archiving so a restart never skips this file's statistics
+        state.save(state_path)
+
+    if archive_dir and uploads:
+        # the last batch of a file is acknowledged only after all earlier ones
+        _pending_archive.add(csv_path)
+        uploads[-1].add_done_callback(partial(_on_uploaded, csv_path, archive_dir, source_name))
+    elif archive_dir:
+        with timer.stage('archive'):
+            _archive(csv_path, archive_dir, source_name)
+
+    elapsed = time.time() - start
+    duration_ms = int(elapsed * 1000)
+    profile_path = _dump_profile(profiler, source_name, duration_ms)
 
     logger.info('Anomaly stats: %s', stats)
     logger.info('rows_processed=%d anomalies=%d anomaly_rate=%.4f duration_ms=%d',
                 rows, stats.get('anomalies', 0), stats.get('anomaly_rate', 0.0), duration_ms)
 
     metrics = {
-        "file": os.path.basename(csv_path),
+        "file": source_name,
         "rows_processed": rows,
         "anomalies": stats.get("anomalies", 0),
         "anomaly_rate": stats.get("anomaly_rate", 0.0),
         "duration_ms": duration_ms,
+        "stages_ms": timer.as_ms(),
+        "bytes": size,
+        "rows_per_s": rows / elapsed if elapsed > 0 else None,
+        "bytes_per_s": size / elapsed if size is not None and elapsed > 0 else None,
+        "peak_rss_bytes": peak_rss_bytes(),
         "timestamp": int(time.time())
     }
+    if profile_path:
+        metrics["profile"] = profile_path
     
     print(json.dumps({"pipeline_metrics": metrics}, ensure_ascii=False))
 
-    logger.info("Load to ClickHouse")
-    load(df[['ts', 'sensor_id', 'value']], write_timeseries)
-
     try:
         if metrics_module is not None and getattr(settings, "prometheus_port", None):
             metrics_module.set_metrics(metrics)
     except Exception:
         logger.debug("Prometheus metrics update failed", exc_info=True)
 
-    if archive_dir:
-        _make_dirs(archive_dir)
-        basename = os.path.basename(csv_path)
-        ts = int(time.time())
-        dest = os.path.join(archive_dir, f"{basename}.processed.{ts}")
-        try:
-            shutil.move(csv_path, dest)
-            logger.info("Moved processed file to %s", dest)
-        except Exception as e:
-            logger.exception("Failed to move file %s to archive %s: %s", csv_path, archive_dir, e)
-
     return metrics
 
-def run_once(csv_path: str):
+def _archive(csv_path: str, archive_dir: str, source_name: str):
+    _make_dirs(archive_dir)
+    ts = int(time.time())
+    dest = os.path.join(archive_dir, f"{source_name}.processed.{ts}")
+    try:
+        shutil.move(csv_path, dest)
+        logger.info("Moved processed file to %s", dest)
+    except Exception as e:
+        logger.exception("Failed to move file %s to archive %s: %s", csv_path, archive_dir, e)
+
+def _on_uploaded(csv_path: str, archive_dir: str, source_name: str, upload):
+    _archive_executor().submit(_archive_uploaded, csv_path, archive_dir, source_name, upload)
+
+def _archive_uploaded(csv_path: str, archive_dir: str, source_name: str, upload):
+    try:
+        exc = upload.exception()
+        if exc is None:
+            _upload_retries.forget(csv_path)
+            _archive(csv_path, archive_dir, source_name)
+            return
+        # leave the file in place for a later attempt: re-processing it is deduplicated by the insert tokens
+        n, delay = _upload_retries.failed(csv_path)
+        if delay is not None:
+            logger.error("Upload of %s failed (attempt %d/%d), retry in %.1fs: %s",
+                         source_name, n, _upload_retries.max_retries, delay, exc)
+            return
+        dest = move_to_failed(csv_path, os.path.join(archive_dir, "failed"), source_name)
+        logger.error("Upload of %s failed %d times, moved to %s: %s", source_name, n, dest, exc)
+    except Exception:
+        logger.exception("Archiving %s after its upload failed", source_name)
+    finally:
+        _pending_archive.discard(csv_path)
+
+def run_once(csv_path: str, state_path: Optional[str] = None, chunksize: Optional[int] = None,
+             memory_limit_mb: Optional[float] = None, export_dir: Optional[str] = None,
+             low_memory: Optional[bool] = None):
     
+    state = _load_streaming_state(state_path)
     if os.path.isdir(csv_path):
         
-        files = sorted(glob.glob(os.path.join(csv_path, "*.csv")))
+        files = glob_patterns(csv_path, INPUT_PATTERNS)
         if not files:
-            logger.info("No CSV files found in %s", csv_path)
+            logger.info("No input files (%s) found in %s", ", ".join(INPUT_PATTERNS), csv_path)
             return
-        for f in files:
-            process_file(f)
     else:
-        process_file(csv_path)
+        files = [csv_path]
 
-def watch_directory(incoming_dir: str, archive_dir: str, poll_interval: int = 5):
-    
-    logger.info("Starting watch mode: incoming=%s archive=%s interval=%ds", incoming_dir, archive_dir, poll_interval)
-    _make_dirs(incoming_dir)
-    _make_dirs(archive_dir)
+    try:
+        for f in files:
+            process_file(f, state=state, state_path=state_path, chunksize=chunksize,
+                         memory_limit_mb=memory_limit_mb, export_dir=export_dir, low_memory=low_memory)
+    finally:
+        _close_writer()
+
+def _process_claimed(claimed_path: str, source_name: str, archive_dir: Optional[str] = None,
+                     chunksize: Optional[int] = None, memory_limit_mb: Optional[float] = None,
+                     export_dir: Optional[str] = None, low_memory: Optional[bool] = None):
+    return process_file(claimed_path, archive_dir=archive_dir, chunksize=chunksize,
+                        memory_limit_mb=memory_limit_mb, source_name=source_name, export_dir=export_dir,
+                        low_memory=low_memory, wait_upload=True)
+
+def _observe_latency(arrived_at: float):
+    latency = time.time() - arrived_at
+    logger.info("file_latency_ms=%d", int(latency * 1000))
+    try:
+        if metrics_module is not None:
+            metrics_module.file_latency.observe(latency)
+    except Exception:
+        logger.debug("Prometheus latency update failed", exc_info=True)
+
+def _watch_parallel(watcher, incoming_dir: str, archive_dir: str, workers: int, poll_interval: int,
+                    max_retries: int, chunksize: Optional[int], memory_limit_mb: Optional[float],
+                    export_dir: Optional[str], low_memory: Optional[bool] = None):
+    recover_stale_claims(incoming_dir)
+    fn = partial(_process_claimed, archive_dir=archive_dir, chunksize=chunksize, memory_limit_mb=memory_limit_mb,
+                 export_dir=export_dir, low_memory=low_memory)
+    processor = ParallelFileProcessor(incoming_dir, fn, workers, pattern=INPUT_PATTERNS, max_retries=max_retries,
+                                      failed_dir=os.path.join(archive_dir, "failed"))
+    arrivals = {}
+    try:
+        while True:
+            busy = bool(processor.in_flight or arrivals)
+            for path, arrived_at in watcher.poll(timeout=0.05 if busy else poll_interval):
+                arrivals.setdefault(path, arrived_at)
+            processor.submit_ready([p for p in arrivals if os.path.exists(p)])
+            for path, finished in processor.collect(timeout=0.05):
+                if finished:
+                    _observe_latency(arrivals.pop(path, time.time()))
+    finally:
+        processor.close()
 
+def _start_exporter():
     try:
         if getattr(settings, "prometheus_port", None) and metrics_module is not None:
             metrics_port = settings.prometheus_port
@@ -101,36 +366,155 @@ def watch_directory(incoming_dir: str, archive_dir: str, poll_interval: int = 5)
     except Exception:
         logger.exception("Failed to start Prometheus exporter")
 
+def watch_directory(incoming_dir: str, archive_dir: str, poll_interval: int = 5,
+                    state_path: Optional[str] = None, chunksize: Optional[int] = None,
+                    memory_limit_mb: Optional[float] = None, workers: int = 1, max_retries: int = 3,
+                    use_inotify: bool = True, export_dir: Optional[str] = None,
+                    low_memory: Optional[bool] = None):
+    global _upload_retries
+    if workers > 1 and state_path:
+        # workers run in separate processes and cannot share one streaming state
+        raise ValueError("--state-path is not supported with --workers > 1")
+    logger.info("Starting watch mode: incoming=%s archive=%s interval=%ds", incoming_dir, archive_dir, poll_interval)
+    _make_dirs(incoming_dir)
+    _make_dirs(archive_dir)
+
+    _start_exporter()
+
+    watcher = make_watcher(incoming_dir, INPUT_PATTERNS, poll_interval=poll_interval, use_inotify=use_inotify)
+
+    if workers > 1:
+        logger.info("Parallel watch mode: %d workers", workers)
+        try:
+            _watch_parallel(watcher, incoming_dir, archive_dir, workers, poll_interval, max_retries,
+                            chunksize, memory_limit_mb, export_dir, low_memory)
+        except KeyboardInterrupt:
+            logger.info("Watch mode stopped by user")
+        finally:
+            watcher.close()
+        return
+
+    state = _load_streaming_state(state_path)
+    _upload_retries = RetryBackoff(max_retries, UPLOAD_RETRY_BACKOFF)
+
     try:
         while True:
-            files = sorted(glob.glob(os.path.join(incoming_dir, "*.csv")))
-            if not files:
-                time.sleep(poll_interval)
-                continue
-            for f in files:
+            ready = watcher.poll(timeout=poll_interval)
+            # failed uploads come back at their deadline with either watcher
+            seen = {f for f, _ in ready}
+            ready += [(f, time.time()) for f in _upload_retries.take_due() if f not in seen and os.path.exists(f)]
+            for f, arrived_at in ready:
+                if f in _pending_archive or _upload_retries.waiting(f):
+                    # upload not acknowledged yet, or failed and backing off
+                    continue
                 try:
-                    process_file(f, archive_dir=archive_dir)
+                    process_file(f, archive_dir=archive_dir, state=state, state_path=state_path,
+                                 chunksize=chunksize, memory_limit_mb=memory_limit_mb, export_dir=export_dir,
+                                 low_memory=low_memory)
+                    _observe_latency(arrived_at)
                 except Exception:
                     logger.exception("Error processing file %s", f)
-            
-            time.sleep(0.5)
+                    # drop partial updates from the failed file
+                    state = _load_streaming_state(state_path)
     except KeyboardInterrupt:
         logger.info("Watch mode stopped by user")
+    finally:
+        watcher.close()
+        _close_writer()
+
+
+def _stage_observer():
+    if metrics_module is None or not getattr(settings, "prometheus_port", None):
+        return None
+    return metrics_module.observe_stage
+
+def run_windows(config_path: Optional[str], repo_root: str, start: Optional[str] = None,
+                end: Optional[str] = None):
+    from .config import load_pipeline_config
+    from application.executor import DetectorExecutor
+    from application.scheduler import SlidingWindowScheduler
+    from application.service import AnomalyDetectionService
+    from infrastructure.factory import build_detectors, build_sinks
+    from infrastructure.repository.clickhouse_stub import ClickHouseRepositoryStub
+
+    cfg = load_pipeline_config(config_path)
+    raw = cfg.raw if isinstance(cfg.raw, dict) else {}
+    detectors = build_detectors(cfg.detectors or [{'type': 'zscore', 'threshold': 3.0}])
+    sinks = build_sinks(raw.get('sinks') or [{'type': 'stdout'}], clickhouse=raw.get('clickhouse'),
+                        dispatcher=raw.get('alerts'))
+    repository = ClickHouseRepositoryStub(repo_root=repo_root, reports=raw.get('reports'))
+    service = AnomalyDetectionService(repository, detectors,
+                                      sinks=sinks,
+                                      executor=DetectorExecutor.from_config(raw.get('executor')),
+                                      stage_observer=_stage_observer())
+    scheduler = SlidingWindowScheduler.from_config(service, raw.get('window'))
+    try:
+        if start:
+            end = end or time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime())
+            reports = scheduler.backfill(start, end)
+            logger.info("Backfilled %d windows", len(reports))
+            return reports
+        _start_exporter()
+        try:
+            scheduler.run_live()
+        except KeyboardInterrupt:
+            logger.info("Window scheduler stopped by user")
+    finally:
+        # drain queued alerts before exit
+        for s in sinks:
+            if hasattr(s, 'close'):
+                s.close()
+        repository.close()
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('cmd', choices=['run', 'watch'], help='command: run (one-off) or watch (daemon)')
-    parser.add_argument('--csv', default='/app/data/sample.csv', help='input CSV file or directory (for run)')
+    parser.add_argument('cmd', choices=['run', 'watch', 'windows'],
+                        help='command: run (one-off), watch (daemon) or windows (sliding-window scheduler)')
+    parser.add_argument('--config', default=None, help='pipeline.yaml (windows: window.duration/step, detectors)')
+    parser.add_argument('--repo-root', default='.', help='windows: repository root holding data/')
+    parser.add_argument('--start', default=None, help='windows: backfill windows ending after START instead of running live')
+    parser.add_argument('--end', default=None, help='windows: backfill up to END (default: now)')
+    parser.add_argument('--csv', default='/app/data/sample.csv',
+                        help='input file (CSV, Parquet or Arrow IPC) or directory (for run)')
     parser.add_argument('--incoming-dir', default='/app/data/incoming', help='incoming directory for watch mode')
     parser.add_argument('--archive-dir', default='/app/data/processed', help='archive directory for processed files (watch mode)')
-    parser.add_argument('--interval', type=int, default=5, help='poll interval seconds for watch mode')
+    parser.add_argument('--interval', type=int, default=5,
+                        help='poll interval seconds for watch mode (polling fallback when inotify is unavailable)')
+    parser.add_argument('--no-inotify', action='store_true', help='watch mode: always poll the directory')
+    parser.add_argument('--state-path', default=None,
+                        help='checkpoint file for incremental (streaming) detectors; enables streaming detection '
+                             '(not with --workers > 1)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='read input in chunks of N rows (bounded-memory streaming ETL)')
+    parser.add_argument('--memory-limit-mb', type=float, default=None,
+                        help='derive the chunk size from a memory ceiling in MB')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='watch mode: process up to N files in parallel worker processes')
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help='watch mode: attempts per file (with --workers) or per async upload before it is moved to '
+                             '<archive>/failed')
+    parser.add_argument('--export-dir', default=None,
+                        help='write each processed file (ts, sensor_id, value, anomaly) as Parquet into this directory')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='compact frames: categorical sensor ids, float32 values, no defensive copies')
     args = parser.parse_args()
 
+    if args.workers > 1 and args.state_path:
+        parser.error('--state-path keeps one detector state and cannot be combined with --workers > 1')
+
     if args.cmd == 'run':
-        run_once(args.csv)
+        run_once(args.csv, state_path=args.state_path, chunksize=args.chunksize,
+                 memory_limit_mb=args.memory_limit_mb, export_dir=args.export_dir,
+                 low_memory=args.low_memory or None)
     elif args.cmd == 'watch':
-        watch_directory(args.incoming_dir, args.archive_dir, poll_interval=args.interval)
+        watch_directory(args.incoming_dir, args.archive_dir, poll_interval=args.interval,
+                        state_path=args.state_path, chunksize=args.chunksize,
+                        memory_limit_mb=args.memory_limit_mb, workers=args.workers,
+                        max_retries=args.max_retries, use_inotify=not args.no_inotify,
+                        export_dir=args.export_dir, low_memory=args.low_memory or None)
+    elif args.cmd == 'windows':
+        run_windows(args.config, args.repo_root, start=args.start, end=args.end)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
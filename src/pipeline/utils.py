@@ -1,4 +1,194 @@
+import datetime
+import re
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    _ARROW_AVAILABLE = True
+except Exception:
+    _ARROW_AVAILABLE = False
+
+SAMPLE_SIZE = 256
+# (source, shape of the string) -> strptime format; the shape replaces digits so
+# '2025-01-01 00:00:00' and '2031-12-31 23:59:59' share an entry. Least recently
+# used entries are evicted: in watch mode every claimed file is a new source.
+_FORMAT_CACHE: "OrderedDict[Tuple[Optional[str], str], str]" = OrderedDict()
+FORMAT_CACHE_SIZE = 1024
+_DIGITS = re.compile(r"\d")
+_ISO_PREFIXES = ("%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M")
+_OFFSET = r"(?P<offset>Z|[+-]\d\d:?\d\d)$"
+_OFFSET_ANY = r"(?:Z|[+-]\d\d:?\d\d)$"
+_MIXED = ("Timestamps mix time zones/offsets (or naive and aware values); "
+          "normalise them to one offset or to UTC before loading")
+
+
+def _epoch_unit(values: np.ndarray) -> str:
+    # pd.to_datetime reads bare numbers as ns; seconds/ms/us epochs are told apart by magnitude
+    finite = values[np.isfinite(values)] if values.dtype.kind == "f" else values
+    if not len(finite):
+        return "ns"
+    top = float(np.abs(finite).max())
+    if top < 1e11:
+        return "s"
+    if top < 1e14:
+        return "ms"
+    if top < 1e17:
+        return "us"
+    return "ns"
+
+
+def _sample(series: pd.Series) -> pd.Series:
+    n = len(series)
+    if n <= SAMPLE_SIZE:
+        sample = series
+    else:
+        sample = series.iloc[np.unique(np.linspace(0, n - 1, SAMPLE_SIZE).astype(np.int64))]
+    sample = sample.dropna()
+    if len(sample) < min(n, 8):
+        sample = series.dropna().iloc[:SAMPLE_SIZE]
+    return sample
+
+
+def _parses(sample: pd.Series, fmt: str) -> bool:
+    try:
+        out = pd.to_datetime(sample, format=fmt)
+    except (ValueError, TypeError):
+        return False
+    return out.dtype.kind == "M"
+
+
+def infer_datetime_format(series: pd.Series, source: Optional[str] = None) -> Optional[str]:
+    """strptime format that parses a sample spread over `series`, or None.
+
+    The result is cached per (source, string shape); a cached format is
+    re-checked on the sample, so a source that changes format is re-inferred.
+    """
+    sample = _sample(series)
+    if not len(sample) or not all(isinstance(v, str) for v in sample.iloc[:8]):
+        return None
+    key = (source, _DIGITS.sub("0", sample.iloc[0]))
+    fmt = _FORMAT_CACHE.get(key)
+    if fmt is not None and _parses(sample, fmt):
+        _FORMAT_CACHE.move_to_end(key)
+        return fmt
+    for dayfirst in (False, True):
+        fmt = guess_datetime_format(sample.iloc[0], dayfirst=dayfirst)
+        if fmt is not None and _parses(sample, fmt):
+            _FORMAT_CACHE[key] = fmt
+            _FORMAT_CACHE.move_to_end(key)
+            while len(_FORMAT_CACHE) > FORMAT_CACHE_SIZE:
+                _FORMAT_CACHE.popitem(last=False)
+            return fmt
+    _FORMAT_CACHE.pop(key, None)
+    return None
+
+
+def _common_offset(series: pd.Series) -> Tuple[Optional[str], Optional["pa.Array"]]:
+    """The UTC offset every non-null string of `series` ends with, None if the first has none.
+
+    Raises ValueError when the values carry different offsets, before any
+    pd.to_datetime call would turn them into an object column. Also returns
+    the column as an arrow array when one was built for the check.
+    """
+    first = next((v for v in series.iloc[:SAMPLE_SIZE] if isinstance(v, str)), None)
+    if first is None:
+        valid = series.dropna()
+        first = valid.iloc[0] if len(valid) else None
+    match = re.search(_OFFSET, first) if isinstance(first, str) else None
+    if match is None:
+        return None, None
+    offset, arr = match.group(0), None
+    if _ARROW_AVAILABLE:
+        arr = pa.array(series, type=pa.string(), from_pandas=True)
+        same = pc.all(pc.ends_with(pc.drop_null(arr), offset)).as_py()
+    else:
+        same = bool(series.dropna().str.endswith(offset).all())
+    if not same:
+        raise ValueError(_MIXED)
+    return offset, arr
+
+
+def _parse_arrow(series: pd.Series, fmt: str, offset: Optional[str] = None, arr=None) -> Optional[pd.Series]:
+    # ISO-8601 goes through arrow's cast, other fixed formats through its C++ strptime;
+    # pandas' own strptime is per element for anything that is not ISO.
+    # `offset` is the one offset every value carries (checked by _common_offset)
+    iso = fmt.startswith(_ISO_PREFIXES)
+    if not iso and ("%f" in fmt or "%z" in fmt):
+        return None
+    aware = iso and fmt.endswith("%z")
+    if aware and offset is None:
+        return None
+    if arr is None:
+        arr = pa.array(series, type=pa.string(), from_pandas=True)
+    tz = _offset_tz(offset) if aware else None
+    try:
+        if iso:
+            out = arr.cast(pa.timestamp("ns", tz="UTC" if aware else None))
+        else:
+            out = pc.strptime(arr, format=fmt, unit="ns")
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+    result = pd.Series(out.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+    if aware:
+        result = result.dt.tz_localize("UTC").dt.tz_convert(tz)
+    return result
+
+
+def _offset_tz(offset: str):
+    if offset == "Z":
+        return datetime.timezone.utc
+    sign = -1 if offset[0] == "-" else 1
+    digits = offset[1:].replace(":", "")
+    return datetime.timezone(sign * datetime.timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+
+
+def _is_string(dtype) -> bool:
+    if dtype.kind == "O" or isinstance(dtype, pd.StringDtype):
+        return True
+    # string columns handed over from a pyarrow reader without converting to Python objects
+    return _ARROW_AVAILABLE and isinstance(dtype, pd.ArrowDtype) and pa.types.is_string(dtype.pyarrow_dtype)
+
+
+def ensure_datetime(series, source: Optional[str] = None):
+    """Parse a timestamp column to datetime64.
+
+    Datetime columns pass through; numbers are epochs (unit from their
+    magnitude); strings are parsed with a format inferred once per source
+    from a sample (and parsed by pyarrow when available). Offsets
+    are kept: one fixed offset gives a tz-aware column, mixed offsets or
+    mixed naive/aware values raise ValueError instead of an object column.
+    """
+    if not isinstance(series, pd.Series):
+        series = pd.Series(series)
+    kind = series.dtype.kind
+    if kind == "M":
+        return series
+    if kind in "iuf":
+        values = series.to_numpy()
+        return pd.to_datetime(series, unit=_epoch_unit(values))
 
-def ensure_datetime(series):
-    return pd.to_datetime(series, utc=False)
+    strings = _is_string(series.dtype)
+    offset, arr = _common_offset(series) if strings else (None, None)
+    fmt = infer_datetime_format(series, source) if strings else None
+    out = None
+    if fmt is not None and _ARROW_AVAILABLE:
+        out = _parse_arrow(series, fmt, offset, arr)
+    if out is None and fmt is not None:
+        try:
+            out = pd.to_datetime(series, format=fmt)
+        except (ValueError, TypeError):
+            out = None
+    if out is None:
+        if strings and offset is None and series.dropna().astype(str).str.contains(_OFFSET_ANY).any():
+            # naive first value, offsets further down
+            raise ValueError(_MIXED)
+        out = pd.to_datetime(series, utc=False)
+    if out.dtype.kind != "M":
+        raise ValueError(_MIXED)
+    return out
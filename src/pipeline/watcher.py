@@ -0,0 +1,180 @@
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import glob
+import logging
+import os
+import select
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger("pipeline.watcher")
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+_EVENT = struct.Struct("iIII")
+
+Patterns = Union[str, Sequence[str]]
+
+def _as_patterns(pattern: Patterns) -> Tuple[str, ...]:
+    return (pattern,) if isinstance(pattern, str) else tuple(pattern)
+
+def glob_patterns(directory: str, pattern: Patterns) -> List[str]:
+    return sorted({p for pat in _as_patterns(pattern) for p in glob.glob(os.path.join(directory, pat))})
+
+def matches(name: str, pattern: Patterns) -> bool:
+    return any(fnmatch.fnmatch(name, pat) for pat in _as_patterns(pattern))
+
+class PollingWatcher:
+    """Glob-based fallback; a file is ready once its size/mtime survive one debounce period."""
+
+    def __init__(self, directory: str, pattern: Patterns = "*.csv", poll_interval: float = 5.0,
+                 debounce: float = 0.5):
+        self.directory = directory
+        self.pattern = pattern
+        self.poll_interval = float(poll_interval)
+        self.debounce = float(debounce)
+        self._seen: Dict[str, Tuple[int, float, float, float]] = {}
+
+    def poll(self, timeout: Optional[float] = None) -> List[Tuple[str, float]]:
+        deadline = time.time() + (self.poll_interval if timeout is None else timeout)
+        while True:
+            ready = self._scan()
+            if ready or time.time() >= deadline:
+                return ready
+            time.sleep(max(0.0, min(self.debounce, deadline - time.time())))
+
+    def _scan(self) -> List[Tuple[str, float]]:
+        now = time.time()
+        ready = []
+        current = {}
+        for path in glob_patterns(self.directory, self.pattern):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            size_mtime = (st.st_size, st.st_mtime)
+            prev = self._seen.get(path)
+            if prev is None or prev[:2] != size_mtime:
+                arrived = prev[2] if prev else now
+                current[path] = (*size_mtime, arrived, now)
+                continue
+            current[path] = prev
+            if now - prev[3] >= self.debounce:
+                ready.append((path, prev[2]))
+        reported = {p for p, _ in ready}
+        self._seen = {p: v for p, v in current.items() if p not in reported}
+        return ready
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watcher reacting to IN_CLOSE_WRITE / IN_MOVED_TO.
+
+    A file is reported once no event arrived for it during ``debounce``
+    seconds, so writers that open/close a file several times are not picked up
+    half-written. The directory is rescanned every ``rescan_interval`` seconds
+    (and on queue overflow) to recover files whose events were missed.
+    """
+
+    def __init__(self, directory: str, pattern: Patterns = "*.csv", debounce: float = 0.05,
+                 rescan_interval: float = 60.0):
+        self.directory = directory
+        self.pattern = pattern
+        self.debounce = float(debounce)
+        self.rescan_interval = float(rescan_interval)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MODIFY | IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+        # name -> (arrived_at, last_event_at, closed)
+        self._pending: Dict[str, Tuple[float, float, bool]] = {}
+        self._rescan()
+
+    def _rescan(self) -> None:
+        now = time.time()
+        for path in glob_patterns(self.directory, self.pattern):
+            name = os.path.basename(path)
+            if name not in self._pending:
+                self._pending[name] = (now, now, True)
+        self._last_rescan = now
+
+    def _read_events(self) -> None:
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return
+            raise
+        now = time.time()
+        pos = 0
+        while pos + _EVENT.size <= len(buf):
+            _, mask, _, length = _EVENT.unpack_from(buf, pos)
+            name = buf[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0").decode(errors="replace")
+            pos += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflow, rescanning %s", self.directory)
+                self._rescan()
+                continue
+            if not name or not matches(name, self.pattern):
+                continue
+            arrived, _, closed = self._pending.get(name, (now, now, False))
+            closed = bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO)) or (closed and not mask & IN_MODIFY)
+            self._pending[name] = (arrived, now, closed)
+
+    def _ready(self) -> List[Tuple[str, float]]:
+        now = time.time()
+        ready = []
+        for name, (arrived, last, closed) in sorted(self._pending.items()):
+            if closed and now - last >= self.debounce:
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    ready.append((path, arrived))
+                del self._pending[name]
+        return ready
+
+    def poll(self, timeout: Optional[float] = None) -> List[Tuple[str, float]]:
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            if time.time() - self._last_rescan >= self.rescan_interval:
+                self._rescan()
+            ready = self._ready()
+            if ready:
+                return ready
+            wait = self.rescan_interval
+            if self._pending:
+                wait = self.debounce
+            if deadline is not None:
+                wait = min(wait, deadline - time.time())
+                if wait <= 0:
+                    return []
+            r, _, _ = select.select([self._fd], [], [], wait)
+            if r:
+                self._read_events()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(directory: str, pattern: Patterns = "*.csv", poll_interval: float = 5.0,
+                 debounce: float = 0.05, use_inotify: bool = True):
+    if use_inotify:
+        try:
+            return InotifyWatcher(directory, pattern, debounce=debounce)
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify unavailable (%s), falling back to polling every %ss", e, poll_interval)
+    return PollingWatcher(directory, pattern, poll_interval=poll_interval, debounce=max(debounce, 0.5))
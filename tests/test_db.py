@@ -0,0 +1,189 @@
+import gzip
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import db
+
+
+def _read_body(handler):
+    if handler.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        data = bytearray()
+        while True:
+            size = int(handler.rfile.readline().strip(), 16)
+            if size == 0:
+                handler.rfile.readline()
+                break
+            data += handler.rfile.read(size)
+            handler.rfile.readline()
+        body = bytes(data)
+    else:
+        body = handler.rfile.read(int(handler.headers.get('Content-Length', 0)))
+    if handler.headers.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body
+
+
+def _varint(buf, pos):
+    shift = result = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _string(buf, pos):
+    n, pos = _varint(buf, pos)
+    return buf[pos:pos + n].decode(), pos + n
+
+
+def parse_native(buf):
+    rows = []
+    pos = 0
+    while pos < len(buf):
+        ncols, pos = _varint(buf, pos)
+        nrows, pos = _varint(buf, pos)
+        cols = {}
+        for _ in range(ncols):
+            name, pos = _string(buf, pos)
+            typ, pos = _string(buf, pos)
+            if typ == 'DateTime':
+                cols[name] = np.frombuffer(buf, '<u4', nrows, pos).tolist()
+                pos += 4 * nrows
+            elif typ == 'Float64':
+                cols[name] = np.frombuffer(buf, '<f8', nrows, pos).tolist()
+                pos += 8 * nrows
+            else:
+                vals = []
+                for _ in range(nrows):
+                    v, pos = _string(buf, pos)
+                    vals.append(v)
+                cols[name] = vals
+        rows.extend(zip(*cols.values()))
+    return rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = _read_body(self)
+        params = parse_qs(urlparse(self.path).query)
+        time.sleep(getattr(self.server, 'delay', 0))
+        if getattr(self.server, 'fail', 0):
+            self.server.fail -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.server.requests.append({
+            'query': params.get('query', [''])[0],
+            'token': params.get('insert_deduplication_token', [None])[0],
+            'rows': parse_native(body),
+        })
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def clickhouse_http(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.requests = []
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    monkeypatch.setattr(db, 'CLICKHOUSE_URL', f'http://127.0.0.1:{server.server_port}')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _frame(n=10):
+    return pd.DataFrame({
+        'ts': pd.date_range('2025-01-01', periods=n, freq='min'),
+        'sensor_id': [1, 22, 'sensor-ü'] * (n // 3) + [1] * (n % 3),
+        'value': np.arange(n, dtype=float) / 4,
+    })
+
+
+def test_write_timeseries_native_roundtrip(clickhouse_http):
+    df = _frame(10)
+    db.write_timeseries(df, batch_rows=4, block_rows=3)
+
+    reqs = clickhouse_http.requests
+    assert [len(r['rows']) for r in reqs] == [4, 4, 2]
+    assert all(r['query'].endswith('FORMAT Native') for r in reqs)
+
+    rows = [row for r in reqs for row in r['rows']]
+    expected_ts = (df['ts'].astype('int64') // 10**9).tolist()
+    assert [r[0] for r in rows] == expected_ts
+    assert [r[1] for r in rows] == [str(s) for s in df['sensor_id']]
+    assert [r[2] for r in rows] == df['value'].tolist()
+
+
+def test_write_timeseries_rejects_timestamps_outside_datetime(clickhouse_http):
+    for bad in (pd.NaT, pd.Timestamp('1969-12-31 23:59:59'), pd.Timestamp('2106-02-08')):
+        df = _frame(3)
+        df.loc[1, 'ts'] = bad
+        with pytest.raises(ValueError):
+            db.write_timeseries(df)
+    assert not clickhouse_http.requests
+
+
+def test_write_timeseries_uncompressed_and_session_reuse(clickhouse_http):
+    db.write_timeseries(_frame(5), compress=False)
+    assert len(clickhouse_http.requests[0]['rows']) == 5
+    assert db.get_session() is db.get_session()
+
+
+def test_async_writer_orders_batches_per_file_and_retries(clickhouse_http):
+    pytest.importorskip('aiohttp')
+    from pipeline.async_db import AsyncClickHouseWriter
+
+    clickhouse_http.delay = 0.02
+    clickhouse_http.fail = 1
+    with AsyncClickHouseWriter(concurrency=4, max_in_flight=3, batch_rows=4, backoff=0.01) as writer:
+        futures = [writer.submit(_frame(10), key='a.csv'), writer.submit(_frame(9), key='b.csv'),
+                   writer.submit(_frame(10), key='a.csv', part=1)]
+        assert [f.result(timeout=10) for f in futures] == [10, 9, 10]
+
+    reqs = clickhouse_http.requests
+    tokens = [r['token'] for r in reqs]
+    assert len(tokens) == len(set(tokens)) == 3 + 3 + 3
+    a = [t.split(':')[1:3] for t in tokens if t.startswith('a.csv:')]
+    assert a == [['0', '0'], ['0', '1'], ['0', '2'], ['1', '0'], ['1', '1'], ['1', '2']]
+
+
+def test_timeseries_table_honours_dedup_tokens():
+    # a non-replicated MergeTree ignores insert_deduplication_token without a dedup window
+    with open(os.path.join(os.path.dirname(__file__), '..', 'clickhouse', 'init.sql')) as f:
+        ddl = f.read()
+    create = ddl.split('CREATE TABLE IF NOT EXISTS pipeline.timeseries', 1)[1].split(';', 1)[0]
+    assert re.search(r'SETTINGS\s+non_replicated_deduplication_window\s*=\s*[1-9]', create)
+    assert re.search(r'ALTER TABLE pipeline\.timeseries MODIFY SETTING non_replicated_deduplication_window\s*=\s*[1-9]',
+                     ddl)
+
+
+def test_async_writer_failure_stops_later_batches_of_the_file(clickhouse_http):
+    pytest.importorskip('aiohttp')
+    from pipeline.async_db import AsyncClickHouseWriter
+
+    clickhouse_http.fail = 100
+    with AsyncClickHouseWriter(batch_rows=4, retries=1, backoff=0.01) as writer:
+        first = writer.submit(_frame(10), key='a.csv')
+        with pytest.raises(RuntimeError):
+            first.result(timeout=10)
+    assert clickhouse_http.requests == []
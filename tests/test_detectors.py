@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+import pytest
 from infrastructure.detectors.zscore import ZScoreDetector
 from infrastructure.detectors.mad import MADDetector
 from infrastructure.detectors.rolling import RollingDetector
@@ -34,4 +36,129 @@ def test_rolling_detects_outlier():
 
     res = det.detect(s)
     assert res.severity > 0
-    assert res.anomalies.iloc[-1] > 0
\ No newline at end of file
+    assert res.anomalies.iloc[-1] > 0
+
+def _zscore_loop(s, threshold):
+    mean = s.mean()
+    std = s.std(ddof=0)
+    out = pd.Series(0.0, index=s.index, name="severity")
+    for i, x in s.items():
+        abs_dev = abs(x - mean)
+        if std < 1e-6:
+            if abs_dev > threshold:
+                out[i] = abs_dev
+            continue
+        z = abs_dev / std
+        if z > threshold or abs_dev > threshold:
+            out[i] = z
+    return out
+
+def _rolling_loop(s, window, z_threshold):
+    rmean = s.rolling(window, min_periods=1).mean()
+    rstd = s.rolling(window, min_periods=1).std(ddof=0)
+    out = pd.Series(0.0, index=s.index, name="severity")
+    for i in s.index:
+        m, std, x = rmean[i], rstd[i], s[i]
+        abs_dev = abs(x - m)
+        if std == 0 or std < 1e-6:
+            if abs_dev > z_threshold:
+                out[i] = abs_dev
+            continue
+        z = abs_dev / std
+        if z > z_threshold or abs_dev > z_threshold:
+            out[i] = z if z > 0 else abs_dev
+    return out
+
+def _parity_inputs():
+    rng = np.random.default_rng(0)
+    noisy = rng.normal(10.0, 2.0, 500)
+    noisy[rng.integers(0, 500, 10)] += 40.0
+    yield pd.Series(noisy, index=np.arange(1000, 1500))
+    yield pd.Series([5.0] * 20 + [5.0 + 1e-9] * 5 + [9.0] + [5.0] * 10)
+    yield pd.Series([0.0, 0.1, 0.2, 0.1, 0.0] * 40)
+    yield pd.Series([1.0] * 9 + [10.0])
+
+def test_zscore_matches_loop_reference():
+    for s in _parity_inputs():
+        for thr in (0.5, 2.0, 3.0):
+            res = ZScoreDetector(threshold=thr).detect(s)
+            pd.testing.assert_series_equal(res.anomalies, _zscore_loop(s, thr))
+            assert res.severity == float(_zscore_loop(s, thr).sum())
+
+def test_rolling_matches_loop_reference():
+    for s in _parity_inputs():
+        for window, thr in ((3, 2.0), (10, 1.5), (1, 0.5)):
+            res = RollingDetector(window=window, z_threshold=thr).detect(s)
+            pd.testing.assert_series_equal(res.anomalies, _rolling_loop(s, window, thr))
+
+
+def test_detectors_share_prepared_input():
+    from domain.prepared import PreparedInput
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({'ts': pd.date_range('2025-01-01', periods=500, freq='s'),
+                       'value': pd.Series(rng.normal(0, 1, 500)).astype(object)})
+    df.loc[[3, 40], 'value'] = ['bad', None]
+
+    prepared = PreparedInput.from_any(df)
+    assert prepared.values.flags['C_CONTIGUOUS'] and prepared.values[3] == 0.0
+    for det in (ZScoreDetector(threshold=2.0), MADDetector(threshold=3.0), RollingDetector(window=5),
+                RollingDetector(window=5, z_threshold=3.0)):
+        pd.testing.assert_series_equal(det.detect(prepared).anomalies, det.detect(df).anomalies)
+    assert {'mean', 'std', 'median', 'mad', ('rolling_mean_std', 5)} <= set(prepared._memo)
+    assert prepared.mean == pytest.approx(float(np.mean(prepared.values)))
+    np.testing.assert_array_equal(prepared.timestamps, df['ts'].to_numpy())
+
+
+def test_sorted_lof_matches_sklearn_and_reference_mode():
+    from sklearn.neighbors import LocalOutlierFactor
+    from infrastructure.detectors.lof import LOFDetector, SortedLOF
+    rng = np.random.default_rng(11)
+    x = np.r_[rng.normal(0, 1, 800), rng.normal(6, 0.3, 60), [25.0, -30.0]]
+
+    clf = LocalOutlierFactor(n_neighbors=15).fit(x.reshape(-1, 1))
+    model = SortedLOF(15).fit(x)
+    np.testing.assert_allclose(model.fit_scores(), -clf.negative_outlier_factor_, rtol=1e-10)
+
+    novelty = LocalOutlierFactor(n_neighbors=15, novelty=True).fit(x.reshape(-1, 1))
+    q = np.r_[rng.normal(0, 4, 300), -100.0, 100.0]
+    np.testing.assert_allclose(model.score(q), -novelty.score_samples(q.reshape(-1, 1)), rtol=1e-10)
+
+    df = pd.DataFrame({'value': x})
+    exact = LOFDetector(n_neighbors=15).detect(df)
+    legacy = LOFDetector(n_neighbors=15, method='sklearn').detect(df['value'])
+    np.testing.assert_allclose(exact.to_numpy(), legacy.to_numpy(), rtol=1e-10, atol=1e-12)
+
+    det = LOFDetector(n_neighbors=15, reference_size=200, refit_every=2)
+    det.detect(df)
+    first = det.model
+    det.detect(df)
+    assert det.model is first
+    det.detect(df)
+    assert det.model is not first
+    assert det.detect(df).idxmax() in (860, 861)
+
+
+def test_lof_reference_mode_keeps_one_model_per_sensor():
+    from application.executor import DetectorExecutor
+    from application.service import AnomalyDetectionService
+    from infrastructure.detectors.lof import LOFDetector
+    rng = np.random.default_rng(5)
+    n = 400
+    sensor = np.tile([1, 2], n // 2)
+    df = pd.DataFrame({'sensor_id': sensor, 'value': np.where(sensor == 1, 0.0, 100.0) + rng.normal(0, 1, n)})
+
+    det = LOFDetector(n_neighbors=10, reference_size=100, refit_every=2)
+    executor = DetectorExecutor('process', max_workers=2)
+    svc = AnomalyDetectionService(None, [det], group_by_sensor=True, executor=executor)
+    try:
+        (_, first), = svc.run_detectors(df)
+        models = dict(det._models)
+        svc.run_detectors(df)
+    finally:
+        executor.close()
+    assert set(models) == {1, 2} and det._models == models
+    assert det._windows_scored == {1: 2, 2: 2}
+
+    for sid in (1, 2):
+        alone = LOFDetector(n_neighbors=10, reference_size=100).detect(df.loc[sensor == sid, 'value'])
+        np.testing.assert_allclose(first.anomalies[sensor == sid].to_numpy(), alone.to_numpy())
@@ -1,6 +1,7 @@
 import pandas as pd
-from pipeline.etl import transform
-from pipeline.anomaly import detect_anomalies_zscore, detect_anomalies_isolation
+import numpy as np
+from pipeline.etl import transform, iter_transformed_chunks, chunk_rows_for_budget, extract
+from pipeline.anomaly import detect_anomalies_zscore, detect_anomalies_isolation, IsolationModelCache
 
 def test_transform_basic():
     df = pd.DataFrame({
@@ -13,6 +14,7 @@ def test_transform_basic():
     assert out['ts'].dtype.kind == 'M'
     assert out['value'].dtype.kind in ('f', 'i')
     assert len(out) == 3
+    assert out['value'].tolist() == [1.0, 2.0, 2.0]
 
 def test_zscore_detector_detects_outlier():
     df = pd.DataFrame({
@@ -27,6 +29,35 @@ def test_zscore_detector_detects_outlier():
     assert out['anomaly'].sum() >= 1
 
 
+
+def test_low_memory_transform_matches_default(tmp_path):
+    path = str(tmp_path / 'gappy.csv')
+    raw = _write_gappy_csv(path, n=500, sensors=4)
+    shuffled = raw.sample(frac=1.0, random_state=0)
+
+    whole = transform(shuffled).reset_index(drop=True)
+    for compact in (transform(shuffled.copy(), low_memory=True),
+                    transform(extract(path, low_memory=True), low_memory=True)):
+        assert compact['sensor_id'].dtype.name == 'category'
+        assert compact['value'].dtype == np.float32
+        assert compact['ts'].dtype.kind == 'M'
+        compact = compact.assign(sensor_id=compact['sensor_id'].astype(int), value=compact['value'].astype(float))
+        pd.testing.assert_frame_equal(compact[['ts', 'sensor_id', 'value']], whole[['ts', 'sensor_id', 'value']],
+                                      check_dtype=False, atol=1e-6)
+
+    # offsets are kept like in the default path
+    raw.assign(ts=raw['ts'] + '+01:00').to_csv(path, index=False)
+    compact = transform(extract(path, low_memory=True), low_memory=True)
+    expected = transform(extract(path)).reset_index(drop=True)
+    assert str(compact['ts'].dt.tz) == 'UTC+01:00'
+    pd.testing.assert_series_equal(compact['ts'], expected['ts'])
+
+    header_only = str(tmp_path / 'empty.csv')
+    raw.iloc[:0].to_csv(header_only, index=False)
+    compact = transform(extract(header_only, low_memory=True), low_memory=True)
+    assert compact.shape == transform(extract(header_only)).shape == (0, 3)
+
+
 def test_isolation_detector_runs():
     df = pd.DataFrame({
         'ts': pd.date_range('2025-01-01', periods=20, freq='T'),
@@ -36,4 +67,158 @@ def test_isolation_detector_runs():
     out = detect_anomalies_isolation(df, contamination=0.05)
 
     assert 'anomaly' in out.columns
-    assert out['anomaly'].dtype.kind in ('i', 'f')
\ No newline at end of file
+    assert out['anomaly'].dtype.kind in ('i', 'f')
+
+
+def _write_gappy_csv(path, n=200, sensors=3):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'ts': pd.date_range('2025-01-01', periods=n, freq='s').astype(str),
+        'sensor_id': rng.integers(1, sensors + 1, n),
+        'value': rng.normal(0, 1, n).round(3),
+    })
+    df.loc[rng.random(n) < 0.2, 'value'] = np.nan
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_chunked_transform_matches_whole_file(tmp_path):
+    path = str(tmp_path / 'gappy.csv')
+    raw = _write_gappy_csv(path)
+
+    whole = transform(raw).reset_index(drop=True)
+    chunks = list(iter_transformed_chunks(path, chunksize=17))
+    assert len(chunks) > 5
+    assert chunks[0]['sensor_id'].dtype.name == 'category'
+
+    merged = pd.concat(chunks, ignore_index=True)
+    merged['sensor_id'] = merged['sensor_id'].astype(int)
+    merged = merged.sort_values(['sensor_id', 'ts']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(merged[['ts', 'sensor_id', 'value']], whole[['ts', 'sensor_id', 'value']],
+                                  check_dtype=False)
+
+
+def test_chunk_rows_follow_memory_limit(tmp_path):
+    path = str(tmp_path / 'gappy.csv')
+    _write_gappy_csv(path)
+    assert chunk_rows_for_budget(path, 64) > chunk_rows_for_budget(path, 8)
+
+
+def _sensor_batches(sensors=6, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'sensor_id': np.repeat(np.arange(sensors), n),
+                         'value': rng.standard_t(3, sensors * n)}).sample(frac=1.0, random_state=seed)
+
+
+def test_isolation_matches_per_sensor_fit_predict():
+    from sklearn.ensemble import IsolationForest
+    df = _sensor_batches()
+    got = detect_anomalies_isolation(df)
+
+    expected = pd.Series(0, index=df.index)
+    for _, g in df.groupby('sensor_id'):
+        preds = IsolationForest(contamination=0.01, random_state=42).fit_predict(g[['value']].to_numpy())
+        expected[g.index] = (preds == -1).astype(int)
+    assert got['anomaly'].sum() > 0
+    pd.testing.assert_series_equal(got['anomaly'], expected, check_names=False, check_dtype=False)
+
+    parallel = detect_anomalies_isolation(df, cache=IsolationModelCache(n_jobs=2))
+    pd.testing.assert_series_equal(parallel['anomaly'], got['anomaly'])
+
+
+def test_isolation_cache_reuses_retrains_and_evicts():
+    cache = IsolationModelCache(max_models=4, retrain_every=3, drift_threshold=3.0)
+    detect_anomalies_isolation(_sensor_batches(sensors=4), cache=cache)
+    assert cache.fits == 4
+    detect_anomalies_isolation(_sensor_batches(sensors=4, seed=1), cache=cache)
+    assert cache.fits == 4
+
+    shifted = _sensor_batches(sensors=4, seed=2)
+    shifted.loc[shifted['sensor_id'] == 0, 'value'] += 50.0
+    detect_anomalies_isolation(shifted, cache=cache)
+    assert cache.fits == 5
+
+    # sensors 1-3 hit retrain_every, sensor 0 drifts back to its old level
+    detect_anomalies_isolation(_sensor_batches(sensors=4, seed=3), cache=cache)
+    assert cache.fits == 9
+
+    six = _sensor_batches(sensors=6, seed=4)
+    detect_anomalies_isolation(six, cache=cache)
+    assert len(cache) == 4
+    assert list(cache.models) == list(pd.unique(six['sensor_id']))[-4:]
+
+
+def test_ensure_datetime_fast_paths_match_pandas():
+    import pytest
+    import warnings
+    from pipeline.utils import ensure_datetime, FORMAT_CACHE_SIZE, _FORMAT_CACHE
+    ts = pd.Series(pd.date_range('2025-01-01', periods=600, freq='37min'))
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f', '%d/%m/%Y %H:%M', '%Y%m%d %H%M%S'):
+        s = ts.dt.strftime(fmt).astype(object)
+        s.iloc[3] = None
+        expected = pd.to_datetime(s, format=fmt)
+        pd.testing.assert_series_equal(ensure_datetime(s, source='a.csv'), expected)
+    # day-first dates are recognised from the sample, not just the first value
+    assert ensure_datetime(ts.dt.strftime('%d/%m/%Y %H:%M')).iloc[-1] == ts.iloc[-1].floor('min')
+    assert any(f == '%d/%m/%Y %H:%M' for f in _FORMAT_CACHE.values())
+
+    aware = ensure_datetime(ts.dt.strftime('%Y-%m-%dT%H:%M:%S+03:00'))
+    assert str(aware.dt.tz) == 'UTC+03:00'
+    assert aware.iloc[0] == pd.Timestamp('2025-01-01 00:00:00+03:00')
+    assert str(ensure_datetime(ts.dt.strftime('%Y-%m-%dT%H:%M:%SZ')).dt.tz) == 'UTC'
+    # copy: strftime's result is a view, setting an item on it is discarded
+    mixed = ts.dt.strftime('%Y-%m-%dT%H:%M:%S+00:00').copy()
+    mixed.iloc[10] = '2025-01-01T06:10:00+01:00'
+    naive_first = ts.dt.strftime('%Y-%m-%dT%H:%M:%S').copy()
+    naive_first.iloc[10] = '2025-01-01T06:10:00+01:00'
+    with warnings.catch_warnings():
+        # raised before pandas' deprecated mixed-offset path is reached
+        warnings.simplefilter('error', FutureWarning)
+        for s in (mixed, naive_first):
+            with pytest.raises(ValueError):
+                ensure_datetime(s)
+
+    for i in range(FORMAT_CACHE_SIZE + 10):
+        ensure_datetime(ts.iloc[:10].dt.strftime('%Y-%m-%d %H:%M:%S'), source=f'incoming/{i}.csv@host-1.claimed')
+    assert len(_FORMAT_CACHE) == FORMAT_CACHE_SIZE
+
+    for unit in ('s', 'ms', 'us', 'ns'):
+        epoch = (ts - pd.Timestamp(0)) // pd.Timedelta(1, unit)
+        pd.testing.assert_series_equal(ensure_datetime(epoch), ts, check_names=False)
+
+
+def _zscore_loop(df, z_thresh=3.5):
+    from pipeline.anomaly import _modified_z_scores
+    df = df.copy()
+    df['anomaly'] = 0
+    for _, g in df.groupby('sensor_id'):
+        if len(g) < 2:
+            continue
+        mask = np.abs(_modified_z_scores(g['value'].astype(float).values)) > z_thresh
+        df.loc[g.index, 'anomaly'] = mask.astype(int)
+    return df
+
+
+def test_vectorized_zscore_matches_per_sensor_loop():
+    rng = np.random.default_rng(7)
+    n = 5000
+    df = pd.DataFrame({'sensor_id': rng.integers(0, 40, n), 'value': rng.standard_t(3, n)},
+                      index=rng.permutation(n) * 3)                     # non-default index labels
+    df.loc[df['sensor_id'] == 3, 'value'] = 2.5                       # mad == 0, std == 0
+    spike = df.index[df['sensor_id'] == 4]
+    df.loc[spike, 'value'] = 1.0                                       # mad == 0, std > 0: plain z-score
+    df.loc[spike[:2], 'value'] = [50.0, -20.0]
+    df.loc[df.index[df['sensor_id'] == 5][0], 'value'] = np.nan       # NaN in a sensor: np.median is NaN
+    df.loc[df.index[df['sensor_id'] == 6][1:], 'sensor_id'] = 99       # 6 keeps a single row
+    df.loc[df.index[rng.choice(n, 20, replace=False)], 'sensor_id'] = np.nan
+
+    for z in (2.0, 3.5):
+        got = detect_anomalies_zscore(df, z_thresh=z)
+        pd.testing.assert_frame_equal(got, _zscore_loop(df, z_thresh=z))
+    got = detect_anomalies_zscore(df)
+    assert got.loc[spike[:2], 'anomaly'].tolist() == [1, 1]
+    assert got.loc[df['sensor_id'].isin([3, 5]), 'anomaly'].sum() == 0
+
+    named = df.dropna(subset=['sensor_id']).assign(sensor_id=lambda d: 's' + d['sensor_id'].astype(int).astype(str))
+    pd.testing.assert_frame_equal(detect_anomalies_zscore(named), _zscore_loop(named))
+    assert detect_anomalies_zscore(df.iloc[:0])['anomaly'].tolist() == []
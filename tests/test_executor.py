@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from application.executor import DetectorExecutor
+from application.service import AnomalyDetectionService
+from domain.models import DetectionResult
+from infrastructure.detectors.mad import MADDetector
+from infrastructure.detectors.rolling import RollingDetector
+from infrastructure.detectors.zscore import ZScoreDetector
+
+
+class PythonDetector:
+    # no releases_gil: "auto" sends it to the process pool
+    name = 'python'
+
+    def detect(self, series_or_df):
+        s = series_or_df['value'] if isinstance(series_or_df, pd.DataFrame) else series_or_df
+        v = s.to_numpy()
+        sev = np.where(np.abs(v) > 2.0, np.abs(v), 0.0)
+        return DetectionResult(pd.Series(sev, index=s.index), float(sev.sum()))
+
+
+class SlowDetector(PythonDetector):
+    name = 'slow'
+    timeout = 0.2
+
+    def detect(self, series_or_df):
+        time.sleep(5)
+        return super().detect(series_or_df)
+
+
+class PidDetector(PythonDetector):
+    name = 'pid'
+
+    def detect(self, series_or_df):
+        return os.getpid()
+
+
+def _frame(n=2000):
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({'timestamp': pd.date_range('2025-01-01', periods=n, freq='s'),
+                       'sensor_id': rng.integers(0, 5, n), 'value': rng.normal(0, 1, n)})
+    return df.set_index(pd.RangeIndex(100, 100 + n))
+
+
+@pytest.mark.parametrize('mode', ['thread', 'process', 'auto'])
+@pytest.mark.parametrize('grouped', [False, True])
+def test_executor_modes_match_serial(mode, grouped):
+    df = _frame()
+    detectors = [ZScoreDetector(threshold=2.0), MADDetector(threshold=3.0), RollingDetector(window=7),
+                 PythonDetector()]
+    serial = AnomalyDetectionService(None, detectors, group_by_sensor=grouped)
+    executor = DetectorExecutor(mode, max_workers=2)
+    parallel = AnomalyDetectionService(None, detectors, group_by_sensor=grouped, executor=executor)
+    try:
+        for (d1, r1), (d2, r2) in zip(serial.run_detectors(df), parallel.run_detectors(df)):
+            assert d1 is d2
+            pd.testing.assert_series_equal(r1.anomalies, r2.anomalies)
+    finally:
+        executor.close()
+
+
+@pytest.mark.parametrize('mode', ['thread', 'process'])
+def test_executor_timeout_keeps_detector_order(mode):
+    executor = DetectorExecutor(mode, max_workers=3)
+    detectors = [SlowDetector(), ZScoreDetector(threshold=2.0), PythonDetector()]
+    svc = AnomalyDetectionService(None, detectors, executor=executor)
+    try:
+        t0 = time.monotonic()
+        report = svc.evaluate(_frame())
+        assert time.monotonic() - t0 < 3
+        assert list(report.detector_stats) == ['SlowDetector', 'ZScoreDetector', 'PythonDetector']
+        assert report.detector_stats['SlowDetector'] == {'count': 0, 'severity': 0.0}
+        assert report.detector_stats['ZScoreDetector']['count'] > 0
+    finally:
+        executor.close()
+
+
+def _running(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc')
+def test_process_timeout_terminates_stuck_worker():
+    executor = DetectorExecutor('process', max_workers=1)
+    try:
+        (_, pid), = executor.run([PidDetector()], _frame())
+        assert _running(pid)
+        (_, raw), = executor.run([SlowDetector()], _frame())
+        assert raw is None
+        deadline = time.monotonic() + 3
+        while _running(pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not _running(pid)
+        (_, raw), = executor.run([PythonDetector()], _frame())
+        assert raw.severity > 0
+    finally:
+        executor.close()
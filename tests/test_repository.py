@@ -0,0 +1,260 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from infrastructure.repository.clickhouse_stub import ClickHouseRepositoryStub
+
+pytest.importorskip('pyarrow')
+from pipeline.formats import write_columnar, read_columnar  # noqa: E402
+from pipeline.etl import extract, iter_transformed_chunks, transform  # noqa: E402
+
+
+def _frame(n=240, sensors=3):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'ts': pd.date_range('2025-01-01', periods=n, freq='min'),
+        'sensor_id': np.arange(n) % sensors,
+        'value': rng.normal(0, 1, n),
+    })
+
+
+@pytest.mark.parametrize('ext', ['parquet', 'arrow'])
+def test_read_window_pushes_down_time_range_and_projection(tmp_path, ext):
+    df = _frame()
+    os.makedirs(tmp_path / 'data')
+    write_columnar(df, str(tmp_path / 'data' / f'window.{ext}'), row_group_rows=50)
+    repo = ClickHouseRepositoryStub(repo_root=str(tmp_path))
+
+    start, end = pd.Timestamp('2025-01-01 01:00'), pd.Timestamp('2025-01-01 02:00')
+    out = repo.read_window(start=start, end=end, columns=['ts', 'value'])
+
+    expected = df[(df['ts'] >= start) & (df['ts'] < end)]
+    assert list(out.columns) == ['timestamp', 'value']
+    assert len(out) == 60
+    np.testing.assert_array_equal(out['value'].to_numpy(), expected['value'].to_numpy())
+
+    only = read_columnar(str(tmp_path / 'data' / f'window.{ext}'), sensor_ids=[1])
+    assert set(only['sensor_id']) == {1}
+
+
+@pytest.mark.parametrize('ext', ['parquet', 'arrow'])
+def test_columnar_input_matches_csv_etl(tmp_path, ext):
+    df = _frame()
+    df.loc[::7, 'value'] = np.nan
+    csv_path, col_path = str(tmp_path / 'in.csv'), str(tmp_path / f'in.{ext}')
+    df.to_csv(csv_path, index=False)
+    write_columnar(df, col_path)
+
+    from_csv = transform(extract(csv_path)).reset_index(drop=True)
+    from_col = transform(extract(col_path)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(from_col, from_csv)
+
+    chunked = pd.concat(list(iter_transformed_chunks(col_path, chunksize=64)), ignore_index=True)
+    chunked = chunked.sort_values(['sensor_id', 'ts']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(chunked, from_csv)
+
+
+def test_read_window_uses_sorted_index_for_csv(tmp_path):
+    df = _frame().sample(frac=1.0, random_state=1)
+    data = tmp_path / 'data'
+    os.makedirs(data)
+    df.to_csv(data / 'window.csv', index=False)
+    repo = ClickHouseRepositoryStub(repo_root=str(tmp_path))
+
+    start, end = pd.Timestamp('2025-01-01 01:00'), pd.Timestamp('2025-01-01 02:30')
+    out = repo.read_window(start=start, end=end)
+    expected = df[(df['ts'] >= start) & (df['ts'] < end)].sort_values('ts')
+    assert os.path.exists(data / '.index' / 'window.csv' / 'meta.json')
+    assert out['timestamp'].is_monotonic_increasing
+    np.testing.assert_allclose(out['value'].to_numpy(), expected['value'].to_numpy())
+    assert list(out.columns) == ['timestamp', 'sensor_id', 'value']
+
+    only = repo.read_window(start=start, end=end, columns=['ts', 'value'], sensor_ids=[2])
+    assert list(only.columns) == ['timestamp', 'value']
+    assert len(only) == (expected['sensor_id'] == 2).sum()
+
+    unindexed = ClickHouseRepositoryStub(repo_root=str(tmp_path), indexed=False).read_window()
+    assert len(unindexed) == len(repo.read_window()) == len(df)
+
+
+def test_read_window_rebuilds_stale_index_and_sees_new_files(tmp_path):
+    data = tmp_path / 'data'
+    os.makedirs(data)
+    _frame(60).to_csv(data / 'a.csv', index=False)
+    repo = ClickHouseRepositoryStub(repo_root=str(tmp_path))
+    assert len(repo.read_window()) == 60
+
+    _frame(90).to_csv(data / 'a.csv', index=False)
+    os.utime(data / 'a.csv', ns=(1, 10**18))
+    assert len(repo.read_window()) == 90
+
+    _frame(30).to_csv(data / 'b.csv', index=False)
+    os.utime(data / 'b.csv', ns=(1, 2 * 10**18))
+    out = repo.read_window()
+    assert len(out) == 120 and out['timestamp'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize('indexed', [True, False])
+def test_read_window_merges_files_in_time_order(tmp_path, indexed):
+    from infrastructure.repository.catalog import merge_sorted
+    data = tmp_path / 'data'
+    os.makedirs(data)
+    df = _frame(600, sensors=4)
+    parts = [df.iloc[0:300], df.iloc[200:450], df.iloc[100:600:3]]
+    parts[0].sample(frac=1.0, random_state=0).to_csv(data / 'a.csv', index=False)
+    write_columnar(parts[1], str(data / 'b.parquet'), row_group_rows=40)
+    write_columnar(parts[2], str(data / 'c.arrow'))
+    repo = ClickHouseRepositoryStub(repo_root=str(tmp_path), indexed=indexed)
+
+    start, end = pd.Timestamp('2025-01-01 02:00'), pd.Timestamp('2025-01-01 08:00')
+    expected = pd.concat(parts).rename(columns={'ts': 'timestamp'})
+    expected = expected[(expected['timestamp'] >= start) & (expected['timestamp'] < end)]
+    out = repo.read_window(start=start, end=end)
+    assert out['timestamp'].is_monotonic_increasing
+    assert len(out) == len(expected)
+    np.testing.assert_allclose(np.sort(out['value'].to_numpy()), np.sort(expected['value'].to_numpy()))
+
+    chunks = list(repo.iter_window(start=start, end=end, sensor_ids=[1, 3]))
+    merged = pd.concat(chunks, ignore_index=True)
+    assert set(merged['sensor_id']) == {1, 3} and merged['timestamp'].is_monotonic_increasing
+    assert len(merged) == expected['sensor_id'].isin([1, 3]).sum()
+
+    # chunked streams: ties keep stream order, output identical to a stable sort
+    streams = [[p.iloc[i:i + 7] for i in range(0, len(p), 7)] for p in (df.iloc[0:50], df.iloc[20:80], df.iloc[10:30])]
+    got = pd.concat(list(merge_sorted(streams, 'ts')), ignore_index=True)
+    want = pd.concat([df.iloc[0:50], df.iloc[20:80], df.iloc[10:30]]).sort_values('ts', kind='stable')
+    pd.testing.assert_frame_equal(got, want.reset_index(drop=True))
+
+
+def test_file_catalog_stats_only_new_files(tmp_path, monkeypatch):
+    from infrastructure.repository import catalog as catalog_module
+    from infrastructure.repository.catalog import FileCatalog
+    for name, t in (('x.csv', 3), ('a.csv', 1), ('note.txt', 2)):
+        (tmp_path / name).write_text('ts,value\n')
+        os.utime(tmp_path / name, ns=(t, t * 10**9))
+    cat = FileCatalog(str(tmp_path), ('.csv',))
+    assert [os.path.basename(p) for p in cat.files()] == ['a.csv', 'x.csv']
+
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(catalog_module.os, 'stat', lambda p, *a, **k: stats.append(p) or real_stat(p, *a, **k))
+    cat.files()
+    assert stats == [str(tmp_path)]                     # unchanged directory: no listdir, no file stats
+    (tmp_path / 'm.csv').write_text('ts,value\n')
+    os.utime(tmp_path / 'm.csv', ns=(2, 2 * 10**9))
+    os.utime(tmp_path, ns=(5, 5 * 10**9))
+    stats.clear()
+    assert [os.path.basename(p) for p in cat.files()] == ['a.csv', 'm.csv', 'x.csv']
+    assert stats == [str(tmp_path), str(tmp_path / 'm.csv')]
+
+
+def _reports(n, start='2025-01-01 22:00', freq='30min'):
+    from domain.models import AnomalyReport, anomaly_frame
+    ends = pd.date_range(start, periods=n, freq=freq)
+    return [AnomalyReport(sensor_id=i % 3, window_start=e - pd.Timedelta('1h'), window_end=e,
+                          anomalies=anomaly_frame(severity=[1.0] * (i % 4)), severity=float(i),
+                          severity_level='low', detector_stats={'zscore': {'count': i % 4}})
+            for i, e in enumerate(ends)]
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'parquet'])
+def test_report_store_rotates_and_reads_time_range(tmp_path, fmt):
+    from infrastructure.repository.report_store import ReportReader, ReportWriter
+    reports = _reports(12)
+    with ReportWriter(str(tmp_path), format=fmt, flush_rows=2, flush_interval=3600) as w:
+        for r in reports:
+            w.write(r)
+    names = sorted(p.name for p in tmp_path.iterdir() if p.name.endswith(fmt))
+    assert names == [f'anomaly_reports-20250101-0000.{fmt}', f'anomaly_reports-20250102-0000.{fmt}']
+
+    reader = ReportReader(str(tmp_path))
+    start, end = pd.Timestamp('2025-01-02 00:30'), pd.Timestamp('2025-01-02 02:00')
+    assert reader.segments(start, end) == [str(tmp_path / names[1])]
+    out = reader.query(start, end)
+    assert list(out['window_end']) == list(pd.date_range(start, periods=3, freq='30min'))
+    assert list(out['severity']) == [5.0, 6.0, 7.0]
+    assert out['detector_stats'][0] == {'zscore': {'count': 1}}
+    assert len(reader.query()) == 12
+
+
+def test_report_store_skips_blocks_and_recovers_unindexed_tail(tmp_path):
+    from infrastructure.repository.report_store import ReportReader, ReportWriter
+    w = ReportWriter(str(tmp_path), flush_rows=4, flush_interval=3600, max_bytes=10**9)
+    for r in _reports(8, start='2025-01-01 00:00'):
+        w.write(r)
+    w.close()
+    path = str(tmp_path / 'anomaly_reports-20250101-0000.jsonl')
+    reader = ReportReader(str(tmp_path))
+    blocks = reader._blocks(path, lo=None, hi=int(pd.Timestamp('2025-01-01 01:00').value))
+    assert len(blocks) == 1 and blocks[0][0] == 0       # the 02:00-03:30 block is not read
+    assert list(reader.query(end='2025-01-01 01:00')['severity']) == [0.0, 1.0]
+
+    # a crash between the data and the index write leaves rows past the last indexed block
+    w = ReportWriter(str(tmp_path), flush_rows=1, flush_interval=3600)
+    w.write(_reports(1, start='2025-01-01 12:00')[0])
+    w.close()
+    os.remove(str(tmp_path / 'anomaly_reports-20250101-0001.jsonl.idx'))
+    out = reader.query(start='2025-01-01 11:00', end='2025-01-01 13:00')
+    assert list(out['window_end']) == [pd.Timestamp('2025-01-01 12:00')]
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'parquet'])
+def test_repository_buffers_reports_until_flush(tmp_path, fmt):
+    repo = ClickHouseRepositoryStub(repo_root=str(tmp_path),
+                                    reports={'format': fmt, 'flush_rows': 100, 'flush_interval': 3600})
+    for r in _reports(5):
+        repo.persist_report(r)
+    path = repo.reports.path
+    assert path is None or os.path.getsize(path) == 0
+    assert len(repo.read_reports()) == 5
+    # the parquet segment read above was closed; later rows go to a new one
+    for r in _reports(3, start='2025-01-01 12:00'):
+        repo.persist_report(r)
+    assert len(repo.read_reports()) == 8
+    repo.close()
+
+
+def test_report_writer_flushes_when_idle(tmp_path):
+    from infrastructure.repository.report_store import ReportReader, ReportWriter
+    w = ReportWriter(str(tmp_path), flush_rows=100, flush_interval=0.05)
+    w.write(_reports(1)[0])
+    deadline = time.time() + 5
+    while not len(ReportReader(str(tmp_path)).query()) and time.time() < deadline:
+        time.sleep(0.02)
+    assert len(ReportReader(str(tmp_path)).query()) == 1
+    w.close()
+
+
+@pytest.mark.parametrize('interval', [None, 0])
+def test_report_writer_without_interval_flushes_on_rows(tmp_path, interval):
+    from infrastructure.repository.report_store import ReportReader, ReportWriter
+    w = ReportWriter(str(tmp_path), flush_rows=2, flush_interval=interval)
+    reports = _reports(3)
+    w.write(reports[0])
+    assert w._timer is None and len(ReportReader(str(tmp_path)).query()) == 0
+    w.write(reports[1])
+    w.write(reports[2])
+    assert len(ReportReader(str(tmp_path)).query()) == 2
+    w.close()
+    assert len(ReportReader(str(tmp_path)).query()) == 3
+
+
+def test_file_index_normalises_sensor_keys(tmp_path):
+    from infrastructure.repository.window_index import FileIndex
+    df = _frame(90)
+    df['sensor_id'] = df['sensor_id'].astype(float)
+    src = tmp_path / 'src.csv'
+    df.to_csv(src, index=False)
+    index = FileIndex.build(str(src), df, str(tmp_path / 'idx'))
+    assert set(index.meta['sensors']) == {'0', '1', '2'}
+    first_hour = (pd.Timestamp('2025-01-01'), pd.Timestamp('2025-01-01 01:00'))
+    for sid in (1, 1.0, np.int64(1), np.float32(1)):
+        assert index.overlaps(*first_hour, sensor_ids=[sid])
+    assert not index.overlaps(*first_hour, sensor_ids=[7])
+
+    df['sensor_id'] = pd.Series([1, 1.0, 'a'] * 30, dtype=object)
+    index = FileIndex.build(str(src), df, str(tmp_path / 'idx'))
+    assert {k: v[2] for k, v in index.meta['sensors'].items()} == {'1': 60, 'a': 30}
@@ -0,0 +1,247 @@
+import os
+import shutil
+import time
+
+from pipeline.parallel import ParallelFileProcessor, claim_file, recover_stale_claims, CLAIM_SUFFIX
+
+
+def _archive_or_fail(claimed, name, archive_dir):
+    attempts = os.path.join(archive_dir, name + '.attempts')
+    n = int(open(attempts).read()) + 1 if os.path.exists(attempts) else 1
+    with open(attempts, 'w') as f:
+        f.write(str(n))
+    if name.startswith('bad') or (name.startswith('flaky') and n == 1):
+        raise ValueError(f'cannot parse {name}')
+    if name.startswith('slow'):
+        time.sleep(0.5)
+    shutil.move(claimed, os.path.join(archive_dir, name))
+    return name
+
+
+def test_claim_is_exclusive(tmp_path):
+    path = tmp_path / 'a.csv'
+    path.write_text('ts,value\n')
+    first = claim_file(str(path), 'host-1')
+    assert first and first.endswith(CLAIM_SUFFIX)
+    assert claim_file(str(path), 'host-2') is None
+    assert not path.exists()
+
+
+def test_parallel_processor_retries_and_isolates_failures(tmp_path):
+    from functools import partial
+    incoming, archive = tmp_path / 'in', tmp_path / 'archive'
+    incoming.mkdir()
+    archive.mkdir()
+    names = ['a.csv', 'b.csv', 'bad.csv', 'flaky.csv', 'slow.csv', 'z.csv']
+    for n in names:
+        (incoming / n).write_text('ts,value\n')
+
+    proc = ParallelFileProcessor(str(incoming), partial(_archive_or_fail, archive_dir=str(archive)), workers=3,
+                                 max_retries=2, retry_backoff=0.05, failed_dir=str(tmp_path / 'failed'))
+    try:
+        proc.run_until_idle(poll_interval=0.02)
+    finally:
+        proc.close()
+
+    assert sorted(p for p in os.listdir(archive) if p.endswith('.csv')) == ['a.csv', 'b.csv', 'flaky.csv', 'slow.csv', 'z.csv']
+    assert os.listdir(tmp_path / 'failed') == ['bad.csv']
+    assert (archive / 'flaky.csv.attempts').read_text() == '2'
+    assert os.listdir(incoming) == []
+
+
+def test_recover_stale_claims_from_dead_process(tmp_path):
+    import socket
+    path = tmp_path / 'a.csv'
+    path.write_text('ts,value\n')
+    claim_file(str(path), f'{socket.gethostname()}-999999999')
+    live = tmp_path / 'b.csv'
+    live.write_text('ts,value\n')
+    claim_file(str(live), f'{socket.gethostname()}-{os.getpid()}')
+
+    assert recover_stale_claims(str(tmp_path)) == 1
+    assert path.exists() and not live.exists()
+
+
+def test_inotify_watcher_waits_for_close_and_sees_renames(tmp_path):
+    from pipeline.watcher import InotifyWatcher
+    w = InotifyWatcher(str(tmp_path), debounce=0.05)
+    try:
+        f = open(tmp_path / 'partial.csv', 'w')
+        f.write('ts,value\n')
+        f.flush()
+        assert w.poll(timeout=0.2) == []
+
+        f.write('2025-01-01,1\n')
+        f.close()
+        t0 = time.time()
+        ready = w.poll(timeout=2)
+        assert [os.path.basename(p) for p, _ in ready] == ['partial.csv']
+        assert time.time() - t0 < 1.0
+        assert ready[0][1] <= time.time()
+
+        (tmp_path / 'upload.tmp').write_text('ts,value\n')
+        os.rename(tmp_path / 'upload.tmp', tmp_path / 'moved.csv')
+        assert [os.path.basename(p) for p, _ in w.poll(timeout=2)] == ['moved.csv']
+    finally:
+        w.close()
+
+
+def test_polling_watcher_debounces_growing_files(tmp_path):
+    from pipeline.watcher import PollingWatcher
+    w = PollingWatcher(str(tmp_path), poll_interval=0.05, debounce=0.1)
+    (tmp_path / 'a.csv').write_text('ts,value\n')
+    assert w.poll(timeout=0) == []
+    ready = w.poll(timeout=1)
+    assert [os.path.basename(p) for p, _ in ready] == ['a.csv']
+
+
+def test_process_file_reports_stages_and_dumps_slow_profile(tmp_path, monkeypatch):
+    import numpy as np
+    import pandas as pd
+    from pipeline import runner
+
+    written = []
+    monkeypatch.setattr(runner, 'write_timeseries', lambda df: written.append(len(df)))
+    monkeypatch.setattr(runner.settings, 'detect_method', 'zscore')
+    monkeypatch.setattr(runner.settings, 'profile_dir', str(tmp_path / 'profiles'))
+    monkeypatch.setattr(runner.settings, 'profile_threshold_ms', 0)
+    monkeypatch.setattr(runner.settings, 'profile_interval_ms', 1.0)
+    path = tmp_path / 'a.csv'
+    pd.DataFrame({'ts': pd.date_range('2025-01-01', periods=2000, freq='s').astype(str),
+                  'sensor_id': np.arange(2000) % 4, 'value': np.random.default_rng(0).normal(size=2000)}).to_csv(path, index=False)
+
+    m = runner.process_file(str(path), archive_dir=str(tmp_path / 'archive'), chunksize=500)
+    assert sum(written) == m['rows_processed'] == 2000
+    assert {'extract', 'transform', 'detect:zscore', 'load', 'archive'} <= set(m['stages_ms'])
+    assert m['bytes'] > 0 and m['rows_per_s'] > 0 and m['peak_rss_bytes'] > 0
+    assert os.path.exists(m['profile'])
+    with open(m['profile']) as f:
+        assert all(line.rsplit(' ', 1)[1].strip().isdigit() for line in f)
+
+
+def test_claimed_columnar_file_is_read_by_its_original_extension(tmp_path, monkeypatch):
+    import numpy as np
+    import pandas as pd
+    from pipeline import runner
+
+    written = []
+    monkeypatch.setattr(runner, 'write_timeseries', lambda df: written.append(len(df)))
+    monkeypatch.setattr(runner.settings, 'detect_method', 'zscore')
+    incoming, archive = tmp_path / 'incoming', tmp_path / 'archive'
+    incoming.mkdir()
+    path = incoming / 'a.parquet'
+    pd.DataFrame({'ts': pd.date_range('2025-01-01', periods=300, freq='s'),
+                  'sensor_id': np.arange(300) % 3, 'value': np.random.default_rng(0).normal(size=300)}).to_parquet(path)
+    claimed = claim_file(str(path), 'host-1')
+
+    for chunksize in (None, 100):
+        written.clear()
+        shutil.copy(claimed, str(tmp_path / 'copy'))
+        runner._process_claimed(claimed, 'a.parquet', archive_dir=str(archive), chunksize=chunksize)
+        assert sum(written) == 300
+        assert not os.path.exists(claimed)
+        shutil.move(str(tmp_path / 'copy'), claimed)
+    assert all(name.startswith('a.parquet.processed.') for name in os.listdir(archive))
+
+
+def test_serial_watch_skips_files_waiting_for_their_upload(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+    import numpy as np
+    import pandas as pd
+    from pipeline import runner
+
+    class Writer:
+        def __init__(self):
+            self.futures = []
+
+        def submit(self, df, key, part):
+            self.futures.append(Future())
+            return self.futures[-1]
+
+    class Watcher:
+        def __init__(self, path):
+            self.path, self.polls = path, 0
+
+        def poll(self, timeout=None):
+            # the file is still in incoming/ so it is reported again
+            self.polls += 1
+            if self.polls > 3:
+                raise KeyboardInterrupt
+            return [(self.path, time.time())]
+
+        def close(self):
+            pass
+
+    incoming, archive = tmp_path / 'incoming', tmp_path / 'archive'
+    incoming.mkdir()
+    path = incoming / 'a.csv'
+    pd.DataFrame({'ts': pd.date_range('2025-01-01', periods=50, freq='s').astype(str),
+                  'sensor_id': np.arange(50) % 2, 'value': np.random.default_rng(0).normal(size=50)}).to_csv(path, index=False)
+    writer = Writer()
+    monkeypatch.setattr(runner, '_async_writer', lambda: writer)
+    monkeypatch.setattr(runner, 'make_watcher', lambda *a, **k: Watcher(str(path)))
+    monkeypatch.setattr(runner, '_start_exporter', lambda: None)
+    monkeypatch.setattr(runner.settings, 'detect_method', 'zscore')
+
+    runner.watch_directory(str(incoming), str(archive), use_inotify=False)
+    assert len(writer.futures) == 1 and path.exists()
+    writer.futures[0].set_result(None)
+    runner._close_writer()   # waits for the archive move
+    assert not path.exists() and len(os.listdir(archive)) == 1
+    assert str(path) not in runner._pending_archive
+
+
+def test_parallel_watch_rejects_state_path(tmp_path):
+    import pytest
+    from pipeline import runner
+
+    with pytest.raises(ValueError):
+        runner.watch_directory(str(tmp_path / 'incoming'), str(tmp_path / 'archive'), workers=2,
+                               state_path=str(tmp_path / 'state.pkl'))
+    assert not (tmp_path / 'incoming').exists()
+
+
+def test_serial_watch_backs_off_failed_uploads_then_gives_up(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+    import numpy as np
+    import pandas as pd
+    from pipeline import runner
+
+    submitted = []
+
+    class Writer:
+        def submit(self, df, key, part):
+            submitted.append(time.time())
+            f = Future()
+            f.set_exception(RuntimeError('ClickHouse is down'))
+            return f
+
+    class Watcher:
+        # reports the file on every poll while it exists, like PollingWatcher
+        def __init__(self, path):
+            self.path, self.stop_at = path, time.time() + 1.5
+
+        def poll(self, timeout=None):
+            if time.time() > self.stop_at:
+                raise KeyboardInterrupt
+            time.sleep(0.02)
+            return [(self.path, time.time())] if os.path.exists(self.path) else []
+
+        def close(self):
+            pass
+
+    incoming, archive = tmp_path / 'incoming', tmp_path / 'archive'
+    incoming.mkdir()
+    path = incoming / 'a.csv'
+    pd.DataFrame({'ts': pd.date_range('2025-01-01', periods=50, freq='s').astype(str),
+                  'sensor_id': np.arange(50) % 2, 'value': np.random.default_rng(0).normal(size=50)}).to_csv(path, index=False)
+    monkeypatch.setattr(runner, '_async_writer', lambda: Writer())
+    monkeypatch.setattr(runner, 'make_watcher', lambda *a, **k: Watcher(str(path)))
+    monkeypatch.setattr(runner, '_start_exporter', lambda: None)
+    monkeypatch.setattr(runner, 'UPLOAD_RETRY_BACKOFF', 0.3)
+    monkeypatch.setattr(runner.settings, 'detect_method', 'zscore')
+
+    runner.watch_directory(str(incoming), str(archive), use_inotify=False, max_retries=3)
+    assert len(submitted) == 3
+    assert submitted[1] - submitted[0] >= 0.3 and submitted[2] - submitted[1] >= 0.6
+    assert not path.exists() and os.listdir(archive / 'failed') == ['a.csv']
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from application.scheduler import SlidingWindowScheduler
+from application.service import AnomalyDetectionService
+from application.windowing import PaneAggregator, parse_duration
+from infrastructure.detectors.mad import MADDetector
+from infrastructure.detectors.zscore import ZScoreDetector
+
+
+class MemoryRepository:
+    def __init__(self, df):
+        self.df = df
+        self.reads = []
+
+    def read_window(self, start=None, end=None):
+        self.reads.append((start, end))
+        ts = self.df['timestamp']
+        return self.df[(ts >= start) & (ts < end)].reset_index(drop=True)
+
+
+def _frame(hours=3, sensors=3):
+    rng = np.random.default_rng(4)
+    ts = pd.date_range('2025-01-01', periods=hours * 60 * sensors, freq=pd.Timedelta(minutes=1) / sensors)
+    df = pd.DataFrame({'timestamp': ts, 'sensor_id': np.arange(len(ts)) % sensors,
+                       'value': rng.normal(0, 1, len(ts))})
+    df['value'] += df['sensor_id'] * 50.0
+    df.loc[df.index.isin([100, 400]), 'value'] += 12.0
+    return df
+
+
+def test_parse_duration():
+    assert parse_duration('1h') == pd.Timedelta(hours=1)
+    assert parse_duration('5m') == pd.Timedelta(minutes=5)
+    assert parse_duration(30) == pd.Timedelta(seconds=30)
+    with pytest.raises(ValueError):
+        parse_duration('0s')
+
+
+def test_pane_aggregator_matches_direct_window_stats():
+    df = _frame(hours=1)
+    agg = PaneAggregator('20m', '5m')
+    for start in pd.date_range('2025-01-01', '2025-01-01 00:55', freq='5min'):
+        frame = df[(df['timestamp'] >= start) & (df['timestamp'] < start + pd.Timedelta('5min'))]
+        agg.add(start, start + pd.Timedelta('5min'), frame)
+        agg.evict()
+    assert len(agg.panes) == 4
+
+    window = df[df['timestamp'] >= pd.Timestamp('2025-01-01 00:40')]
+    keys, n, mean, std = agg.stats()
+    grouped = window.groupby('sensor_id')['value']
+    np.testing.assert_array_equal(n, grouped.count().reindex(keys).to_numpy())
+    np.testing.assert_allclose(mean, grouped.mean().reindex(keys).to_numpy())
+    np.testing.assert_allclose(std, grouped.std(ddof=0).reindex(keys).to_numpy())
+
+
+@pytest.mark.parametrize('group_by_sensor', [False, True])
+def test_backfill_matches_full_window_recompute(group_by_sensor):
+    df = _frame()
+    detectors = [ZScoreDetector(threshold=2.5), MADDetector(threshold=3.5)]
+    svc = AnomalyDetectionService(MemoryRepository(df), detectors, group_by_sensor=group_by_sensor)
+    sched = SlidingWindowScheduler(svc, duration='1h', step='5m')
+
+    start, end = pd.Timestamp('2025-01-01 01:00'), pd.Timestamp('2025-01-01 03:00')
+    reports = sched.backfill(start, end)
+    assert len(reports) == 24
+    assert len(svc.repository.reads) == 1
+
+    for report in reports[::5]:
+        window = df[(df['timestamp'] >= report.window_start) & (df['timestamp'] < report.window_end)]
+        window = window.reset_index(drop=True)
+        pane = window['timestamp'] >= report.window_end - pd.Timedelta('5min')
+        for det, raw in svc.run_detectors(window):
+            expected = raw.anomalies[pane.to_numpy()]
+            got = report.anomalies.loc[report.anomalies['detector'] == det.name, 'severity'].sum()
+            assert got == pytest.approx(float(expected.sum()))
+            assert report.detector_stats[det.__class__.__name__]['count'] == int((expected > 0).sum())
+
+
+def test_advance_reads_only_new_panes_and_live_loop_steps():
+    df = _frame()
+    repo = MemoryRepository(df)
+    svc = AnomalyDetectionService(repo, [ZScoreDetector(threshold=2.5)])
+    sched = SlidingWindowScheduler.from_config(svc, {'duration': '30m', 'step': '10m'})
+
+    sched.advance(pd.Timestamp('2025-01-01 01:00'))
+    assert repo.reads[-1] == (pd.Timestamp('2025-01-01 00:30'), pd.Timestamp('2025-01-01 01:00'))
+    report = sched.advance(pd.Timestamp('2025-01-01 01:10'))
+    assert repo.reads[-1] == (pd.Timestamp('2025-01-01 01:00'), pd.Timestamp('2025-01-01 01:10'))
+    assert report.window_start == pd.Timestamp('2025-01-01 00:40')
+    assert [p.end for p in sched.panes.panes][0] == pd.Timestamp('2025-01-01 00:50')
+
+    now = [pd.Timestamp('2025-01-01 02:03').timestamp()]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    repo.reads.clear()
+    sched.run_live(max_steps=2, clock=lambda: now[0], sleep=sleep)
+    assert slept == [420.0, 600.0]
+    assert repo.reads[-2:] == [(pd.Timestamp('2025-01-01 02:00'), pd.Timestamp('2025-01-01 02:10')),
+                               (pd.Timestamp('2025-01-01 02:10'), pd.Timestamp('2025-01-01 02:20'))]
+
+
+def test_approx_mad_is_scored_from_pane_sketches(caplog):
+    df = _frame(sensors=1)
+    df.loc[[110, 150], 'value'] += 30.0  # row 100 is already +12
+    mad = MADDetector(threshold=3.5, approx=True, epsilon=0.01, seed=0)
+    svc = AnomalyDetectionService(MemoryRepository(df), [mad])
+    sched = SlidingWindowScheduler(svc, duration='1h', step='5m')
+    sched.panes.frame = lambda: pytest.fail('window frame built for a mergeable detector')
+
+    reports = sched.backfill(pd.Timestamp('2025-01-01 01:00'), pd.Timestamp('2025-01-01 03:00'))
+    flagged = {ts for r in reports for ts in r.anomalies.loc[r.anomalies['severity'] > 6, 'timestamp']}
+    assert flagged == set(df.loc[[100, 110, 150], 'timestamp'])
+    assert all(len(p.sketches) == 1 for p in sched.panes.panes)
+
+    with caplog.at_level('WARNING', logger='application.scheduler'):
+        SlidingWindowScheduler(AnomalyDetectionService(MemoryRepository(df), [MADDetector()]))
+    assert 're-scored every' in caplog.text
+
+
+def test_row_stats_computed_once_per_pane(monkeypatch):
+    svc = AnomalyDetectionService(MemoryRepository(_frame()),
+                                  [ZScoreDetector(threshold=2.5), ZScoreDetector(threshold=3.0)])
+    sched = SlidingWindowScheduler.from_config(svc, {'duration': '30m', 'step': '10m'})
+    calls = []
+    row_stats = sched.panes.row_stats
+    monkeypatch.setattr(sched.panes, 'row_stats', lambda frame: calls.append(len(frame)) or row_stats(frame))
+    sched.advance(pd.Timestamp('2025-01-01 01:00'))
+    assert len(calls) == 1
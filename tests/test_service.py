@@ -1,4 +1,5 @@
 import pandas as pd, os
+import pytest
 from infrastructure.repository.clickhouse_stub import ClickHouseRepositoryStub
 from infrastructure.detectors.zscore import ZScoreDetector
 from application.service import AnomalyDetectionService
@@ -22,4 +23,94 @@ def test_service_end_to_end(tmp_path):
     assert report is not None
     assert isinstance(report.severity, float)
     assert report.severity > 0
-    assert len(report.anomalies) >= 1
\ No newline at end of file
+    assert len(report.anomalies) >= 1
+
+def test_service_grouped_matches_per_sensor_detection(tmp_path):
+    import numpy as np
+    from infrastructure.detectors.mad import MADDetector
+    from infrastructure.detectors.rolling import RollingDetector
+
+    rng = np.random.default_rng(1)
+    n = 300
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2025-01-01', periods=n, freq='min'),
+        'sensor_id': rng.integers(0, 4, n),
+        'value': rng.normal(0, 1, n),
+    })
+    df['value'] += df['sensor_id'] * 100.0
+    df.loc[[17, 150], 'value'] += 25.0
+    os.makedirs(os.path.join(str(tmp_path), 'data'))
+    df.to_csv(os.path.join(str(tmp_path), 'data', 'multi.csv'), index=False)
+
+    detectors = [ZScoreDetector(threshold=3.0), MADDetector(threshold=3.5), RollingDetector(window=5, z_threshold=2.0)]
+    svc = AnomalyDetectionService(repository=ClickHouseRepositoryStub(repo_root=str(tmp_path)),
+                                  detectors=detectors, sinks=[], group_by_sensor=True)
+    report = svc.run_once()
+
+    for det in detectors:
+        expected = pd.concat([det.detect(g['value']).anomalies for _, g in df.groupby('sensor_id')]).sort_index()
+        got = svc._detect_grouped(det, df, svc._sensor_layout(df)).anomalies
+        pd.testing.assert_series_equal(got, expected, check_names=False)
+        assert report.detector_stats[det.__class__.__name__]['severity'] == pytest.approx(float(expected.sum()))
+
+    flagged = set(report.anomalies['timestamp'])
+    assert df.loc[17, 'timestamp'] in flagged and df.loc[150, 'timestamp'] in flagged
+
+    # no rows: no segments, for the segment kernels and the per-sensor fallback alike
+    class NoKernel:
+        def detect(self, series):
+            return series * 0.0
+
+    empty = df.iloc[:0]
+    order, starts = svc._sensor_layout(empty)
+    assert len(order) == len(starts) == 0
+    for det in detectors + [NoKernel()]:
+        assert len(svc._detect_grouped(det, empty, (order, starts)).anomalies) == 0
+
+
+def test_report_anomalies_are_columnar(tmp_path):
+    import json
+    import numpy as np
+
+    class ListDetector:
+        def detect(self, df):
+            return [{'timestamp': 3, 'severity': 2.0}, {'timestamp': 5, 'value': 1.5}]
+
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2025-01-01', periods=50, freq='min'),
+        'sensor_id': np.arange(50) % 2,
+        'value': np.r_[np.zeros(49), 100.0],
+    })
+    repo = ClickHouseRepositoryStub(repo_root=str(tmp_path))
+    svc = AnomalyDetectionService(repository=repo, detectors=[ZScoreDetector(threshold=2.0), ListDetector()])
+    report = svc.evaluate(df)
+
+    anomalies = report.anomalies
+    assert list(anomalies.columns) == ['timestamp', 'sensor_id', 'severity', 'detector']
+    assert anomalies['detector'].dtype == 'category'
+    assert list(anomalies['detector']) == ['ZScoreDetector', 'ListDetector', 'ListDetector']
+    assert list(anomalies['timestamp']) == list(df['timestamp'].iloc[[49, 3, 5]])
+    assert list(anomalies['sensor_id']) == [1, 1, 1]
+    assert list(anomalies['severity'][1:]) == [2.0, 1.5]
+    assert report.detector_stats['ListDetector'] == {'count': 2, 'severity': 3.5}
+
+    saved = repo.read_reports()
+    assert list(saved['anomalies_count']) == [3]
+    assert saved['detector_stats'][0]['ListDetector'] == {'count': 2, 'severity': 3.5}
+
+
+def test_stage_observer_sees_read_detect_publish():
+    import numpy as np
+    from infrastructure.detectors.mad import MADDetector
+    seen = []
+    df = pd.DataFrame({"timestamp": pd.date_range("2025-01-01", periods=50, freq="min"),
+                       "sensor_id": 1, "value": np.r_[np.zeros(49), 50.0]})
+
+    class Repo:
+        def read_window(self, start=None, end=None):
+            return df
+
+    svc = AnomalyDetectionService(Repo(), [ZScoreDetector(threshold=3.0), MADDetector()],
+                                  stage_observer=lambda stage, s, det="": seen.append((stage, det)))
+    svc.run_once()
+    assert seen == [("read", ""), ("detect", "ZScoreDetector"), ("detect", "MADDetector"), ("publish", "")]
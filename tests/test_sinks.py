@@ -0,0 +1,149 @@
+import io, json, os, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+
+from domain.models import AnomalyReport, anomaly_frame
+from infrastructure.factory import build_sinks
+from infrastructure.sinks.alert_sinks import StdOutAlertSink, ClickHouseReportSink
+from infrastructure.sinks.dispatcher import AlertDispatcher
+
+
+def _report(sensor=1, end='2025-01-01 00:10', level='low', severity=1.0, ts=('2025-01-01 00:05',)):
+    end = pd.Timestamp(end)
+    anomalies = anomaly_frame(timestamp=pd.to_datetime(list(ts)), sensor_id=[sensor] * len(ts),
+                              severity=[severity] * len(ts), detector='zscore')
+    return AnomalyReport(sensor_id=sensor, window_start=end - pd.Timedelta('10min'), window_end=end,
+                         anomalies=anomalies, severity=severity, severity_level=level, detector_stats={})
+
+
+class _Collect:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def send_batch(self, reports):
+        time.sleep(self.delay)
+        self.batches.append(list(reports))
+
+    @property
+    def reports(self):
+        return [r for b in self.batches for r in b]
+
+
+def test_stdout_sink_single_write_and_empty_window():
+    out = io.StringIO()
+    report = _report()
+    report.window_start = report.window_end = None
+    StdOutAlertSink(stream=out).send_batch([report, _report(sensor=2)])
+    text = out.getvalue()
+    assert text.count('--- ALERT ---') == 2
+    summary = json.loads(text.splitlines()[4])
+    assert summary['window_start'] is None and summary['anomalies_count'] == 1
+
+
+def test_dispatcher_send_does_not_wait_for_slow_sink():
+    sink = _Collect(delay=0.5)
+    d = AlertDispatcher([sink], flush_interval=0.05)
+    t0 = time.perf_counter()
+    for i in range(20):
+        d.send(_report(sensor=i))
+    assert time.perf_counter() - t0 < 0.1
+    d.close()
+    assert len(sink.reports) == 20 and d.sent == 20
+
+
+def test_dispatcher_drops_when_queue_full():
+    sink = _Collect(delay=0.3)
+    d = AlertDispatcher([sink], queue_size=2, batch_size=1, flush_interval=0.01)
+    for i in range(10):
+        d.send(_report(sensor=i))
+    d.close()
+    assert d.dropped > 0
+    assert len(sink.reports) + d.dropped == 10
+
+
+def test_dispatcher_coalesces_per_sensor_bucket():
+    sink = _Collect()
+    d = AlertDispatcher([sink], flush_interval=0.2, coalesce_seconds=3600)
+    d.send(_report(sensor=1, end='2025-01-01 00:10', level='low', ts=['2025-01-01 00:05']))
+    d.send(_report(sensor=1, end='2025-01-01 00:20', level='high', severity=5.0, ts=['2025-01-01 00:15']))
+    d.send(_report(sensor=2, end='2025-01-01 00:20'))
+    d.close()
+    by_sensor = {r.sensor_id: r for r in sink.reports}
+    assert len(sink.reports) == 2 and d.coalesced == 1
+    merged = by_sensor[1]
+    assert merged.severity_level == 'high'
+    assert merged.window_start == pd.Timestamp('2025-01-01 00:00')
+    assert merged.window_end == pd.Timestamp('2025-01-01 00:20')
+    assert len(merged.anomalies) == 2
+
+
+def test_dispatcher_dedup_and_rate_limit():
+    now = [0.0]
+    sink = _Collect()
+    d = AlertDispatcher([sink], flush_interval=0.01, dedup_seconds=60, clock=lambda: now[0])
+    d.send(_report())
+    d.flush()
+    d.send(_report())                       # identical alert within the window
+    d.flush()
+    now[0] = 120.0
+    d.send(_report())
+    d.close()
+    assert len(sink.reports) == 2 and d.suppressed == 1
+
+    sink = _Collect()
+    d = AlertDispatcher([sink], flush_interval=0.01, rate_per_minute=2, clock=lambda: 0.0)
+    for i in range(5):
+        d.send(_report(sensor=1, ts=[f'2025-01-01 00:0{i}']))
+    d.send(_report(sensor=2))
+    d.close()
+    assert sorted(r.sensor_id for r in sink.reports) == [1, 1, 2]
+    assert d.suppressed == 3
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((parse_qs(urlparse(self.path).query), body.decode()))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_clickhouse_report_sink_batches_through_dispatcher(server):
+    sinks = build_sinks([{'type': 'clickhouse', 'table': 'anomaly_reports'}],
+                        clickhouse={'host': '127.0.0.1', 'port': server.server_port, 'database': 'demo'},
+                        dispatcher={'flush_interval': 0.2})
+    assert len(sinks) == 1 and isinstance(sinks[0], AlertDispatcher)
+    for i in range(3):
+        sinks[0].send(_report(sensor=i))
+    sinks[0].close()
+
+    assert len(server.requests) == 1
+    params, body = server.requests[0]
+    assert params['query'] == ['INSERT INTO demo.anomaly_reports FORMAT JSONEachRow']
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [r['sensor_id'] for r in rows] == [0, 1, 2]
+    assert rows[0]['window_end'] == '2025-01-01T00:10:00' and rows[0]['anomalies_count'] == 1
+    # every field is a column of the table created by clickhouse/init.sql
+    with open(os.path.join(os.path.dirname(__file__), '..', 'clickhouse', 'init.sql')) as f:
+        ddl = f.read().split('anomaly_demo.anomaly_reports', 1)[1].split('ENGINE', 1)[0]
+    assert set(rows[0]) == {line.split()[0] for line in ddl.splitlines()[2:-1]}
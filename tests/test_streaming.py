@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from infrastructure.detectors.sketch import QuantileSketch
+from infrastructure.detectors.streaming import (
+    StreamingDetectorSet,
+    StreamingMADDetector,
+    StreamingRollingDetector,
+    StreamingZScoreDetector,
+)
+from infrastructure.detectors.rolling import RollingDetector
+
+
+def _batches(seed=0, n=400, sensors=3, parts=4):
+    rng = np.random.default_rng(seed)
+    sid = rng.integers(0, sensors, n)
+    val = rng.normal(0, 1, n) + sid * 10.0
+    val[rng.integers(0, n, 5)] += 30.0
+    edges = np.linspace(0, n, parts + 1).astype(int)
+    return sid, val, [(sid[a:b], val[a:b]) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def test_streaming_zscore_matches_full_history():
+    sid, val, batches = _batches()
+    det = StreamingZScoreDetector(threshold=2.5)
+    seen = 0
+    for b_sid, b_val in batches:
+        got = det.update(b_sid, b_val)
+        seen += len(b_val)
+        hist = pd.DataFrame({'sensor_id': sid[:seen], 'value': val[:seen]})
+        for s in np.unique(b_sid):
+            h = hist.loc[hist['sensor_id'] == s, 'value']
+            mean, std = h.mean(), h.std(ddof=0)
+            z = np.abs(b_val[b_sid == s] - mean) / std
+            expected = np.where((z > 2.5) | (np.abs(b_val[b_sid == s] - mean) > 2.5), z, 0.0)
+            np.testing.assert_allclose(got[b_sid == s], expected, rtol=1e-9)
+
+
+def test_streaming_rolling_continues_across_batches():
+    sid, val, batches = _batches(seed=1)
+    det = StreamingRollingDetector(window=5, z_threshold=2.0)
+    got = np.concatenate([det.update(s, v) for s, v in batches])
+
+    ref = RollingDetector(window=5, z_threshold=2.0)
+    for s in np.unique(sid):
+        expected = ref.detect(pd.Series(val[sid == s])).anomalies.to_numpy()
+        np.testing.assert_allclose(got[sid == s], expected, rtol=1e-9, atol=1e-12)
+
+
+def test_streaming_mad_flags_outlier_after_warm_history():
+    det = StreamingMADDetector(threshold=3.5)
+    rng = np.random.default_rng(2)
+    det.update(np.zeros(5000, dtype=int), rng.normal(0, 1, 5000))
+    sev = det.update([0, 0, 0], [0.1, -0.3, 25.0])
+    assert sev[0] == 0 and sev[1] == 0
+    assert sev[2] > 3.5
+
+
+def test_quantile_sketch_rank_error_and_merge():
+    rng = np.random.default_rng(3)
+    a, b = rng.normal(0, 1, 60_000), rng.exponential(2.0, 40_000)
+    sk = QuantileSketch(k=200, seed=0).update(a).merge(QuantileSketch(k=200, seed=1).update(b))
+    data = np.sort(np.concatenate([a, b]))
+    assert sk.n == len(data)
+    for q in (0.1, 0.5, 0.9):
+        rank = np.searchsorted(data, sk.quantile(q)) / len(data)
+        assert abs(rank - q) < 0.02
+
+
+def test_streaming_state_checkpoint_roundtrip(tmp_path):
+    sid, val, batches = _batches(seed=4, parts=2)
+    path = str(tmp_path / 'state.pkl')
+
+    live = StreamingDetectorSet()
+    live.update(*batches[0])
+    live.save(path)
+    expected = live.update(*batches[1])
+
+    resumed = StreamingDetectorSet.load(path)
+    got = resumed.update(*batches[1])
+    for name in expected:
+        np.testing.assert_allclose(got[name], expected[name])
+
+
+def test_sketch_bulk_update_and_approx_mad_detector():
+    import pickle
+    from infrastructure.detectors.mad import MADDetector
+
+    rng = np.random.default_rng(8)
+    x = rng.standard_t(3, 300_000)
+    exact_med = np.median(x)
+    exact_mad = np.median(np.abs(x - exact_med))
+
+    det = MADDetector(threshold=3.5, approx=True, epsilon=0.005, seed=0)
+    chunks = [det.sketch(pd.Series(part)) for part in np.array_split(x, 3)]
+    merged = pickle.loads(pickle.dumps(chunks[0])).merge(chunks[1]).merge(chunks[2])
+    med, mad = merged.median_and_mad()
+    assert merged.n == len(x)
+    assert abs((x < med).mean() - 0.5) < 0.005
+    assert abs((np.abs(x - exact_med) < mad).mean() - 0.5) < 0.01
+    assert abs(mad - exact_mad) / exact_mad < 0.02
+
+    exact = MADDetector(threshold=3.5).detect(pd.Series(x)).anomalies > 0
+    approx = det.detect(pd.Series(x)).anomalies > 0
+    chunked = det.detect_with_sketch(pd.Series(x), merged).anomalies > 0
+    assert (exact != approx).mean() < 0.001 and (exact != chunked).mean() < 0.001